@@ -1,7 +1,5 @@
 import logging
 import sys
-import pytz
-from datetime import datetime
 
 logging.basicConfig(
     level=logging.INFO,  # or logging.DEBUG for more detail
@@ -12,54 +10,138 @@ logging.basicConfig(
 )
 
 # app.py  –  beta flow with deferred e‑mail
-from flask import Flask, render_template, request, jsonify
-import threading, tempfile, os, re, json, uuid, markdown
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g
+import os, json, uuid, time, gzip, threading
+from werkzeug.exceptions import HTTPException
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
 
 from backend.models import UserGoalInput
-from backend.resume_extractor import extract_text_from_file
+from backend.validators import validate_goal, validate_location
+from backend.resume_extractor import read_upload, UploadTooLarge
+from backend.extraction_pool import ExtractionPool, ExtractionTimeout, ExtractionFailed
+from backend.extraction_cache import ExtractionCache, cached_extract
 from backend.prompt_builder import build_career_roadmap_prompt
-from backend.openai_client import call_openai_gpt4
-from backend.perplexity_prompt_builder import build_perplexity_prompt
-from backend.perplexity_client import call_perplexity_api
-from backend.email_sender import send_email
+from backend.roadmap_cache import roadmap_cache, roadmap_cache_key, submission_fingerprint
+from backend.roadmap_parser import parse_roadmap, RoadmapPreview
+from backend.perplexity_prompt_builder import build_perplexity_prompt, build_market_intel_prompt
+from backend.perplexity_client import (PERPLEXITY_STREAM, PERPLEXITY_RESEARCH_MODEL,
+                                       PERPLEXITY_STRATEGY_MODEL, MARKET_INTEL_USER_MESSAGE)
+from backend.llm_providers import roadmap_chain, research_chain, strategy_chain
+from backend.market_intel import MarketIntelCache, role_family, freshness_note
+from backend.markdown_renderer import IncrementalMarkdownRenderer
+from backend.report_artifact import (store_report, negotiate_encoding, load_report_html,
+                                     HTML_BLOBS, MARKDOWN_BLOB)
+from backend.outbox import Outbox
+from backend import metrics, checkpoints
+from backend.job_store import create_job_store
+from backend.http_transport import transport
+from backend.scheduler import JobScheduler, QueueFullError
+from backend.cancellation import JobWatchdog, run_cancellable
+from backend.rate_limiter import (create_daily_quota, create_token_bucket, IP_BURST, IP_REFILL_SECONDS,
+                                  EMAIL_BURST, EMAIL_REFILL_SECONDS)
 
 load_dotenv()
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 
+# Upload limits: bytes are enforced while the request streams in, and the
+# extractor stops parsing once RESUME_MAX_CHARS is hit.  What reaches the
+# prompts is then fitted to each model's token budget by section priority
+# (backend/prompt_budget.py), so long résumés are trimmed, not rejected.
+RESUME_MAX_BYTES = 500*1024
+RESUME_MAX_CHARS = int(os.getenv('RESUME_MAX_CHARS', 20000))
+app.config['MAX_CONTENT_LENGTH'] = RESUME_MAX_BYTES + 64*1024   # résumé + form fields
+
 # ------------------------------------------------------------------
-# In‑memory cache: job_id ➜ {'status':running/ready/sent, 'html':str}
-# In production swap for Redis with expiry.
+# Job store: job_id ➜ {'status':..., 'roadmap':str, 'report':{artifact metadata}}
+# SQLite (WAL) by default so every gunicorn worker sees the same jobs;
+# entries expire after JOB_TTL_SECONDS.  See backend/job_store.py.
 # ------------------------------------------------------------------
-report_store = {}
-report_lock = threading.Lock()  # <-- ADD THIS LOCK
+job_store = create_job_store()
+
+# Finished reports are compressed blobs beside the job (backend/report_artifact.py).
+# A report holds the user's résumé-derived career plan: only the browser may
+# keep it, revalidating by ETag, and its HTML – model output – runs sandboxed.
+REPORT_CACHE_CONTROL = os.getenv('REPORT_CACHE_CONTROL', 'private, no-cache')
+REPORT_CSP           = 'sandbox'
+
+# Résumé text keyed by sha256 of the upload (backend/extraction_cache.py)
+extraction_cache = ExtractionCache()
+# Cache misses are parsed in child processes with time/memory limits (backend/extraction_pool.py)
+extraction_pool = ExtractionPool()
+# Location/role-family research shared by every user it applies to (backend/market_intel.py)
+market_intel_cache = MarketIntelCache()
+
+# Fixed worker pool + bounded queue for roadmap/report jobs (backend/scheduler.py)
+scheduler = JobScheduler(name="PipelineWorker")
+
+# Model fallback chains with per-call deadlines and hedging (backend/llm_providers.py)
+roadmap_llm  = roadmap_chain()
+research_llm = research_chain(PERPLEXITY_RESEARCH_MODEL, MARKET_INTEL_USER_MESSAGE)
+strategy_llm = strategy_chain(PERPLEXITY_STRATEGY_MODEL)
+
+# Each run gets JOB_DEADLINE seconds, handed down to every LLM call as its
+# remaining budget; POST /cancel and abandoned jobs (no client for
+# JOB_ABANDON_AFTER) stop in-flight calls and free the worker (backend/cancellation.py)
+JOB_DEADLINE = float(os.getenv('JOB_DEADLINE', 900))
+watchdog = JobWatchdog(job_store, on_abandoned=lambda job_id: _cancel_job(job_id, 'abandoned'))
+
+# A queued/sending e-mail whose state hasn't changed for this long lost its
+# worker (the outbox lives in one process) and may be sent again
+EMAIL_STALE_AFTER = float(os.getenv('EMAIL_STALE_AFTER', 600))
+
+def _record_email_state(job_id, state):
+    fields = {'email': {**state, 'updated_at': time.time()}}
+    if state['status'] == 'sent':
+        fields['status'] = 'sent'
+    job_store.update(job_id, **fields)
+
+# Report e-mails are sent by one background thread over a reused SMTP login (backend/outbox.py)
+outbox = Outbox(on_state=_record_email_state)
+
+# Scrape-time gauges for /metrics; stage latencies, sizes and errors are
+# recorded where they happen (backend/metrics.py)
+metrics.registry.gauge('job_queue_depth', 'Report jobs waiting for a worker.',
+                       lambda: scheduler.stats()['queued'])
+metrics.registry.gauge('jobs_running', 'Report jobs currently on a worker.',
+                       lambda: scheduler.stats()['running'])
+metrics.registry.gauge('upstream_in_flight', 'OpenAI/Perplexity calls holding an upstream slot.',
+                       lambda: scheduler.stats()['upstream_in_flight'])
+metrics.registry.gauge('http_in_flight', 'Upstream HTTP requests in flight per host.',
+                       lambda: {h: s['in_flight'] for h, s in transport.stats()['hosts'].items()}, ('host',))
+metrics.registry.gauge('outbox_pending', 'Report e-mails queued or awaiting retry.', outbox.pending)
+metrics.registry.gauge('jobs_cancellable', 'Queued or running report jobs watched for cancellation.',
+                       watchdog.active)
+submissions_deduplicated = metrics.registry.counter(
+    'submissions_deduplicated_total', 'Submissions attached to an identical job already in flight.')
 
 # ================================================================
-# DAILY USAGE LIMIT (MST, persists in daily_usage.json)
+# RATE LIMITS  (backend/rate_limiter.py)
+#   • global daily quota (USAGE_LIMIT, resets at midnight MST), shared by
+#     all workers through usage.db
+#   • per-IP buckets on /generate_prompt, per-address buckets on /send_report,
+#     also in usage.db so a client gets one burst, not one per worker
 # ================================================================
-import json as _json
-USAGE_LIMIT = 10
-USAGE_FILE = 'daily_usage.json'
-MST = pytz.timezone('America/Phoenix')
-
-def check_and_increment_usage():
-    now = datetime.now(MST)
-    today = now.strftime('%Y-%m-%d')
-    try:
-        with open(USAGE_FILE, 'r') as f:
-            data = _json.load(f)
-    except (FileNotFoundError, _json.JSONDecodeError):
-        data = {'date': today, 'count': 0}
-    if data.get('date') == today:
-        if data.get('count', 0) >= USAGE_LIMIT:
-            return False
-        data['count'] += 1
-    else:
-        data = {'date': today, 'count': 1}
-    with open(USAGE_FILE, 'w') as f:
-        _json.dump(data, f)
-    return True
+usage_quota  = create_daily_quota()
+ip_limiter   = create_token_bucket('ip', IP_BURST, IP_REFILL_SECONDS)
+email_limiter = create_token_bucket('email', EMAIL_BURST, EMAIL_REFILL_SECONDS)
+
+# Behind Render's (or any) reverse proxy set TRUSTED_PROXIES=1 so the
+# per-IP buckets see the client address instead of the proxy's.
+TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', 0))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
+def _rate_limited(result, message):
+    g.rate_limit_headers = result.headers()
+    return jsonify({'error': message, 'retry_after': int(result.retry_after + 0.999)}), 429
+
+@app.after_request
+def add_rate_limit_headers(response):
+    for name, value in getattr(g, 'rate_limit_headers', {}).items():
+        response.headers[name] = value
+    return response
 
 # ================================================================
 # ROUTES
@@ -68,112 +150,660 @@ def check_and_increment_usage():
 def index():
     return render_template('index.html')
 
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({'error':'Resume too large (500 KB).'}), 413
+
 @app.route('/generate_prompt', methods=['POST'])
 def generate_prompt():
-    if not check_and_increment_usage():
-        return jsonify({'error': 'Daily usage limit reached. Please try again tomorrow (resets at midnight MST).'}), 429
+    if not scheduler.has_capacity():
+        return _queue_full_response(QueueFullError(scheduler.retry_after()))
     try:
         goal      = request.form.get('goal')
         location  = request.form.get('location')
         resume_f  = request.files.get('resume')
         if not all([goal, location, resume_f]):
             return jsonify({'error':'Resume, goal and location are required.'}), 400
+        try:
+            goal     = validate_goal(goal)
+            location = validate_location(location)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-        # -------- resume extraction ----------
         allowed = {'pdf','docx','txt'}
         if resume_f.filename.split('.')[-1].lower() not in allowed:
             return jsonify({'error':'Invalid resume type.'}), 400
-        if len(resume_f.read()) > 500*1024:
+        try:
+            with metrics.stage('upload_read'):
+                resume_bytes = read_upload(resume_f.stream, RESUME_MAX_BYTES)
+        except UploadTooLarge:
             return jsonify({'error':'Resume too large (500 KB).'}), 400
-        resume_f.seek(0)
+        metrics.observe_size('upload_read', nbytes=len(resume_bytes))
         ext = '.'+resume_f.filename.split('.')[-1].lower()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-            resume_f.save(tmp.name)
-            resume_txt = extract_text_from_file(tmp.name)
-        os.unlink(tmp.name)
-        if not resume_txt:
-            return jsonify({'error':'Failed to read resume.'}), 400
-        if len(resume_txt) > 10000:
-            return jsonify({'error':'Resume >~2 pages.'}), 400
-        resume_snip = resume_txt[:3000]
-
-        # -------- OpenAI roadmap ----------
-        oa_prompt   = build_career_roadmap_prompt(goal, location, resume_snip)
-        oa_response = call_openai_gpt4(oa_prompt)
-        clean_json  = re.sub(r"^```(?:json)?\s*|```$", "", oa_response.strip(), flags=re.MULTILINE)
-        roadmap_obj = json.loads(clean_json)
-        roadmap_json = json.dumps(roadmap_obj, indent=2)
-
-        # -------- enqueue Perplexity ----------
-        job_id = str(uuid.uuid4())
-        with report_lock:
-            report_store[job_id] = {'status':'running', 'html':None}
-        threading.Thread(
-            target=run_perplexity_only,
-            args=(job_id, roadmap_json, resume_snip, location),
-            daemon=True,
-            name=f"PerplexityJob-{job_id[:8]}"
-        ).start()
-
-        return jsonify({'roadmap': roadmap_json, 'job_id': job_id})
+        use_cache   = request.form.get('refresh') not in ('1', 'true')   # bypass the roadmap cache
+
+        # -------- single flight: identical submissions share one job ----------
+        # A double-click or a client retry attaches to the job already running
+        # for this résumé + goal + location and uses no quota or rate-limit
+        # tokens.  refresh=1 only shares a job that is still in flight.
+        fingerprint = submission_fingerprint(goal, location, resume_bytes)
+        subscriber  = uuid.uuid4().hex   # this client's hold on the job (see cancel_job)
+        job_id, created = job_store.claim(fingerprint, str(uuid.uuid4()),
+                                          {'status':'queued', 'report':None, 'roadmap':None,
+                                           'last_seen': time.time(), 'subscribers': [subscriber]},
+                                          reuse_finished=use_cache)
+        if not created:
+            submissions_deduplicated.inc()
+            logging.info(f'Duplicate submission attached to job {job_id}')
+            entry = _subscribe(job_id, subscriber) or {}
+            return jsonify({'job_id': job_id, 'status': entry.get('status', 'queued'), 'deduplicated': True,
+                            'subscriber': subscriber}), 202
+
+        accepted = False
+        try:
+            body, status = _admit_and_enqueue(job_id, subscriber, goal, location, resume_bytes, ext, use_cache)
+            accepted = status == 202
+            return body, status
+        finally:
+            if not accepted:   # rejected or failed – a retry must not attach to this job
+                job_store.release(fingerprint, job_id)
+                job_store.delete(job_id)
+    except HTTPException:
+        raise   # e.g. 413 from MAX_CONTENT_LENGTH – handled by its errorhandler
     except Exception as e:
         logging.exception('Error in /generate_prompt')
+        metrics.record_error('generate_prompt', type(e).__name__)
         return jsonify({'error':'Server error.'}), 500
 
+def _admit_and_enqueue(job_id, subscriber, goal, location, resume_bytes, ext, use_cache):
+    """Rate limits, résumé extraction and queueing for a newly claimed job."""
+    ip = request.remote_addr or 'unknown'
+    client = ip_limiter.take(ip)
+    if not client.allowed:
+        return _rate_limited(client, 'Too many reports from your network. Please wait a few minutes and try again.')
+    quota = usage_quota.try_acquire()
+    g.rate_limit_headers = quota.headers()
+    if not quota.allowed:
+        ip_limiter.refund(ip)   # no report was started – don't hold it against the client
+        return _rate_limited(quota, 'Daily usage limit reached. Please try again tomorrow (resets at midnight MST).')
+
+    accepted = False
+    try:
+        body, status = _extract_and_enqueue(job_id, subscriber, goal, location, resume_bytes, ext, use_cache)
+        accepted = status == 202
+        return body, status
+    finally:
+        if not accepted:   # unreadable résumé, full queue, server error – no report was started
+            usage_quota.refund()
+            ip_limiter.refund(ip)
+            g.rate_limit_headers = usage_quota.peek().headers()
+
+def _extract_and_enqueue(job_id, subscriber, goal, location, resume_bytes, ext, use_cache):
+    # -------- resume extraction ----------
+    def extract():   # cache misses only
+        with metrics.stage('extraction'):
+            text = extraction_pool.extract(resume_bytes, ext, max_chars=RESUME_MAX_CHARS)
+        metrics.observe_size('extraction', chars=len(text or ''))
+        return text
+
+    try:
+        resume_txt = cached_extract(extraction_cache, resume_bytes, ext, extract)
+    except ExtractionTimeout:
+        return jsonify({'error':'Resume took too long to process. Try a simpler PDF, DOCX or TXT file.'}), 400
+    except ExtractionFailed:
+        return jsonify({'error':'Failed to read resume.'}), 400
+    if not resume_txt:
+        return jsonify({'error':'Failed to read resume.'}), 400
+    # kept on the job so a failed run can be resumed without a new upload (backend/checkpoints.py)
+    checkpoints.save(job_store, job_id, 'resume', resume_txt)
+    job_store.update(job_id, inputs={'goal': goal, 'location': location, 'use_cache': use_cache}, attempts=1)
+
+    # -------- enqueue roadmap → report pipeline ----------
+    watchdog.register(job_id)
+    try:
+        scheduler.submit(job_id, run_pipeline, job_id, goal, location, resume_txt, use_cache)
+    except QueueFullError as e:
+        watchdog.unregister(job_id)
+        return _queue_full_response(e), 503
+    return jsonify({'job_id': job_id, 'status': 'queued', 'subscriber': subscriber}), 202
+
+def _subscribe(job_id, subscriber):
+    """Attach another client to a shared job; returns the record (None if it is gone)."""
+    while (entry := job_store.get(job_id)) is not None:
+        subscribers = entry.get('subscribers') or []
+        updated = job_store.update_if(job_id, entry.get('version'), subscribers=subscribers + [subscriber])
+        if updated:
+            return updated
+    return None
+
+def _unsubscribe(job_id, subscriber):
+    """Detach a client from its job; returns the clients still attached."""
+    while (entry := job_store.get(job_id)) is not None:
+        subscribers = entry.get('subscribers') or []
+        if subscriber not in subscribers:   # a repeated beacon doesn't count twice
+            return subscribers
+        rest = [s for s in subscribers if s != subscriber]
+        if job_store.update_if(job_id, entry.get('version'), subscribers=rest):
+            return rest
+    return []
+
+# Job lifecycle:
+#   queued → roadmap_running → roadmap_ready → report_running → ready → sent
+#   (a failed stage goes to retrying → queued while automatic retries last,
+#   then to error; POST /retry re-queues an errored job)
+#   The automatic retry is a timer in the worker that failed; if that worker
+#   dies, the next status read (or POST /retry) re-queues the overdue job.
+#   POST /cancel, or no client for JOB_ABANDON_AFTER, ends an unfinished job in cancelled
+# Push channel settings: waiters park on job_store.wait_for_change() and
+# are woken by the status writes in run_pipeline.
+TERMINAL_STATUSES  = {'ready', 'error', 'sent', 'cancelled'}
+SEEN_INTERVAL      = 30    # seconds between last_seen writes for one job
+LONG_POLL_MAX_WAIT = 30    # seconds a ?wait= request may block
+SSE_HEARTBEAT      = 15    # keep-alive comment interval
+SSE_MAX_SECONDS    = 600   # close the stream; EventSource reconnects on its own
+RETRY_GRACE        = 10    # seconds past retry_at before a lost retry timer is taken over
+RETRY_PRIORITY     = -1    # a resumed job has waited through one run already – it goes first
+# Each SSE stream or long-poll parks a gunicorn thread; past PUSH_MAX_WAITERS
+# per worker they are refused (SSE) or answered at once (long-poll) with
+# poll_after, so threads stay free for submissions, /cancel and /metrics.
+PUSH_MAX_WAITERS   = int(os.getenv('PUSH_MAX_WAITERS', 8))   # keep below GUNICORN_THREADS
+FALLBACK_POLL_SECONDS = 3
+push_slots = threading.BoundedSemaphore(PUSH_MAX_WAITERS)
+
+def _seen(job_id, entry):
+    """A client is still waiting for this job – it isn't abandoned, nor left stuck in retrying."""
+    if entry['status'] not in TERMINAL_STATUSES and time.time() - entry.get('last_seen', 0) > SEEN_INTERVAL:
+        job_store.touch(job_id, last_seen=time.time())
+    if _retry_overdue(entry):
+        try:
+            requeue_job(job_id)
+        except QueueFullError:
+            pass   # still busy – the next status read tries again
+
+def _retry_overdue(entry):
+    return entry['status'] == 'retrying' and time.time() > (entry.get('retry_at') or 0) + RETRY_GRACE
+
+def _status_body(job_id, entry):
+    body = {'status': entry['status'], 'version': entry.get('version')}
+    if entry.get('roadmap_preview_items') and not entry.get('roadmap'):
+        body['roadmap_preview_items'] = entry['roadmap_preview_items']
+    if entry.get('preview_sections'):
+        body['preview_sections'] = entry['preview_sections']
+    if entry.get('error'):
+        body['error'] = entry['error']
+    if entry['status'] == 'error':
+        body['failed_stage'] = entry.get('failed_stage')
+        body['retryable'] = checkpoints.can_retry(entry)
+    if entry['status'] == 'retrying':
+        body['retry_at'] = entry.get('retry_at')
+    if entry.get('email'):
+        body['email'] = entry['email']
+    if entry.get('report'):
+        body['report_url'] = f'/report/{job_id}'
+    position = scheduler.position(job_id) if entry['status'] == 'queued' else None
+    if position is not None:   # known only to the worker process whose queue holds the job
+        body['queue_position'] = position
+        body['estimated_start_seconds'] = scheduler.estimated_start(job_id)
+    return body
+
 @app.route('/report_status')
 def report_status():
+    """Status lookup; with ?wait=N&version=V it long-polls until the job changes."""
     job_id = request.args.get('id')
-    with report_lock:
-        entry  = report_store.get(job_id)
+    wait   = min(request.args.get('wait', 0, type=float), LONG_POLL_MAX_WAIT)
+    parked = wait > 0 and push_slots.acquire(blocking=False)
+    try:
+        if parked:
+            entry = job_store.wait_for_change(job_id, request.args.get('version', type=int), wait)
+        else:
+            entry = job_store.get(job_id)
+    finally:
+        if parked:
+            push_slots.release()
     if not entry:
         return jsonify({'error':'Unknown id'}), 404
-    return jsonify({'status': entry['status']})
+    _seen(job_id, entry)
+    body = _status_body(job_id, entry)
+    if wait > 0 and not parked:   # every waiting thread is taken – poll again shortly instead
+        body['poll_after'] = FALLBACK_POLL_SECONDS
+    return jsonify(body)
+
+@app.route('/report_events')
+def report_events():
+    """Server-Sent Events stream of status changes; closes once the job is done."""
+    job_id = request.args.get('id')
+    entry  = job_store.get(job_id)
+    if not entry:
+        return jsonify({'error':'Unknown id'}), 404
+    if not push_slots.acquire(blocking=False):
+        # EventSource gives up on a non-200 answer; the page falls back to polling
+        resp = jsonify({'error':'Too many open status streams.', 'poll_after': FALLBACK_POLL_SECONDS})
+        resp.status_code = 503
+        resp.headers['Retry-After'] = str(FALLBACK_POLL_SECONDS)
+        return resp
+
+    def stream(entry):
+        yield 'retry: 3000\n\n'
+        started, version = time.monotonic(), None
+        while entry is not None and time.monotonic() - started < SSE_MAX_SECONDS:
+            _seen(job_id, entry)
+            if entry.get('version') != version:
+                version = entry.get('version')
+                yield f"data: {json.dumps(_status_body(job_id, entry))}\n\n"
+                if entry['status'] in TERMINAL_STATUSES:
+                    return
+            elif entry['status'] == 'queued':   # refresh queue position / ETA
+                yield f"data: {json.dumps(_status_body(job_id, entry))}\n\n"
+            else:
+                yield ': keep-alive\n\n'
+            entry = job_store.wait_for_change(job_id, version, SSE_HEARTBEAT)
+        if entry is None:
+            yield 'event: gone\ndata: {}\n\n'
+
+    resp = Response(stream_with_context(stream(entry)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    resp.call_on_close(push_slots.release)   # the server closes it when the stream ends or the client leaves
+    return resp
+
+@app.route('/roadmap')
+def roadmap():
+    """
+    The roadmap JSON from status roadmap_ready onwards; while it is still
+    streaming, the years validated so far (complete: false).
+    """
+    job_id = request.args.get('id')
+    entry  = job_store.get(job_id)
+    if not entry:
+        return jsonify({'error':'Unknown id'}), 404
+    _seen(job_id, entry)
+    if entry.get('roadmap'):
+        return jsonify({'status': entry['status'], 'complete': True, 'roadmap': entry['roadmap']})
+    if entry.get('roadmap_preview'):
+        return jsonify({'status': entry['status'], 'complete': False, 'roadmap': entry['roadmap_preview'],
+                        'items': entry.get('roadmap_preview_items', 0)})
+    return jsonify({'status': entry['status'], 'error':'Roadmap not ready.'}), 409
+
+@app.route('/report_preview')
+def report_preview():
+    """Partial report HTML (completed sections so far), or the full report once ready."""
+    job_id = request.args.get('id')
+    entry  = job_store.get(job_id)
+    if not entry:
+        return jsonify({'error':'Unknown id'}), 404
+    _seen(job_id, entry)
+    complete = bool(entry.get('report'))
+    if complete:   # the browser loads (and caches) the finished report from /report/<id>
+        return jsonify({'status': entry['status'], 'complete': True, 'url': f'/report/{job_id}',
+                        'sections': entry.get('preview_sections', 0), 'html': ''})
+    return jsonify({'status': entry['status'], 'complete': False,
+                    'sections': entry.get('preview_sections', 0), 'html': entry.get('partial_html') or ''})
+
+@app.route('/report/<job_id>')
+def report_document(job_id):
+    """
+    The finished report, served straight from its compressed artifact.
+    ETag / If-None-Match revalidation, Accept-Encoding negotiation
+    (zstd, gzip, identity) and ?format=md for the source Markdown.
+    """
+    entry = job_store.get(job_id)
+    if not entry:
+        return jsonify({'error':'Unknown id'}), 404
+    meta = entry.get('report')
+    if not meta:
+        return jsonify({'status': entry['status'], 'error':'Report not ready.'}), 409
+
+    as_markdown = request.args.get('format') == 'md'
+    tag = meta['sha256'][:32] + ('-md' if as_markdown else '')
+    headers = {'Cache-Control': REPORT_CACHE_CONTROL, 'Vary': 'Accept-Encoding',
+               'X-Content-Type-Options': 'nosniff', 'Content-Security-Policy': REPORT_CSP}
+    if request.if_none_match.contains_weak(tag):
+        resp = Response(status=304, headers=headers)
+        resp.set_etag(tag)
+        return resp
+
+    if as_markdown:
+        blobs, mimetype = {'gzip': MARKDOWN_BLOB}, 'text/markdown'
+    else:
+        blobs = {enc: HTML_BLOBS[enc] for enc in HTML_BLOBS if enc in meta['encodings']}
+        mimetype = 'text/html'
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'), list(blobs))
+    body = job_store.get_blob(job_id, blobs[encoding or 'gzip'])
+    if body is None:
+        return jsonify({'error':'Report expired.'}), 410
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    else:
+        body = gzip.decompress(body)
+    resp = Response(body, mimetype=mimetype, headers=headers)
+    resp.charset = 'utf-8'
+    resp.set_etag(tag)
+    return resp
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint (this worker's metrics)."""
+    return Response(metrics.registry.render(), headers={'Content-Type': metrics.CONTENT_TYPE})
 
 @app.route('/debug/jobs')
 def debug_jobs():
     """Debug endpoint to see all current jobs"""
-    with report_lock:
-        jobs = {job_id: {'status': entry['status']} for job_id, entry in report_store.items()}
-        total_jobs = len(report_store)
-    return jsonify({'total_jobs': total_jobs, 'jobs': jobs})
+    jobs = {job_id: {'status': entry['status']} for job_id, entry in job_store.snapshot().items()}
+    total_jobs = len(jobs)
+    return jsonify({'total_jobs': total_jobs, 'jobs': jobs, 'scheduler': scheduler.stats(),
+                    'cancellable_jobs': watchdog.active(),
+                    'extraction_pool': extraction_pool.stats(), 'http': transport.stats(),
+                    'outbox': outbox.stats(),
+                    'caches': {'resume': extraction_cache.stats(), 'roadmap': roadmap_cache.stats(),
+                               'market_intel': market_intel_cache.stats()}})
 
 @app.route('/send_report', methods=['POST'])
 def send_report():
     data = request.get_json(silent=True) or {}
     job_id  = data.get('id')
     email   = data.get('email')
-    with report_lock:
-        entry = report_store.get(job_id)
-        if not entry or entry['status'] != 'ready':
+    entry = job_store.get(job_id)
+    if not entry or entry['status'] not in ('ready', 'sent'):
+        return jsonify({'error':'Report not ready.'}), 400
+    if not email:
+        return jsonify({'error':'Email address is required.'}), 400
+    # Delivery happens on the outbox thread; the client polls /report_status for 'email'
+    while True:
+        state = entry.get('email') or {}
+        if _email_in_progress(state):
+            return jsonify({'status': state['status'], 'version': entry.get('version')}), 202
+        # compare-and-set: of concurrent requests – in any worker – one sends
+        claimed = job_store.update_if(job_id, entry.get('version'),
+                                      email={'status': 'queued', 'attempts': 0, 'error': None,
+                                             'updated_at': time.time()})
+        if claimed:
+            break
+        entry = job_store.get(job_id)
+        if not entry:
             return jsonify({'error':'Report not ready.'}), 400
-        try:
-            send_email(email, 'Your Custom Career Intelligence Report', entry['html'])
-            entry['status'] = 'sent'
-            return jsonify({'status':'sent'})
-        except Exception as e:
-            logging.exception('send_email failed')
-            return jsonify({'error':'Failed to email report.'}), 500
+    html = load_report_html(job_store, job_id)
+    if html is None:   # the artifact expired or was evicted – nothing to send
+        job_store.update(job_id, email=entry.get('email'))   # hand the claim back
+        return jsonify({'error':'Report expired. Please generate it again.'}), 410
+    limit = email_limiter.take(email.strip().casefold())
+    if not limit.allowed:
+        job_store.update(job_id, email=entry.get('email'))
+        return _rate_limited(limit, 'Too many emails to this address. Please try again later.')
+    outbox.enqueue(job_id, email, 'Your Custom Career Intelligence Report', html)
+    return jsonify({'status':'queued', 'version': job_store.get(job_id).get('version')}), 202
+
+def _email_in_progress(state):
+    if state.get('status') == 'sent':
+        return True
+    return (state.get('status') in ('queued', 'sending', 'retrying')
+            and time.time() - state.get('updated_at', 0) < EMAIL_STALE_AFTER)
+
+@app.route('/retry', methods=['POST'])
+def retry_job():
+    """Resume a failed job from its first unfinished stage – no new upload, no usage slot."""
+    data = request.get_json(silent=True) or {}
+    job_id = data.get('id')
+    entry = job_store.get(job_id)
+    if not entry:
+        return jsonify({'error':'Unknown id'}), 404
+    if entry['status'] != 'error' and not _retry_overdue(entry):
+        return jsonify({'status': entry['status'], 'error':'Only failed reports can be retried.'}), 409
+    if not checkpoints.can_retry(entry):
+        return jsonify({'error':'This report can no longer be retried. Please submit it again.'}), 409
+    try:
+        if not requeue_job(job_id):
+            return jsonify({'error':'This report can no longer be retried. Please submit it again.'}), 409
+    except QueueFullError as e:
+        return _queue_full_response(e)
+    return jsonify({'job_id': job_id, 'status':'queued', 'version': job_store.get(job_id).get('version')}), 202
+
+@app.route('/cancel', methods=['POST'])
+def cancel_job():
+    """
+    Stop an unfinished job: dequeue it, or abort its in-flight LLM calls and
+    free its worker.  With {"subscriber": …} (the id /generate_prompt handed
+    out) only that client lets go; a job shared by identical submissions is
+    cancelled once none of its clients remain.
+    """
+    data = request.get_json(silent=True) or {}
+    job_id = data.get('id')
+    entry = job_store.get(job_id)
+    if not entry:
+        return jsonify({'error':'Unknown id'}), 404
+    if entry['status'] in TERMINAL_STATUSES:
+        return jsonify({'status': entry['status'], 'error':'This report has already finished.'}), 409
+    if data.get('subscriber'):
+        others = _unsubscribe(job_id, data['subscriber'])
+        if others:
+            return jsonify({'job_id': job_id, 'status': entry['status'], 'subscribers': len(others)})
+    entry = _cancel_job(job_id, 'cancelled by client')
+    return jsonify({'job_id': job_id, 'status': 'cancelled', 'version': (entry or {}).get('version')})
+
+def _queue_full_response(err):
+    resp = jsonify({'error':'Server busy – too many reports in progress. Please retry shortly.',
+                    'retry_after': err.retry_after})
+    resp.status_code = 503
+    resp.headers['Retry-After'] = str(err.retry_after)
+    return resp
 
 # ================================================================
-# BACKGROUND WORKER
+# BACKGROUND PIPELINE  (runs on a scheduler thread)
+# Each stage's output is checkpointed on the job (backend/checkpoints.py),
+# so a retry – automatic or POST /retry – skips the stages already done.
 # ================================================================
-def run_perplexity_only(job_id, roadmap_json, resume_snip, location):
+def run_pipeline(job_id, goal, location, resume_text, use_cache=True):
+    token = watchdog.register(job_id)
+    deadline = time.monotonic() + JOB_DEADLINE   # each attempt gets the full budget
+    try:
+        entry = job_store.get(job_id) or {}
+        if token.is_set() or entry.get('status') == 'cancelled':
+            return
+        roadmap_json = entry.get('roadmap')   # set by an earlier attempt
+        if roadmap_json is None:
+            roadmap_json = run_roadmap_stage(job_id, goal, location, resume_text, use_cache,
+                                             deadline=deadline, cancel=token)
+        if roadmap_json is not None:
+            run_perplexity_only(job_id, roadmap_json, resume_text, location, goal,
+                                deadline=deadline, cancel=token)
+    finally:
+        watchdog.unregister(job_id, token)   # a retry may already have registered its own
+
+def _cancel_job(job_id, reason):
+    """Mark the job cancelled and stop its work, wherever it is in this process."""
+    entry = job_store.update(job_id, status='cancelled', cancel_reason=reason,
+                             error='Report cancelled.', partial_html=None, retry_at=None)
+    scheduler.discard(job_id)
+    # running in another worker? its watchdog sees the status on its next sweep
+    watchdog.cancel(job_id, reason)
+    logging.info(f'Job {job_id} cancelled ({reason})')
+    return entry
+
+def _cancelled(job_id, cancel, stage):
+    """True (and logged) if the stage failed because its job was cancelled."""
+    if cancel is None or not cancel.is_set():
+        return False
+    logging.info(f'Job {job_id} stopped during {stage} ({cancel.reason})')
+    return True
+
+def requeue_job(job_id):
+    """Put a failed job back on the queue; False if its checkpoints are gone or it was re-queued already."""
+    entry = job_store.get(job_id)
+    if not entry or entry['status'] not in ('error', 'retrying'):
+        return False
+    inputs = entry.get('inputs')
+    resume_text = checkpoints.load(job_store, job_id, 'resume')
+    if not inputs or resume_text is None:
+        return False
+    # compare-and-set: of a double-clicked retry, the retry timer and a status
+    # read taking over an overdue retry – in any worker – one re-queues the job
+    if not job_store.update_if(job_id, entry.get('version'), status='queued', error=None, retry_at=None,
+                               attempts=entry.get('attempts', 1) + 1, last_seen=time.time()):
+        return False
+    watchdog.register(job_id)
+    try:
+        scheduler.submit(job_id, run_pipeline, job_id, inputs['goal'], inputs['location'],
+                         resume_text, inputs['use_cache'], priority=RETRY_PRIORITY)
+    except QueueFullError:
+        watchdog.unregister(job_id)
+        job_store.update(job_id, status=entry['status'], error=entry.get('error'),
+                         retry_at=entry.get('retry_at'), attempts=entry.get('attempts', 1))
+        raise
+    logging.info(f"Job {job_id} re-queued (attempt {entry.get('attempts', 1) + 1}) "
+                 f"after failing at {entry.get('failed_stage')}")
+    return True
+
+def _auto_retry(job_id):
+    try:
+        requeue_job(job_id)
+    except QueueFullError as e:   # still busy – try again once the queue has drained a bit
+        _schedule_retry(job_id, e.retry_after)
+
+def _schedule_retry(job_id, delay):
+    job_store.update(job_id, status='retrying', retry_at=time.time() + delay)
+    timer = threading.Timer(delay, _auto_retry, (job_id,))
+    timer.daemon = True
+    timer.start()
+
+def _stage_failed(job_id, stage, message):
+    """Record the failed stage; retry automatically while the policy allows, else end in error."""
+    entry = job_store.get(job_id) or {}
+    delay = checkpoints.auto_retry_delay(entry)
+    if delay is not None:
+        logging.warning(f'Job {job_id} failed at {stage} – retrying in {delay:.0f}s')
+        job_store.update(job_id, failed_stage=stage)
+        _schedule_retry(job_id, delay)
+    else:
+        job_store.update(job_id, status='error', error=message, failed_stage=stage)
+
+def run_roadmap_stage(job_id, goal, location, resume_text, use_cache=True, deadline=None, cancel=None):
+    logging.info(f'Starting roadmap stage for job {job_id}...')
+    cache_key = roadmap_cache_key(goal, location, resume_text)
+    cached = roadmap_cache.get(cache_key) if use_cache else None
+    if cached is not None:
+        job_store.update(job_id, status='roadmap_ready', roadmap=cached, roadmap_cached=True)
+        logging.info(f'Roadmap cache hit for job {job_id}.')
+        return cached
+    job_store.update(job_id, status='roadmap_running', roadmap_preview=None, roadmap_preview_items=0)
+    try:
+        def ask(prompt, on_text=None, on_restart=None):
+            # each attempt (hedges included) holds its own upstream slot
+            return roadmap_llm.complete(prompt, on_text=on_text, on_restart=on_restart,
+                                        deadline=deadline, cancel=cancel, upstream=scheduler)
+
+        # years (and Year 1's quarters) are shown as soon as their JSON closes
+        preview = RoadmapPreview(goal, location)
+
+        def on_text(delta):
+            if preview.feed(delta):
+                job_store.update(job_id, roadmap_preview=preview.to_json(),
+                                 roadmap_preview_items=preview.items)
+
+        def on_restart():
+            preview.reset()
+            job_store.update(job_id, roadmap_preview=None, roadmap_preview_items=0)
+
+        with metrics.stage('roadmap_prompt'):
+            prompt = build_career_roadmap_prompt(goal, location, resume_text)
+        oa_response = ask(prompt, on_text, on_restart)
+        with metrics.stage('roadmap_parse'):   # includes any targeted re-prompt
+            roadmap = parse_roadmap(oa_response, goal, location, reask=ask, resume_text=resume_text)
+        roadmap_json = roadmap.model_dump_json(exclude_none=True)
+        roadmap_cache.set(cache_key, roadmap_json)
+        job_store.update(job_id, status='roadmap_ready', roadmap=roadmap_json, roadmap_preview=None)
+        logging.info(f'Roadmap ready for job {job_id}.')
+        return roadmap_json
+    except Exception as e:
+        if _cancelled(job_id, cancel, 'roadmap'):
+            return None
+        logging.exception(f'Roadmap stage failed for job {job_id}')
+        metrics.record_error('roadmap', type(e).__name__)   # the LLM call runs outside metrics.stage()
+        _stage_failed(job_id, 'roadmap', 'Could not generate roadmap. Please try again.')
+        return None
+
+def fetch_market_intel(location, goal, deadline=None, cancel=None):
+    """Cached location/role research (report Part 2); researches on a miss."""
+    role = role_family(goal)
+
+    def research():
+        return research_llm.complete(build_market_intel_prompt(location, role), deadline=deadline,
+                                     upstream=scheduler)
+
+    # the research is shared with every job waiting on the same location/role,
+    # so a cancelled job stops waiting for it (and frees its worker) while the
+    # research itself carries on for the others, bounded by the deadline
+    return run_cancellable(market_intel_cache.get_or_fetch, cancel, location, role, research)
+
+def run_perplexity_only(job_id, roadmap_json, resume_text, location, goal, deadline=None, cancel=None):
     logging.info(f'Starting Perplexity job {job_id}...')
+    job_store.update(job_id, status='report_running', partial_html=None, preview_sections=0)
+    stage = 'research'
     try:
-        logging.info(f'Building Perplexity prompt for job {job_id}...')
-        prompt = build_perplexity_prompt(roadmap_json, resume_snip, location)
-        logging.info(f'Calling Perplexity API for job {job_id}...')
-        md = call_perplexity_api(prompt)
+        saved = checkpoints.load(job_store, job_id, 'intel')
+        if saved is not None:
+            intel, intel_cached = json.loads(saved), True
+        else:
+            intel, intel_cached = fetch_market_intel(location, goal, deadline, cancel)
+            checkpoints.save(job_store, job_id, 'intel', json.dumps(intel))
+        job_store.update(job_id, market_intel_cached=intel_cached,
+                         market_intel_fetched_at=intel['fetched_at'])
+
+        stage = 'prompt'
+        prompt = checkpoints.load(job_store, job_id, 'prompt')
+        if prompt is None:
+            logging.info(f'Building Perplexity prompt for job {job_id}...')
+            with metrics.stage('report_prompt'):
+                prompt = build_perplexity_prompt(roadmap_json, resume_text, location,
+                                                 market_intel=intel['markdown'], model=PERPLEXITY_STRATEGY_MODEL)
+            checkpoints.save(job_store, job_id, 'prompt', prompt)
+
+        stage = 'strategy'
+        renderer = IncrementalMarkdownRenderer()
+        render_seconds = 0.0   # summed over the incremental feeds → one markdown_render sample
+        md = checkpoints.load(job_store, job_id, 'markdown')
+        streamed = md is None and PERPLEXITY_STREAM
+        if md is None:
+            logging.info(f'Calling Perplexity API for job {job_id}...')
+
+            def on_text(delta):
+                nonlocal render_seconds
+                # only completed sections are rendered, so this writes once per heading
+                start = time.perf_counter()
+                completed = renderer.feed(delta)
+                render_seconds += time.perf_counter() - start
+                if completed:
+                    job_store.update(job_id, partial_html=renderer.html(),
+                                     preview_sections=renderer.sections)
+
+            def on_restart():
+                # the chain fell back to another model mid-stream – drop its partial sections
+                nonlocal renderer
+                renderer = IncrementalMarkdownRenderer()
+                job_store.update(job_id, partial_html=None, preview_sections=0)
+
+            md = strategy_llm.complete(prompt, on_text=on_text if streamed else None, on_restart=on_restart,
+                                       deadline=deadline, cancel=cancel, upstream=scheduler)
+            checkpoints.save(job_store, job_id, 'markdown', md)
+
+        stage = 'render'
         logging.info(f'Converting Markdown to HTML for job {job_id}...')
-        html = markdown.markdown(md)
-        with report_lock:
-            report_store[job_id] = {'status':'ready', 'html': html}
+        start = time.perf_counter()
+        if not streamed:
+            renderer.feed(md)
+        # Part 2 comes from the shared research stage
+        renderer.feed(f"\n\n{intel['markdown']}\n\n{freshness_note(intel)}\n")
+        html = renderer.finish()
+        metrics.stage_seconds.observe(render_seconds + time.perf_counter() - start, stage='markdown_render')
+        metrics.observe_size('markdown_render', nbytes=len(html.encode('utf-8')))
+        with metrics.stage('report_store'):
+            report = store_report(job_store, job_id, html, renderer.source())
+        job_store.update(job_id, status='ready', report=report, partial_html=None,
+                         preview_sections=renderer.sections)
         logging.info(f'Perplexity job {job_id} finished successfully.')
     except Exception as e:
-        logging.exception(f'Perplexity thread failed for job {job_id}')
-        with report_lock:
-            report_store[job_id] = {'status':'error', 'html': None}
-        logging.info(f'Updated job {job_id} status to error')
+        if _cancelled(job_id, cancel, stage):
+            return
+        logging.exception(f'Perplexity {stage} stage failed for job {job_id}')
+        metrics.record_error(stage, type(e).__name__)
+        _stage_failed(job_id, stage, 'Could not generate market report. Please try again.')
 
 # ================================================================
 if __name__ == '__main__':
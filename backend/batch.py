@@ -0,0 +1,393 @@
+# backend/batch.py
+"""
+Cohort batch mode: roadmaps and reports for a CSV or a directory of résumés.
+
+    python -m backend.batch cohort.csv --out reports/
+    python -m backend.batch resumes/ --goal "Become a data analyst" --location "Tucson, AZ" --out reports/
+
+CSV columns: goal, location, resume (path, relative to the CSV), and
+optionally email and id.  Rows are streamed through the web app's stages,
+each with its own worker pool so one row's Perplexity call overlaps the
+next row's OpenAI call:
+
+    extract (ExtractionPool) → roadmap (OpenAI chain) → report (market intel + strategy) → e-mail
+
+    • OpenAI and Perplexity calls pass requests-per-minute gates
+      (--openai-rpm / --perplexity-rpm); at most --max-in-flight rows are
+      held in memory at once
+    • every finished stage is appended to <out>/checkpoint.jsonl – a re-run
+      skips finished rows, reuses saved roadmaps and retries failed rows
+    • reports are written to <out>/<id>/{roadmap.json,report.md,report.html}
+      and <out>/summary.csv; a throughput line is printed as rows finish
+
+Batch runs are operator jobs and do not count against the web USAGE_LIMIT.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from backend.extraction_pool import ExtractionPool
+from backend.llm_providers import roadmap_chain, research_chain, strategy_chain
+from backend.market_intel import MarketIntelCache, role_family, freshness_note
+from backend.markdown_renderer import IncrementalMarkdownRenderer
+from backend.perplexity_prompt_builder import build_perplexity_prompt, build_market_intel_prompt
+from backend.prompt_builder import build_career_roadmap_prompt
+from backend.rate_limiter import TokenBucketLimiter
+from backend.roadmap_parser import parse_roadmap
+from backend.validators import validate_goal, validate_location
+
+RESUME_EXTENSIONS = {".pdf", ".docx", ".txt"}
+RESUME_MAX_CHARS  = int(os.getenv("RESUME_MAX_CHARS", 20000))
+EMAIL_SUBJECT     = "Your Custom Career Intelligence Report"
+STAGES            = ("extract", "roadmap", "report")
+
+
+@dataclass
+class Row:
+    id: str
+    goal: str
+    location: str
+    resume: Path
+    email: str | None = None
+    resume_text: str | None = None
+    roadmap_json: str | None = None
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "-", text).strip("-.")[:80] or "row"
+
+
+def read_csv_rows(path: str | Path):
+    """Yield a Row per CSV line; résumé paths are relative to the CSV file."""
+    path = Path(path)
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for i, record in enumerate(csv.DictReader(f), 1):
+            record = {k.strip().lower(): (v or "").strip() for k, v in record.items() if k}
+            resume = Path(record.get("resume") or record.get("resume_path") or "")
+            if not resume.is_absolute():
+                resume = path.parent / resume
+            yield Row(id=_slug(record.get("id") or f"{i:04d}-{resume.stem}"), goal=record.get("goal", ""),
+                      location=record.get("location", ""), resume=resume, email=record.get("email") or None)
+
+
+def read_directory_rows(path: str | Path, goal: str, location: str):
+    """One Row per résumé file in `path`, all with the same goal and location."""
+    for resume in sorted(Path(path).iterdir()):
+        if resume.suffix.lower() in RESUME_EXTENSIONS:
+            yield Row(id=_slug(resume.name), goal=goal, location=location, resume=resume)
+
+
+class Checkpoint:
+    """Append-only JSONL of per-row progress, replayed on start so a re-run resumes."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._state: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            for line in self.path.read_text(encoding="utf-8").splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:   # torn last line from an interrupted run
+                    continue
+                self._state.setdefault(entry["id"], {}).update(entry)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def get(self, row_id: str) -> dict:
+        with self._lock:
+            return dict(self._state.get(row_id, {}))
+
+    def record(self, row_id: str, **fields):
+        entry = {"id": row_id, **fields, "at": time.time()}
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            self._state.setdefault(row_id, {}).update(entry)
+
+    def items(self) -> list[tuple[str, dict]]:
+        with self._lock:
+            return [(row_id, dict(state)) for row_id, state in self._state.items()]
+
+    def close(self):
+        self._file.close()
+
+
+class RateGate:
+    """Blocking requests-per-minute limit shared by all workers calling one provider."""
+
+    def __init__(self, rpm: float, burst: int = 1):
+        self._bucket = TokenBucketLimiter(burst, 60.0 / rpm) if rpm > 0 else None
+
+    def wait(self):
+        while self._bucket is not None:
+            result = self._bucket.take("calls")
+            if result.allowed:
+                return
+            time.sleep(result.retry_after)
+
+
+class BatchRunner:
+    def __init__(self, out_dir: str | Path, *, extract_workers: int = 2, openai_concurrency: int = 4,
+                 perplexity_concurrency: int = 2, openai_rpm: float = 30, perplexity_rpm: float = 20,
+                 max_in_flight: int | None = None, send_email: bool = False, progress_every: float = 10,
+                 roadmap_llm=None, research_llm=None, strategy_llm=None, strategy_model: str | None = None,
+                 outbox=None, stream=sys.stdout):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.checkpoint = Checkpoint(self.out_dir / "checkpoint.jsonl")
+        self.extraction_pool = ExtractionPool(workers=extract_workers)
+        if strategy_model is None or research_llm is None:
+            from backend.perplexity_client import (PERPLEXITY_STRATEGY_MODEL, PERPLEXITY_RESEARCH_MODEL,
+                                                   MARKET_INTEL_USER_MESSAGE)
+            strategy_model = strategy_model or PERPLEXITY_STRATEGY_MODEL
+            research_llm = research_llm or research_chain(PERPLEXITY_RESEARCH_MODEL, MARKET_INTEL_USER_MESSAGE)
+        # throughput, not tail latency, matters here – duplicate (hedged) calls would only eat the rate budget
+        self.roadmap_llm = roadmap_llm or roadmap_chain(hedge=False)
+        self.research_llm = research_llm
+        self.strategy_llm = strategy_llm or strategy_chain(strategy_model, hedge=False)
+        self.strategy_model = strategy_model
+        self.market_intel = MarketIntelCache()
+        self.openai_gate = RateGate(openai_rpm, burst=openai_concurrency)
+        self.perplexity_gate = RateGate(perplexity_rpm, burst=perplexity_concurrency)
+        self.send_email = send_email
+        self.outbox = outbox
+        self.progress_every = progress_every
+        self.stream = stream
+        self._pools = {
+            "extract": ThreadPoolExecutor(max(1, extract_workers), thread_name_prefix="BatchExtract"),
+            "roadmap": ThreadPoolExecutor(openai_concurrency, thread_name_prefix="BatchRoadmap"),
+            "report": ThreadPoolExecutor(perplexity_concurrency, thread_name_prefix="BatchReport"),
+        }
+        self._slots = threading.BoundedSemaphore(max_in_flight or 2 * (openai_concurrency + perplexity_concurrency))
+        self._cond = threading.Condition()
+        self._in_flight = {stage: 0 for stage in STAGES}
+        self.counts = {"read": 0, "skipped": 0, "done": 0, "failed": 0, "emails_pending": 0}
+        self._input_done = False
+        self._started = time.monotonic()
+
+    # ---------------- driver ----------------
+    def run(self, rows) -> dict:
+        """Push every row through the pipeline; returns the counts."""
+        if self.send_email and self.outbox is None:
+            from backend.outbox import Outbox
+            self.outbox = Outbox(on_state=self._email_state)
+        reporter = threading.Thread(target=self._report_progress, name="BatchProgress", daemon=True)
+        reporter.start()
+        try:
+            for row in rows:
+                with self._cond:
+                    self.counts["read"] += 1
+                state = self.checkpoint.get(row.id)
+                if state.get("report"):
+                    self._skip_or_email(row, state)
+                    continue
+                self._slots.acquire()   # backpressure: bounded rows in memory
+                self._submit("extract", row)
+            with self._cond:
+                self._input_done = True
+                self._cond.wait_for(lambda: sum(self._in_flight.values()) == 0 and self.counts["emails_pending"] == 0)
+        finally:
+            with self._cond:
+                self._input_done = True
+                self._cond.notify_all()
+            for pool in self._pools.values():
+                pool.shutdown(wait=True)
+            self.extraction_pool.shutdown()
+            if self.outbox is not None:
+                self.outbox.shutdown(timeout=5)
+            self.write_summary()
+            self.checkpoint.close()
+        self._print(self._progress_line(final=True))
+        return dict(self.counts)
+
+    def _skip_or_email(self, row, state):
+        if self.send_email and row.email and state.get("email") != "sent":   # the outbox is in-memory; anything unsent was lost
+            html = (self.out_dir / row.id / "report.html").read_text(encoding="utf-8")
+            self._enqueue_email(row, html)
+        with self._cond:
+            self.counts["skipped"] += 1
+
+    def _submit(self, stage, row):
+        with self._cond:
+            self._in_flight[stage] += 1
+        self._pools[stage].submit(self._run_stage, stage, row)
+
+    def _run_stage(self, stage, row):
+        try:
+            result = getattr(self, f"_{stage}")(row)
+        except Exception as exc:
+            logging.warning("Batch row %s failed at %s: %s", row.id, stage, exc)
+            self.checkpoint.record(row.id, error=f"{stage}: {type(exc).__name__}: {exc}")
+            self._finish(stage, "failed")
+            return
+        following = STAGES.index(stage) + 1
+        if following < len(STAGES):
+            self._submit(STAGES[following], row)
+            self._finish(stage, None)
+            return
+        if self.send_email and row.email:
+            self._enqueue_email(row, result)
+        self._finish(stage, "done")
+
+    def _finish(self, stage, outcome):
+        with self._cond:
+            self._in_flight[stage] -= 1
+            if outcome is not None:
+                self.counts[outcome] += 1
+            self._cond.notify_all()
+        if outcome is not None:
+            self._slots.release()
+            self._print(self._progress_line())
+
+    # ---------------- stages ----------------
+    def _extract(self, row):
+        text = self.extraction_pool.extract(row.resume.read_bytes(), row.resume.suffix, max_chars=RESUME_MAX_CHARS)
+        if not text:
+            raise ValueError(f"could not read résumé {row.resume.name}")
+        row.goal = validate_goal(row.goal)
+        row.location = validate_location(row.location)
+        row.resume_text = text
+
+    def _roadmap(self, row):
+        saved = self.checkpoint.get(row.id).get("roadmap")
+        if saved:
+            row.roadmap_json = saved
+            return
+
+        def ask(prompt):
+            self.openai_gate.wait()
+            return self.roadmap_llm.complete(prompt)
+
+        reply = ask(build_career_roadmap_prompt(row.goal, row.location, row.resume_text))
+        roadmap = parse_roadmap(reply, row.goal, row.location, reask=ask, resume_text=row.resume_text)
+        row.roadmap_json = roadmap.model_dump_json(exclude_none=True)
+        row_dir = self.out_dir / row.id
+        row_dir.mkdir(exist_ok=True)
+        (row_dir / "roadmap.json").write_text(row.roadmap_json, encoding="utf-8")
+        self.checkpoint.record(row.id, roadmap=row.roadmap_json)
+
+    def _report(self, row) -> str:
+        role = role_family(row.goal)
+
+        def research():
+            self.perplexity_gate.wait()
+            return self.research_llm.complete(build_market_intel_prompt(row.location, role))
+
+        # a cohort is mostly one location, so this is researched once and shared
+        intel, _ = self.market_intel.get_or_fetch(row.location, role, research)
+        prompt = build_perplexity_prompt(row.roadmap_json, row.resume_text, row.location,
+                                         market_intel=intel["markdown"], model=self.strategy_model)
+        self.perplexity_gate.wait()
+        md = self.strategy_llm.complete(prompt)
+        renderer = IncrementalMarkdownRenderer()
+        renderer.feed(md)
+        renderer.feed(f"\n\n{intel['markdown']}\n\n{freshness_note(intel)}\n")
+        html = renderer.finish()
+        row_dir = self.out_dir / row.id
+        row_dir.mkdir(exist_ok=True)
+        (row_dir / "report.md").write_text(renderer.source(), encoding="utf-8")
+        (row_dir / "report.html").write_text(html, encoding="utf-8")
+        self.checkpoint.record(row.id, report=str(row_dir), error=None)
+        return html
+
+    # ---------------- e-mail ----------------
+    def _enqueue_email(self, row, html):
+        with self._cond:
+            self.counts["emails_pending"] += 1
+        self.outbox.enqueue(row.id, row.email, EMAIL_SUBJECT, html)
+
+    def _email_state(self, row_id, state):
+        self.checkpoint.record(row_id, email=state["status"])
+        if state["status"] in ("sent", "failed"):
+            with self._cond:
+                self.counts["emails_pending"] -= 1
+                self._cond.notify_all()
+
+    # ---------------- reporting ----------------
+    def _print(self, line):
+        print(line, file=self.stream, flush=True)
+
+    def _progress_line(self, final: bool = False) -> str:
+        with self._cond:
+            counts, in_flight, input_done = dict(self.counts), dict(self._in_flight), self._input_done
+        elapsed = time.monotonic() - self._started
+        rate = counts["done"] / elapsed * 60 if elapsed > 0 else 0.0
+        line = (f"[batch] {counts['done']} done, {counts['failed']} failed, {counts['skipped']} skipped "
+                f"of {counts['read']} read | in flight: " +
+                ", ".join(f"{stage} {in_flight[stage]}" for stage in STAGES) +
+                f" | {rate:.1f} reports/min | {elapsed:.0f}s")
+        remaining = counts["read"] - counts["done"] - counts["failed"] - counts["skipped"]
+        if input_done and remaining and rate:
+            line += f" | ETA {remaining / rate * 60:.0f}s"
+        if final:
+            line += " | finished"
+        return line
+
+    def _report_progress(self):
+        while True:
+            with self._cond:
+                if self._cond.wait_for(lambda: self._input_done and not sum(self._in_flight.values()),
+                                       timeout=self.progress_every):
+                    return
+            self._print(self._progress_line())
+
+    def write_summary(self) -> Path:
+        path = self.out_dir / "summary.csv"
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "status", "report", "email", "error"])
+            for row_id, state in sorted(self.checkpoint.items()):
+                status = "done" if state.get("report") else "failed" if state.get("error") else "pending"
+                writer.writerow([row_id, status, state.get("report") or "", state.get("email") or "",
+                                 state.get("error") or ""])
+        return path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV file (goal, location, resume[, email, id]) or a directory of résumés")
+    parser.add_argument("--out", default="batch_output", help="output directory (also holds the checkpoint)")
+    parser.add_argument("--goal", help="five-year goal for every résumé in a directory")
+    parser.add_argument("--location", help="location for every résumé in a directory")
+    parser.add_argument("--extract-workers", type=int, default=2, help="résumé parsing processes (0 = inline)")
+    parser.add_argument("--openai-concurrency", type=int, default=4)
+    parser.add_argument("--perplexity-concurrency", type=int, default=2)
+    parser.add_argument("--openai-rpm", type=float, default=30, help="OpenAI requests per minute (0 = unlimited)")
+    parser.add_argument("--perplexity-rpm", type=float, default=20, help="Perplexity requests per minute (0 = unlimited)")
+    parser.add_argument("--max-in-flight", type=int, help="rows held in memory at once")
+    parser.add_argument("--send-email", action="store_true", help="e-mail each report to the row's address")
+    parser.add_argument("--progress-every", type=float, default=10, help="seconds between progress lines")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    source = Path(args.input)
+    if source.is_dir():
+        if not (args.goal and args.location):
+            parser.error("--goal and --location are required for a directory of résumés")
+        rows = read_directory_rows(source, args.goal, args.location)
+    else:
+        rows = read_csv_rows(source)
+
+    runner = BatchRunner(args.out, extract_workers=args.extract_workers,
+                         openai_concurrency=args.openai_concurrency,
+                         perplexity_concurrency=args.perplexity_concurrency,
+                         openai_rpm=args.openai_rpm, perplexity_rpm=args.perplexity_rpm,
+                         max_in_flight=args.max_in_flight, send_email=args.send_email,
+                         progress_every=args.progress_every)
+    counts = runner.run(rows)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s [%(threadName)s] %(message)s")
+    sys.exit(main())
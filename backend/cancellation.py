@@ -0,0 +1,164 @@
+# backend/cancellation.py
+"""
+Cooperative cancellation for report jobs.
+
+    • CancelToken – a threading.Event that also runs callbacks when set, so
+      cancelling can close an in-flight HTTP stream instead of waiting for
+      its next chunk.  One token per job; LLMChain links each attempt's own
+      token to it (backend/llm_providers.py).
+    • JobWatchdog – sweeps this process's queued and running jobs every
+      JOB_WATCHDOG_INTERVAL seconds and cancels the ones that were
+      cancelled by another worker (POST /cancel landed elsewhere), have
+      expired, or whose client hasn't polled or listened for
+      JOB_ABANDON_AFTER seconds (the tab was closed).
+
+`run_cancellable(fn, cancel)` waits for work the job doesn't own – the
+shared market research another job may be waiting on – from a helper
+thread, so the job can leave while that work carries on.
+
+Clients mark a job as seen through `JobStore.touch(job_id, last_seen=…)`,
+which doesn't bump the version, so it never wakes a long-poll.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+
+JOB_ABANDON_AFTER     = float(os.getenv("JOB_ABANDON_AFTER", 300))   # 0 = never
+JOB_WATCHDOG_INTERVAL = float(os.getenv("JOB_WATCHDOG_INTERVAL", 5))
+
+
+class CallCancelled(Exception):
+    """The call was told to stop: it lost a hedge race, or its job was cancelled."""
+
+
+class CancelToken(threading.Event):
+    def __init__(self):
+        super().__init__()
+        self.reason: str | None = None
+        self._callbacks: list = []
+        self._callbacks_lock = threading.Lock()
+
+    def set(self, reason: str = "cancelled"):
+        with self._callbacks_lock:
+            if self.is_set():
+                return
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+            super().set()
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception:
+                logging.exception("Cancel callback failed")
+
+    cancel = set
+
+    def on_cancel(self, fn):
+        """Run `fn()` when the token is set (now, if it already is); returns an unregister function."""
+        with self._callbacks_lock:
+            if not self.is_set():
+                self._callbacks.append(fn)
+                return lambda: self._discard(fn)
+        fn()
+        return lambda: None
+
+    def _discard(self, fn):
+        with self._callbacks_lock:
+            if fn in self._callbacks:
+                self._callbacks.remove(fn)
+
+    def raise_if_cancelled(self):
+        if self.is_set():
+            raise CallCancelled(self.reason)
+
+
+def run_cancellable(fn, cancel: CancelToken | None, *args):
+    """`fn(*args)`, but raises CallCancelled as soon as `cancel` is set; `fn` then finishes unobserved."""
+    if cancel is None:
+        return fn(*args)
+    cancel.raise_if_cancelled()
+    results: queue.Queue = queue.Queue()
+
+    def run():
+        try:
+            results.put((fn(*args), None))
+        except BaseException as exc:
+            results.put((None, exc))
+
+    unlink = cancel.on_cancel(lambda: results.put((None, CallCancelled(cancel.reason))))
+    try:
+        threading.Thread(target=run, name="Cancellable", daemon=True).start()
+        value, exc = results.get()
+    finally:
+        unlink()
+    if exc is not None:
+        raise exc
+    return value
+
+
+class JobWatchdog:
+    def __init__(self, job_store, on_abandoned, abandon_after: float = JOB_ABANDON_AFTER,
+                 interval: float = JOB_WATCHDOG_INTERVAL):
+        self.job_store = job_store
+        self.on_abandoned = on_abandoned   # on_abandoned(job_id) marks the job cancelled
+        self.abandon_after = abandon_after
+        self.interval = interval
+        self._tokens: dict[str, CancelToken] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def register(self, job_id: str) -> CancelToken:
+        """The job's token, created when it is queued in this process."""
+        with self._lock:
+            token = self._tokens.get(job_id)
+            if token is None:
+                token = self._tokens[job_id] = CancelToken()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="JobWatchdog", daemon=True)
+                self._thread.start()
+        return token
+
+    def unregister(self, job_id: str, token: CancelToken | None = None):
+        """Forget the job; with `token`, only if it is still the registered one."""
+        with self._lock:
+            if token is None or self._tokens.get(job_id) is token:
+                self._tokens.pop(job_id, None)
+
+    def cancel(self, job_id: str, reason: str) -> bool:
+        """Cancel the job's work if it is queued or running here; False if it isn't."""
+        with self._lock:
+            token = self._tokens.pop(job_id, None)
+        if token is None:
+            return False
+        logging.info("Cancelling job %s (%s)", job_id, reason)
+        token.cancel(reason)
+        return True
+
+    def active(self) -> int:
+        with self._lock:
+            return len(self._tokens)
+
+    def check(self, now: float | None = None):
+        """One sweep over this process's jobs."""
+        now = time.time() if now is None else now
+        with self._lock:
+            job_ids = list(self._tokens)
+        for job_id in job_ids:
+            record = self.job_store.get(job_id)
+            if record is None:
+                self.cancel(job_id, "expired")
+            elif record.get("status") == "cancelled":
+                self.cancel(job_id, record.get("cancel_reason") or "cancelled")
+            elif self.abandon_after and now - record.get("last_seen", now) > self.abandon_after:
+                logging.warning("Job %s abandoned – no client for %.0fs", job_id, now - record["last_seen"])
+                self.on_abandoned(job_id)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception:
+                logging.exception("Job watchdog sweep failed")
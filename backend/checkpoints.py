@@ -0,0 +1,56 @@
+# backend/checkpoints.py
+"""
+Stage checkpoints and the retry policy for report jobs.
+
+Each pipeline stage's output is kept beside its job, so a failed job
+resumes from the first stage that didn't finish instead of starting over
+(re-upload, re-extraction, another o3-mini call, another daily usage slot):
+
+    resume    – extracted résumé text              (at submission)
+    roadmap   – roadmap JSON                       (the job's `roadmap` field)
+    intel     – the market research used, as JSON  (report Part 2)
+    prompt    – the built strategy prompt
+    markdown  – the complete strategy Markdown
+    report    – rendered HTML artifact             (backend/report_artifact.py)
+
+Text checkpoints are gzip blobs (`checkpoint.<name>.gz`) that expire with
+the job.  A failed stage is retried automatically JOB_AUTO_RETRIES times,
+JOB_RETRY_DELAY seconds later (doubling, jittered); POST /retry resumes an
+errored job by hand.  A job runs at most JOB_MAX_ATTEMPTS times in all,
+and no retry uses another daily usage slot.
+"""
+import gzip
+import os
+import random
+
+JOB_AUTO_RETRIES = int(os.getenv("JOB_AUTO_RETRIES", 1))
+JOB_RETRY_DELAY  = float(os.getenv("JOB_RETRY_DELAY", 30))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 4))
+
+
+def _blob_name(name: str) -> str:
+    return f"checkpoint.{name}.gz"
+
+
+def save(job_store, job_id: str, name: str, text: str) -> bool:
+    """Checkpoint `text` on the job; False if the job is gone."""
+    return job_store.put_blob(job_id, _blob_name(name), gzip.compress(text.encode("utf-8"), compresslevel=6, mtime=0))
+
+
+def load(job_store, job_id: str, name: str) -> str | None:
+    blob = job_store.get_blob(job_id, _blob_name(name))
+    return gzip.decompress(blob).decode("utf-8") if blob is not None else None
+
+
+def can_retry(record: dict) -> bool:
+    """A job can be resumed if it kept its inputs and has attempts left."""
+    return bool(record.get("inputs")) and record.get("attempts", 1) < JOB_MAX_ATTEMPTS
+
+
+def auto_retry_delay(record: dict) -> float | None:
+    """Seconds until the automatic retry of a job that just failed, or None if it gets none."""
+    attempts = record.get("attempts", 1)
+    if attempts > JOB_AUTO_RETRIES or not can_retry(record):
+        return None
+    base = JOB_RETRY_DELAY * 2 ** (attempts - 1)
+    return random.uniform(base / 2, base)
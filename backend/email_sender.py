@@ -1,10 +1,85 @@
 # backend/email_sender.py
 import os
+import time
 import smtplib
 import logging
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
+# Overridable so tests / benchmarks can point at a local SMTP stand-in
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 465))
+SMTP_SSL  = os.getenv("SMTP_SSL", "1") == "1"
+SMTP_NOOP_AFTER = 30   # seconds idle before a reused connection is health-checked
+
+
+def build_message(sender_email: str, recipient_email: str, subject: str, html_body: str) -> MIMEMultipart:
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = f"Goal-to-Market AI <{sender_email}>"
+    msg['To'] = recipient_email
+    msg.attach(MIMEText(html_body, 'html'))
+    return msg
+
+
+class SMTPConnection:
+    """
+    A reusable, authenticated SMTP session.  Connects and logs in on first
+    use, health-checks with NOOP after SMTP_NOOP_AFTER idle seconds and
+    reconnects once if the server has dropped the session.
+    """
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, use_ssl: bool = SMTP_SSL,
+                 sender_email: str | None = None, app_password: str | None = None, timeout: float = 30):
+        self.host, self.port, self.use_ssl, self.timeout = host, port, use_ssl, timeout
+        self.sender_email = sender_email or os.getenv("EMAIL_SENDER")
+        self.app_password = app_password if app_password is not None else os.getenv("GMAIL_APP_PASSWORD")
+        self._server = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        logging.info("Opening SMTP connection to %s:%s", self.host, self.port)
+        cls = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        server = cls(self.host, self.port, timeout=self.timeout)
+        if self.app_password:
+            server.login(self.sender_email, self.app_password)
+        self._server = server
+
+    def _healthy(self) -> bool:
+        if self._server is None:
+            return False
+        if time.monotonic() - self._last_used < SMTP_NOOP_AFTER:
+            return True
+        try:
+            return self._server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def send(self, recipient_email: str, subject: str, html_body: str):
+        if not self.sender_email:
+            raise ValueError("EMAIL_SENDER not set in .env file.")
+        msg = build_message(self.sender_email, recipient_email, subject, html_body)
+        for attempt in range(2):
+            if not self._healthy():
+                self.close()
+                self._connect()
+            try:
+                self._server.send_message(msg)
+                self._last_used = time.monotonic()
+                return
+            except smtplib.SMTPServerDisconnected:
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
 def send_email(recipient_email: str, subject: str, html_body: str):
     """
     Sends an HTML email using Gmail's SMTP server.
@@ -34,17 +109,13 @@ def send_email(recipient_email: str, subject: str, html_body: str):
     logging.info(f"HTML body length: {len(html_body)} characters")
 
     # Create message
-    msg = MIMEMultipart('alternative')
-    msg['Subject'] = subject
-    msg['From'] = f"Goal-to-Market AI <{sender_email}>"
-    msg['To'] = recipient_email
-    msg.attach(MIMEText(html_body, 'html'))
+    msg = build_message(sender_email, recipient_email, subject, html_body)
     
     logging.info("Message created successfully")
 
     try:
-        logging.info("Attempting to connect to smtp.gmail.com:465...")
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
+        logging.info(f"Attempting to connect to {SMTP_HOST}:{SMTP_PORT}...")
+        with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT) as server:
             logging.info("SMTP connection established")
             
             logging.info("Attempting to login...")
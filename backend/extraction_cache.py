@@ -0,0 +1,80 @@
+# backend/extraction_cache.py
+"""
+Content-addressed cache for résumé text extraction.
+
+Key = sha256(file type + uploaded bytes), so a resubmitted résumé skips
+pdfplumber / python-docx entirely no matter what it is called.  Negative
+results ("" – unreadable or too short) are cached too, so a bad file is
+rejected immediately on retry.
+
+Tier 1 is an in-memory LRU; tier 2 (optional, RESUME_CACHE_DIR) is a
+directory of small text files shared by all workers on the host.
+"""
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+from backend.ttl_cache import TTLCache
+
+RESUME_CACHE_ENTRIES = int(os.getenv("RESUME_CACHE_ENTRIES", 256))
+RESUME_CACHE_DIR     = os.getenv("RESUME_CACHE_DIR")          # unset ➜ memory only
+
+
+def content_key(data: bytes, ext: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(ext.lower().lstrip(".").encode())
+    digest.update(b"\0")
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, max_entries: int = RESUME_CACHE_ENTRIES, disk_dir: str | None = RESUME_CACHE_DIR):
+        self._memory = TTLCache(max_entries=max_entries)
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.txt"
+
+    def get(self, key: str) -> str | None:
+        """Cached text ("" for a cached failure) or None on a miss."""
+        text = self._memory.get(key)
+        if text is not None or not self.disk_dir:
+            return text
+        try:
+            text = self._disk_path(key).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        self._memory.set(key, text)
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        self._memory.set(key, text)
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(text, encoding="utf-8")
+            os.replace(tmp, path)   # atomic – readers never see a half-written file
+        except OSError as exc:
+            logging.warning("Could not write resume cache entry %s: %s", key[:12], exc)
+
+    def stats(self) -> dict:
+        return self._memory.stats()
+
+
+def cached_extract(cache: ExtractionCache, data: bytes, ext: str, extract) -> str:
+    """Return cached text for (`data`, `ext`), calling `extract()` on a miss."""
+    key = content_key(data, ext)
+    text = cache.get(key)
+    if text is not None:
+        logging.info("Resume extraction cache hit (%s, %d chars)", key[:12], len(text))
+        return text
+    text = extract()
+    cache.put(key, text)
+    return text
@@ -0,0 +1,153 @@
+# backend/extraction_pool.py
+"""
+Managed process pool for résumé extraction.
+
+pdfplumber/pdfminer parsing is pure-Python and CPU-bound; on a request
+thread it holds the GIL and stalls every other request in the worker.
+Here each extraction runs in a child process instead:
+
+    • wall-clock timeout per file – a hung child is killed and replaced
+    • memory cap – RLIMIT_AS in the child, and a child whose peak RSS
+      passes the cap exits after answering so it is recycled
+    • children are also recycled after EXTRACTION_MAX_TASKS files
+    • a crashed child surfaces as ExtractionFailed, never a 500
+
+EXTRACTION_WORKERS=0 runs extraction inline (dev / tests).
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+
+try:
+    import resource   # POSIX only
+except ImportError:   # pragma: no cover – Windows dev boxes
+    resource = None
+
+EXTRACTION_WORKERS       = int(os.getenv("EXTRACTION_WORKERS", 2))
+EXTRACTION_TIMEOUT       = float(os.getenv("EXTRACTION_TIMEOUT", 20))
+EXTRACTION_MAX_MEMORY_MB = int(os.getenv("EXTRACTION_MAX_MEMORY_MB", 768))
+EXTRACTION_MAX_TASKS     = int(os.getenv("EXTRACTION_MAX_TASKS", 100))
+
+
+class ExtractionTimeout(Exception):
+    """The file took longer than EXTRACTION_TIMEOUT seconds to parse."""
+
+
+class ExtractionFailed(Exception):
+    """The extraction process crashed (e.g. hit its memory cap)."""
+
+
+def _worker_main(conn, max_memory_mb: int, max_tasks: int):
+    """Child-process loop: receive (bytes, ext, max_chars), send back text."""
+    if resource and max_memory_mb:
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    from backend.resume_extractor import extract_text
+
+    for _ in range(max_tasks):
+        try:
+            data, ext, max_chars = conn.recv()
+        except EOFError:
+            return
+        conn.send(extract_text(data, ext, max_chars=max_chars))
+        # ru_maxrss is KiB on Linux – recycle a child that has grown too large
+        if resource and max_memory_mb and \
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss > max_memory_mb * 1024:
+            return
+
+
+class _Child:
+    def __init__(self, ctx, max_memory_mb, max_tasks):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, max_memory_mb, max_tasks), daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(1)
+        self.conn.close()
+
+
+class ExtractionPool:
+    def __init__(self, workers: int = EXTRACTION_WORKERS, timeout: float = EXTRACTION_TIMEOUT,
+                 max_memory_mb: int = EXTRACTION_MAX_MEMORY_MB, max_tasks: int = EXTRACTION_MAX_TASKS):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_memory_mb = max_memory_mb
+        self.max_tasks = max_tasks
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._ctx = multiprocessing.get_context(method)   # never plain fork from a threaded server
+        self._idle: queue.Queue[_Child | None] = queue.Queue()
+        for _ in range(workers):
+            self._idle.put(None)   # children start lazily on first use
+        self._children: set[_Child] = set()
+        self._lock = threading.Lock()
+        self.recycled = 0
+        atexit.register(self.shutdown)
+
+    def extract(self, data: bytes, ext: str, max_chars: int | None = None) -> str:
+        if self.workers <= 0:
+            from backend.resume_extractor import extract_text
+            return extract_text(data, ext, max_chars=max_chars)
+
+        try:
+            child = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise ExtractionTimeout("no extraction worker free")
+        try:
+            for attempt in range(2):
+                if child is None or not child.process.is_alive():
+                    child = self._spawn(child)
+                try:
+                    child.conn.send((data, ext, max_chars))
+                    answered = child.conn.poll(self.timeout)
+                    if answered:
+                        return child.conn.recv()
+                except (EOFError, OSError):
+                    answered = True   # pipe closed – the child is gone
+                if not answered:
+                    logging.warning("Extraction exceeded %.0fs – killing worker %s", self.timeout, child.process.pid)
+                    self._retire(child)
+                    child = None
+                    raise ExtractionTimeout(f"extraction exceeded {self.timeout:.0f}s")
+                child.process.join(0.5)
+                exitcode = child.process.exitcode
+                self._retire(child)
+                child = None
+                if exitcode != 0 or attempt:
+                    logging.warning("Extraction worker died (exit %s)", exitcode)
+                    raise ExtractionFailed("extraction worker crashed")
+                # exit 0: the child was recycling itself as we handed it work – retry once
+        finally:
+            self._idle.put(child)
+
+    def _spawn(self, old):
+        if old is not None:
+            self._retire(old)
+        child = _Child(self._ctx, self.max_memory_mb, self.max_tasks)
+        with self._lock:
+            self._children.add(child)
+        return child
+
+    def _retire(self, child):
+        child.kill()
+        with self._lock:
+            self._children.discard(child)
+            self.recycled += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            alive = sum(c.process.is_alive() for c in self._children)
+        return {"workers": self.workers, "alive": alive, "recycled": self.recycled}
+
+    def shutdown(self):
+        with self._lock:
+            children, self._children = list(self._children), set()
+        for child in children:
+            child.kill()
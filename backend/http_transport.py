@@ -0,0 +1,285 @@
+# backend/http_transport.py
+"""
+Shared HTTP transport for the OpenAI and Perplexity clients.
+
+    • one keep-alive connection pool per host (requests.Session for
+      Perplexity, an httpx.Client handed to the OpenAI SDK), sized to our
+      worker concurrency, so jobs stop paying a TCP+TLS handshake each
+    • jittered exponential backoff on 429 / 5xx / connection errors that
+      honours Retry-After
+    • a per-host concurrency limit; a streamed response keeps its slot
+      until its body is closed, not just until the headers arrive
+    • per-host counters for monitoring (`transport.stats()`)
+
+Read timeouts are *not* retried: the request may already be running (and
+billed) upstream.  A caller's `deadline` and `cancel` token bound the retry
+loop too: no retry (or backoff) runs past the deadline, each attempt's
+timeout is capped to the time left, and cancelling cuts a backoff short.  requests and httpx are imported, and the session built,
+on first use so a worker that hasn't called an API yet doesn't carry them.
+"""
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from backend.cancellation import CallCancelled
+
+HTTP_POOL_SIZE      = int(os.getenv("HTTP_POOL_SIZE", 8))
+HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", 4))
+HTTP_MAX_RETRIES    = int(os.getenv("HTTP_MAX_RETRIES", 3))
+HTTP_BACKOFF_BASE   = float(os.getenv("HTTP_BACKOFF_BASE", 1.0))
+HTTP_BACKOFF_MAX    = float(os.getenv("HTTP_BACKOFF_MAX", 30.0))
+RETRY_STATUSES      = {408, 409, 429, 500, 502, 503, 504}
+
+
+class RetryableError(Exception):
+    """Raised by an attempt function to ask `Transport.call` for another try."""
+
+    def __init__(self, reason: str, retry_after: float | None = None, result=None, original=None):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.result = result        # returned as-is once retries run out
+        self.original = original    # re-raised once retries run out
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After is either delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def remaining_timeout(timeout, deadline: float | None):
+    """`timeout` (seconds or a (connect, read) tuple) capped to what is left before `deadline`."""
+    if deadline is None:
+        return timeout
+    left = max(0.001, deadline - time.monotonic())
+    if timeout is None:
+        return left
+    if isinstance(timeout, tuple):
+        return tuple(left if t is None else min(t, left) for t in timeout)
+    return min(timeout, left)
+
+
+class _HostStats:
+    __slots__ = ("requests", "retries", "failures", "in_flight")
+
+    def __init__(self):
+        self.requests = self.retries = self.failures = self.in_flight = 0
+
+
+class Transport:
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, per_host_limit: int = HTTP_PER_HOST_LIMIT,
+                 max_retries: int = HTTP_MAX_RETRIES, backoff_base: float = HTTP_BACKOFF_BASE,
+                 backoff_max: float = HTTP_BACKOFF_MAX, sleep=time.sleep):
+        self.pool_size = pool_size
+        self.per_host_limit = per_host_limit
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._slots: dict[str, threading.BoundedSemaphore] = {}
+        self._stats: dict[str, _HostStats] = {}
+        self._session = None
+        self._adapter = None
+
+    # ---------------- building blocks ----------------
+    @property
+    def session(self):
+        """The pooled requests.Session, built on first use."""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, pool_block=False,
+                                          max_retries=0)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._adapter, self._session = adapter, session
+        return self._session
+
+    def httpx_client(self, timeout=None):
+        """Keep-alive httpx client for SDKs (OpenAI) that bring their own HTTP stack."""
+        import httpx
+
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        return httpx.Client(limits=limits, timeout=timeout)
+
+    def _host(self, host: str):
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+                self._stats[host] = _HostStats()
+            return self._slots[host], self._stats[host]
+
+    def _acquire(self, host: str):
+        slot, stats = self._host(host)
+        slot.acquire()
+        with self._lock:
+            stats.in_flight += 1
+
+    def _release(self, host: str):
+        slot, stats = self._host(host)
+        with self._lock:
+            stats.in_flight -= 1
+        slot.release()
+
+    @contextmanager
+    def host_slot(self, host: str):
+        """Hold one of the host's HTTP_PER_HOST_LIMIT concurrent-request slots."""
+        self._acquire(host)
+        try:
+            yield
+        finally:
+            self._release(host)
+
+    def _release_on_close(self, host: str, response):
+        """Hand the host slot to `response`: freed by its close() (or, failing that, by GC)."""
+        lock, released = threading.Lock(), []
+
+        def release():
+            with lock:
+                if released:
+                    return
+                released.append(True)
+            self._release(host)
+
+        close = response.close
+
+        def close_and_release(*args, **kwargs):
+            try:
+                return close(*args, **kwargs)
+            finally:
+                release()
+
+        response.close = close_and_release   # `with response:` calls it too
+        weakref.finalize(response, release)
+
+    def backoff_delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Full-jitter exponential backoff; a server-sent Retry-After wins."""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    # ---------------- retry loop ----------------
+    def call(self, host: str, attempt_fn, stream: bool = False, deadline: float | None = None, cancel=None):
+        """
+        Run `attempt_fn()` under the host's concurrency limit, retrying
+        while it raises RetryableError.  The slot is held during backoff so
+        a throttled host is not hit harder by other threads meanwhile.
+        Retrying stops once a backoff would end past `deadline` (a
+        time.monotonic() value); `cancel` (a CancelToken) ends a backoff
+        early with CallCancelled.
+
+        With `stream` the result is a response whose body is still to be
+        read: the slot then stays held until the result's close() – the
+        caller must close it (`with response:`).
+        """
+        _, stats = self._host(host)
+        self._acquire(host)
+        result = None
+        try:
+            result = self._retry(host, stats, attempt_fn, deadline, cancel)
+            return result
+        finally:
+            if stream and result is not None:
+                self._release_on_close(host, result)
+            else:
+                self._release(host)
+
+    def _retry(self, host, stats, attempt_fn, deadline, cancel):
+        for attempt in range(self.max_retries + 1):
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            with self._lock:
+                stats.requests += 1
+            try:
+                return attempt_fn()
+            except RetryableError as err:
+                delay = self.backoff_delay(attempt, err.retry_after)
+                out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+                if attempt == self.max_retries or out_of_time or (cancel is not None and cancel.is_set()):
+                    with self._lock:
+                        stats.failures += 1
+                    logging.warning("%s: giving up after %d attempts (%s)", host, attempt + 1, err)
+                    if cancel is not None and cancel.is_set():
+                        raise CallCancelled(cancel.reason) from err
+                    if err.result is not None:
+                        return err.result
+                    raise (err.original or err)
+                with self._lock:
+                    stats.retries += 1
+                logging.warning("%s: %s – retry %d/%d in %.1fs", host, err, attempt + 1, self.max_retries, delay)
+                if cancel is None:
+                    self._sleep(delay)
+                elif cancel.wait(delay):
+                    raise CallCancelled(cancel.reason) from err
+            except Exception:
+                with self._lock:
+                    stats.failures += 1
+                raise
+
+    def request(self, method: str, url: str, deadline: float | None = None, cancel=None, **kwargs):
+        """
+        requests-style call with pooling, retries and the per-host limit;
+        returns a requests.Response.  See `call` for `deadline` / `cancel`.
+        """
+        import requests
+
+        host = urlsplit(url).netloc
+        session = self.session
+        timeout = kwargs.pop("timeout", None)
+
+        def attempt():
+            try:
+                r = session.request(method, url, timeout=remaining_timeout(timeout, deadline), **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                # ConnectTimeout is a ConnectionError; ReadTimeout is not – never retried
+                raise RetryableError(f"connection error: {e}", original=e)
+            if r.status_code in RETRY_STATUSES:
+                retry_after = parse_retry_after(r.headers.get("Retry-After"))
+                r.content   # read the (small) error body so the connection returns to the pool
+                raise RetryableError(f"HTTP {r.status_code}", retry_after=retry_after, result=r)
+            return r
+
+        return self.call(host, attempt, stream=kwargs.get("stream", False), deadline=deadline, cancel=cancel)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    # ---------------- monitoring ----------------
+    def stats(self) -> dict:
+        pools = self._adapter.poolmanager.pools if self._adapter is not None else {}
+        conn_pools = [pools[key] for key in pools.keys()]
+        with self._lock:
+            hosts = {
+                host: {"requests": s.requests, "retries": s.retries, "failures": s.failures,
+                       "in_flight": s.in_flight, "limit": self.per_host_limit}
+                for host, s in self._stats.items()
+            }
+        return {
+            "pool_size": self.pool_size,
+            "pooled_hosts": len(conn_pools),
+            "connections_opened": sum(p.num_connections for p in conn_pools),
+            "requests_sent": sum(p.num_requests for p in conn_pools),
+            "hosts": hosts,
+        }
+
+
+transport = Transport()
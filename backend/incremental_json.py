@@ -0,0 +1,98 @@
+# backend/incremental_json.py
+"""
+Incremental JSON scanning for streamed model replies.
+
+`JSONStreamScanner(*patterns).feed(chunk)` returns `(path, raw)` for every
+value that finished inside the chunk and whose path matches a pattern,
+e.g. ("yearly_goals", "*") for each entry of the top-level yearly_goals
+list.  Objects, arrays and strings are reported; the scanner tracks only
+nesting, keys and string/escape state, so each character is looked at
+once and nothing is parsed twice – validating the raw slice is left to
+the caller (pydantic's JSON validator, backend/roadmap_parser.py).
+
+Text before the first "{" or "[" – a ```json fence, a stray preamble –
+and everything after the top-level value closes are ignored.
+"""
+import json
+
+
+class _Frame:
+    __slots__ = ("kind", "start", "path", "key", "expect_key", "index")
+
+    def __init__(self, kind: str, start: int, path: tuple):
+        self.kind = kind          # "{" or "["
+        self.start = start
+        self.path = path
+        self.key = None           # current key (objects)
+        self.expect_key = kind == "{"
+        self.index = 0            # current element (arrays)
+
+    def child(self) -> tuple:
+        return self.path + ((self.key,) if self.kind == "{" else (self.index,))
+
+
+class JSONStreamScanner:
+    def __init__(self, *patterns: tuple):
+        self.patterns = [tuple(p) for p in patterns]
+        self._text = ""
+        self._pos = 0
+        self._stack: list[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._done = False
+
+    def _watched(self, path: tuple) -> bool:
+        return any(len(p) == len(path) and all(w == "*" or w == x for w, x in zip(p, path))
+                   for p in self.patterns)
+
+    def feed(self, chunk: str) -> list[tuple[tuple, str]]:
+        """Scan `chunk`; returns the watched values it completed, in order."""
+        found = []
+        text = self._text = self._text + chunk
+        stack = self._stack
+        for i in range(self._pos, len(text)):
+            if self._done:
+                break
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    top = stack[-1]
+                    raw = text[self._string_start:i + 1]
+                    if top.expect_key:
+                        top.key = _decode_key(raw)
+                    elif self._watched(top.child()):
+                        found.append((top.child(), raw))
+                continue
+            if not stack:
+                if c in "{[":
+                    stack.append(_Frame(c, i, ()))
+                continue
+            top = stack[-1]
+            if c == '"':
+                self._in_string, self._string_start = True, i
+            elif c in "{[":
+                stack.append(_Frame(c, i, top.child()))
+            elif c in "}]":
+                frame = stack.pop()
+                if self._watched(frame.path):
+                    found.append((frame.path, text[frame.start:i + 1]))
+                self._done = not stack
+            elif c == ":":
+                top.expect_key = False
+            elif c == ",":
+                if top.kind == "{":
+                    top.expect_key, top.key = True, None
+                else:
+                    top.index += 1
+        self._pos = len(text)
+        return found
+
+
+def _decode_key(raw: str) -> str:
+    return raw[1:-1] if "\\" not in raw else json.loads(raw)
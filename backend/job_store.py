@@ -0,0 +1,495 @@
+# backend/job_store.py
+"""
+Job store: job_id ➜ record dict ({'status': ..., 'html': ..., ...}).
+
+Two backends share one small interface:
+    • MemoryJobStore – per-process LRU with TTL expiry (tests, single worker)
+    • SQLiteJobStore – WAL-mode SQLite file shared by every gunicorn worker
+
+Records are plain JSON-serialisable dicts.  `get`, `update` and `delete`
+are keyed lookups (O(1) in memory, primary-key lookups in SQLite).  Every
+write bumps the record's `version`, which `wait_for_change` blocks on so
+SSE / long-poll handlers wake on state transitions instead of polling.
+
+Large binary payloads (compressed report artifacts) are stored beside the
+record with `put_blob` / `get_blob`; they share the job's lifetime but are
+never loaded by `get`, so status reads stay small.
+
+`update_if` is a compare-and-set on the version, so of several workers
+racing for one transition (re-queue a job, send its e-mail) exactly one
+wins.  `claim` creates a job under a submission fingerprint atomically, or hands
+back the live job already holding it, so identical concurrent submissions
+share one pipeline run.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+JOB_STORE_BACKEND = os.getenv("JOB_STORE", "sqlite")         # memory | sqlite
+JOB_STORE_PATH    = os.getenv("JOB_STORE_PATH", "jobs.db")
+JOB_TTL_SECONDS   = int(os.getenv("JOB_TTL_SECONDS", 6 * 3600))
+JOB_STORE_MAX     = int(os.getenv("JOB_STORE_MAX_ENTRIES", 500))
+JOB_DEDUP_WINDOW  = int(os.getenv("JOB_DEDUP_WINDOW", 600))   # seconds a fingerprint keeps pointing at its job
+
+FINISHED_STATUSES = {"ready", "sent"}
+EVICTABLE_STATUSES = FINISHED_STATUSES | {"error", "cancelled"}   # no worker writes to these any more
+
+
+def _reusable(record: dict, reuse_finished: bool) -> bool:
+    status = record.get("status")
+    return status not in ("error", "cancelled") and (reuse_finished or status not in FINISHED_STATUSES)
+
+
+def _merge(record: dict, fields: dict) -> None:
+    # a cancelled job stays cancelled: a pipeline write racing the cancel can't revive it
+    if record.get("status") == "cancelled":
+        fields = {k: v for k, v in fields.items() if k != "status"}
+    record.update(fields)
+
+
+class JobStore:
+    """Interface shared by all backends."""
+
+    # how often a waiter re-reads the record in case another process wrote it
+    poll_interval: float | None = None
+
+    def __init__(self):
+        self._changed = threading.Condition()
+        self._generation = 0   # bumped by every _notify
+
+    def _notify(self):
+        with self._changed:
+            self._generation += 1
+            self._changed.notify_all()
+
+    def wait_for_change(self, job_id: str, version: int | None, timeout: float) -> dict | None:
+        """
+        Block until the record's version differs from `version` or `timeout`
+        elapses; returns the current record (None if unknown/expired).
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._changed:
+                generation = self._generation
+            # read outside the lock: waiters don't queue behind each other's
+            # reads, nor writers' _notify behind them; a write landing after
+            # this point changes the generation, so it can't be missed
+            record = self.get(job_id)
+            if record is None or record.get("version") != version:
+                return record
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return record
+            wait = remaining if self.poll_interval is None else min(remaining, self.poll_interval)
+            with self._changed:
+                self._changed.wait_for(lambda: self._generation != generation, wait)
+
+    def create(self, job_id: str, record: dict) -> None:
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> dict | None:
+        raise NotImplementedError
+
+    def update(self, job_id: str, **fields) -> dict | None:
+        """Merge `fields` into the record; returns the new record or None if unknown."""
+        raise NotImplementedError
+
+    def update_if(self, job_id: str, version: int | None, **fields) -> dict | None:
+        """
+        Compare-and-set: `update` only if the record is still at `version`
+        (nobody wrote it since it was read); returns the new record, or
+        None if it is unknown or has moved on.  Lets exactly one of several
+        workers claim a state transition.
+        """
+        raise NotImplementedError
+
+    def touch(self, job_id: str, **fields) -> bool:
+        """
+        Merge bookkeeping `fields` (e.g. last_seen) without bumping the
+        version, so waiters aren't woken; False if the job is unknown.
+        """
+        raise NotImplementedError
+
+    def delete(self, job_id: str) -> None:
+        raise NotImplementedError
+
+    def snapshot(self) -> dict[str, dict]:
+        """All live records – debug use only."""
+        raise NotImplementedError
+
+    def put_blob(self, job_id: str, name: str, data: bytes) -> bool:
+        """Attach `data` to a live job under `name`; False if the job is unknown."""
+        raise NotImplementedError
+
+    def claim(self, fingerprint: str, job_id: str, record: dict, window: float = JOB_DEDUP_WINDOW,
+              reuse_finished: bool = True) -> tuple[str, bool]:
+        """
+        Atomically: if a live, non-failed job holds `fingerprint` (claimed less
+        than `window` seconds ago) return (its id, False); otherwise create
+        `job_id` with `record`, point the fingerprint at it and return
+        (job_id, True).  With reuse_finished=False only a job still in
+        flight is shared.
+        """
+        raise NotImplementedError
+
+    def release(self, fingerprint: str, job_id: str) -> None:
+        """Forget the fingerprint if it still points at `job_id`."""
+        raise NotImplementedError
+
+    def get_blob(self, job_id: str, name: str) -> bytes | None:
+        raise NotImplementedError
+
+    def purge_expired(self) -> int:
+        raise NotImplementedError
+
+
+# ------------------------------------------------------------------
+# In-process backend
+# ------------------------------------------------------------------
+class MemoryJobStore(JobStore):
+    def __init__(self, ttl: float = JOB_TTL_SECONDS, max_entries: int = JOB_STORE_MAX):
+        super().__init__()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._blobs: dict[str, dict[str, bytes]] = {}
+        self._fingerprints: dict[str, tuple[str, float]] = {}   # fingerprint ➜ (job_id, expires_at)
+        self._lock = threading.Lock()
+
+    def _live(self, job_id):
+        item = self._data.get(job_id)
+        if item is None:
+            return None
+        expires_at, record = item
+        if expires_at <= time.time():
+            del self._data[job_id]
+            self._blobs.pop(job_id, None)
+            return None
+        self._data.move_to_end(job_id)
+        return record
+
+    def _insert(self, job_id, record):
+        self._data[job_id] = (time.time() + self.ttl, dict(record, version=1))
+        self._data.move_to_end(job_id)
+        if len(self._data) > self.max_entries:
+            # least recently used finished jobs go first; a queued or running
+            # job is never evicted, even if that leaves the store over its cap
+            finished = [job_id for job_id, (_, rec) in self._data.items()
+                        if rec.get("status") in EVICTABLE_STATUSES]
+            for evicted in finished[:len(self._data) - self.max_entries]:
+                del self._data[evicted]
+                self._blobs.pop(evicted, None)
+                logging.info("Job store full – evicted job %s", evicted)
+
+    def create(self, job_id, record):
+        with self._lock:
+            self._insert(job_id, record)
+        self._notify()
+
+    def claim(self, fingerprint, job_id, record, window=JOB_DEDUP_WINDOW, reuse_finished=True):
+        now = time.time()
+        with self._lock:
+            held = self._fingerprints.get(fingerprint)
+            if held is not None and held[1] > now:
+                other = self._live(held[0])
+                if other is not None and _reusable(other, reuse_finished):
+                    return held[0], False
+            if len(self._fingerprints) >= self.max_entries:
+                self._fingerprints = {fp: v for fp, v in self._fingerprints.items()
+                                      if v[1] > now and v[0] in self._data}
+            self._fingerprints[fingerprint] = (job_id, now + window)
+            self._insert(job_id, record)
+        self._notify()
+        return job_id, True
+
+    def release(self, fingerprint, job_id):
+        with self._lock:
+            if self._fingerprints.get(fingerprint, (None,))[0] == job_id:
+                del self._fingerprints[fingerprint]
+
+    def get(self, job_id):
+        with self._lock:
+            record = self._live(job_id)
+            return dict(record) if record is not None else None
+
+    def update(self, job_id, **fields):
+        return self._update(job_id, None, fields)
+
+    def update_if(self, job_id, version, **fields):
+        return self._update(job_id, version, fields, check=True)
+
+    def _update(self, job_id, version, fields, check=False):
+        with self._lock:
+            record = self._live(job_id)
+            if record is None or (check and record.get("version") != version):
+                return None
+            _merge(record, fields)
+            record["version"] = record.get("version", 0) + 1
+            self._data[job_id] = (time.time() + self.ttl, record)
+            record = dict(record)
+        self._notify()
+        return record
+
+    def touch(self, job_id, **fields):
+        with self._lock:
+            record = self._live(job_id)
+            if record is None:
+                return False
+            record.update(fields)
+            return True
+
+    def delete(self, job_id):
+        with self._lock:
+            self._data.pop(job_id, None)
+            self._blobs.pop(job_id, None)
+        self._notify()
+
+    def snapshot(self):
+        self.purge_expired()
+        with self._lock:
+            return {job_id: dict(record) for job_id, (_, record) in self._data.items()}
+
+    def put_blob(self, job_id, name, data):
+        with self._lock:
+            if self._live(job_id) is None:
+                return False
+            self._blobs.setdefault(job_id, {})[name] = bytes(data)
+            return True
+
+    def get_blob(self, job_id, name):
+        with self._lock:
+            if self._live(job_id) is None:
+                return None
+            return self._blobs.get(job_id, {}).get(name)
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, (exp, _) in self._data.items() if exp <= now]
+            for job_id in expired:
+                del self._data[job_id]
+                self._blobs.pop(job_id, None)
+            self._fingerprints = {fp: v for fp, v in self._fingerprints.items()
+                                  if v[1] > now and v[0] in self._data}
+        return len(expired)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+# ------------------------------------------------------------------
+# Shared backend (all workers on one host)
+# ------------------------------------------------------------------
+class SQLiteJobStore(JobStore):
+    PURGE_EVERY = 50   # writes between expiry sweeps
+    poll_interval = 0.5  # writes from other workers are only seen by re-reading
+
+    def __init__(self, path: str = JOB_STORE_PATH, ttl: float = JOB_TTL_SECONDS,
+                 max_entries: int = JOB_STORE_MAX):
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_expires ON jobs(expires_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " job_id TEXT NOT NULL,"
+                " name TEXT NOT NULL,"
+                " data BLOB NOT NULL,"
+                " PRIMARY KEY (job_id, name))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fingerprints ("
+                " fingerprint TEXT PRIMARY KEY,"
+                " job_id TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _after_write(self):
+        self._notify()
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def create(self, job_id, record):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO jobs (job_id, data, expires_at) VALUES (?, ?, ?)",
+            (job_id, json.dumps(dict(record, version=1)), time.time() + self.ttl),
+        )
+        self._after_write()
+
+    def get(self, job_id):
+        row = self._conn().execute(
+            "SELECT data FROM jobs WHERE job_id = ? AND expires_at > ?",
+            (job_id, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def claim(self, fingerprint, job_id, record, window=JOB_DEDUP_WINDOW, reuse_finished=True):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")   # one claimant at a time across all workers
+        try:
+            row = conn.execute(
+                "SELECT f.job_id, j.data FROM fingerprints f JOIN jobs j ON j.job_id = f.job_id"
+                " WHERE f.fingerprint = ? AND f.expires_at > ? AND j.expires_at > ?",
+                (fingerprint, now, now),
+            ).fetchone()
+            if row is not None and _reusable(json.loads(row[1]), reuse_finished):
+                conn.execute("COMMIT")
+                return row[0], False
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, data, expires_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(dict(record, version=1)), now + self.ttl),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (fingerprint, job_id, expires_at) VALUES (?, ?, ?)",
+                (fingerprint, job_id, now + window),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._after_write()
+        return job_id, True
+
+    def release(self, fingerprint, job_id):
+        self._conn().execute("DELETE FROM fingerprints WHERE fingerprint = ? AND job_id = ?", (fingerprint, job_id))
+
+    def update(self, job_id, **fields):
+        return self._update(job_id, None, fields)
+
+    def update_if(self, job_id, version, **fields):
+        return self._update(job_id, version, fields, check=True)
+
+    def _update(self, job_id, version, fields, check=False):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")   # read-check-write as one step across workers
+        try:
+            row = conn.execute(
+                "SELECT data FROM jobs WHERE job_id = ? AND expires_at > ?",
+                (job_id, time.time()),
+            ).fetchone()
+            record = json.loads(row[0]) if row is not None else None
+            if record is None or (check and record.get("version") != version):
+                conn.execute("COMMIT")
+                return None
+            _merge(record, fields)
+            record["version"] = record.get("version", 0) + 1
+            conn.execute(
+                "UPDATE jobs SET data = ?, expires_at = ? WHERE job_id = ?",
+                (json.dumps(record), time.time() + self.ttl, job_id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._after_write()
+        return record
+
+    def touch(self, job_id, **fields):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT data FROM jobs WHERE job_id = ? AND expires_at > ?",
+                (job_id, time.time()),
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET data = ? WHERE job_id = ?",
+                             (json.dumps({**json.loads(row[0]), **fields}), job_id))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row is not None
+
+    def delete(self, job_id):
+        conn = self._conn()
+        conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        conn.execute("DELETE FROM blobs WHERE job_id = ?", (job_id,))
+        self._notify()
+
+    def put_blob(self, job_id, name, data):
+        cur = self._conn().execute(
+            "INSERT OR REPLACE INTO blobs (job_id, name, data)"
+            " SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM jobs WHERE job_id = ? AND expires_at > ?)",
+            (job_id, name, sqlite3.Binary(data), job_id, time.time()),
+        )
+        return cur.rowcount > 0
+
+    def get_blob(self, job_id, name):
+        row = self._conn().execute(
+            "SELECT b.data FROM blobs b JOIN jobs j ON j.job_id = b.job_id"
+            " WHERE b.job_id = ? AND b.name = ? AND j.expires_at > ?",
+            (job_id, name, time.time()),
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def snapshot(self):
+        rows = self._conn().execute(
+            "SELECT job_id, data FROM jobs WHERE expires_at > ? ORDER BY expires_at",
+            (time.time(),),
+        ).fetchall()
+        return {job_id: json.loads(data) for job_id, data in rows}
+
+    def purge_expired(self):
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (time.time(),)).rowcount
+        # keep at most `max_entries` rows – bounds disk and page-cache footprint –
+        # by dropping the oldest finished jobs; queued/running ones are never evicted
+        excess = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] - self.max_entries
+        if excess > 0:
+            statuses = sorted(EVICTABLE_STATUSES)
+            removed += conn.execute(
+                "DELETE FROM jobs WHERE job_id IN ("
+                " SELECT job_id FROM jobs"
+                f" WHERE json_extract(data, '$.status') IN ({', '.join('?' * len(statuses))})"
+                " ORDER BY expires_at LIMIT ?)",
+                (*statuses, excess),
+            ).rowcount
+        if removed:
+            conn.execute("DELETE FROM blobs WHERE job_id NOT IN (SELECT job_id FROM jobs)")
+        conn.execute("DELETE FROM fingerprints WHERE expires_at <= ? OR job_id NOT IN (SELECT job_id FROM jobs)",
+                     (time.time(),))
+        if removed:
+            logging.info("Job store purged %d expired/overflow jobs", removed)
+        return removed
+
+    def __len__(self):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM jobs WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+
+def create_job_store(backend: str = JOB_STORE_BACKEND) -> JobStore:
+    """Build the store selected by the JOB_STORE env var."""
+    if backend == "memory":
+        return MemoryJobStore()
+    if backend == "sqlite":
+        logging.info("Using SQLite job store at %s", JOB_STORE_PATH)
+        return SQLiteJobStore()
+    raise ValueError(f"Unknown JOB_STORE backend: {backend}")
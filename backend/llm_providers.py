@@ -0,0 +1,422 @@
+# backend/llm_providers.py
+"""
+Provider abstraction over the LLM clients, with deadlines, hedging and
+model fallback.
+
+    OpenAIProvider      – one OpenAI model (backend/openai_client.py)
+    PerplexityProvider  – one Perplexity model (backend/perplexity_client.py)
+    LocalProvider       – deterministic and in-process, for tests and offline runs
+
+`LLMChain.complete(prompt, ...)` walks an ordered fallback chain of
+providers under one overall deadline:
+
+    • every attempt gets min(provider timeout, time left) – the caller stops
+      waiting at the deadline even if the HTTP call is still running
+    • hedging: once a provider has LLM_HEDGE_MIN_SAMPLES recorded latencies,
+      an attempt still unanswered at its LLM_HEDGE_PERCENTILE latency is sent
+      a second time and the first answer wins.  A streamed call is raced on
+      time-to-first-chunk; the loser is cancelled when the winner starts
+    • with `upstream` (the app's JobScheduler) every attempt holds its own
+      upstream slot until it really finishes: a hedge is only sent if a
+      slot is free right now, and an attempt the chain stopped waiting for
+      (hedge loser, timeout, cancel) keeps its slot – and is counted as
+      abandoned – until its HTTP call returns
+    • a timeout or error moves on to the next provider.  Text already
+      streamed from the failed one is discarded through `on_restart()`
+    • `cancel` (a CancelToken, backend/cancellation.py) stops the chain:
+      the caller returns at once, every attempt's token is set and a
+      streaming OpenAI or Perplexity response is closed
+"""
+import collections
+import logging
+import math
+import os
+import queue
+import threading
+import time
+
+from backend import metrics
+from backend.cancellation import CallCancelled, CancelToken
+
+OPENAI_MODEL                 = os.getenv("OPENAI_MODEL", "o3-mini")
+OPENAI_FALLBACK_MODELS       = os.getenv("OPENAI_FALLBACK_MODELS", "gpt-4o-mini")
+OPENAI_TIMEOUT               = float(os.getenv("OPENAI_TIMEOUT", 120))
+OPENAI_STREAM                = os.getenv("OPENAI_STREAM", "1") == "1"   # stream when the caller takes on_text
+PERPLEXITY_RESEARCH_FALLBACK = os.getenv("PERPLEXITY_RESEARCH_FALLBACK", "sonar-pro")
+PERPLEXITY_RESEARCH_TIMEOUT  = float(os.getenv("PERPLEXITY_RESEARCH_TIMEOUT", 300))
+PERPLEXITY_STRATEGY_FALLBACK = os.getenv("PERPLEXITY_STRATEGY_FALLBACK", "sonar")
+PERPLEXITY_STRATEGY_TIMEOUT  = float(os.getenv("PERPLEXITY_STRATEGY_TIMEOUT", 150))
+LLM_HEDGE_PERCENTILE         = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))   # 0 disables hedging
+LLM_HEDGE_MIN_SAMPLES        = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+LATENCY_WINDOW               = 200   # recent successful calls kept per provider
+
+llm_calls = metrics.registry.counter(
+    "llm_calls_total", "LLM attempts by provider and outcome (ok, error, timeout, cancelled).",
+    ("provider", "outcome"))
+llm_hedges = metrics.registry.counter("llm_hedges_total", "Hedged (duplicate) LLM requests sent.", ("provider",))
+llm_fallbacks = metrics.registry.counter(
+    "llm_fallbacks_total", "Times a provider failed and the chain moved on.", ("provider",))
+
+_abandoned = 0
+_abandoned_lock = threading.Lock()
+
+
+def _count_abandoned(delta: int):
+    global _abandoned
+    with _abandoned_lock:
+        _abandoned += delta
+
+
+def abandoned_attempts() -> int:
+    """Attempts still running after their chain stopped waiting for them."""
+    return _abandoned
+
+
+metrics.registry.gauge("llm_attempts_abandoned", "LLM attempts still running after their chain returned.",
+                       abandoned_attempts)
+
+
+class DeadlineExceeded(TimeoutError):
+    """No answer within the attempt's (or the chain's) deadline."""
+
+
+def model_list(value: str) -> list[str]:
+    """"a, b" → ["a", "b"]; empty entries dropped."""
+    return [m.strip() for m in (value or "").split(",") if m.strip()]
+
+
+# ------------------------------------------------------------------
+# Providers
+# ------------------------------------------------------------------
+class Provider:
+    """One model behind one API.  `complete` raises on failure."""
+    name = "provider"
+    timeout = 60.0
+
+    def complete(self, prompt: str, on_text=None, timeout: float | None = None,
+                 cancel: threading.Event | None = None) -> str:
+        raise NotImplementedError
+
+
+class OpenAIProvider(Provider):
+    def __init__(self, model: str = OPENAI_MODEL, timeout: float = OPENAI_TIMEOUT, stream: bool = OPENAI_STREAM):
+        self.model = model
+        self.name = f"openai:{model}"
+        self.timeout = timeout
+        self.stream = stream
+
+    def complete(self, prompt, on_text=None, timeout=None, cancel=None):
+        # client modules are imported on first use, so LocalProvider chains need no API keys
+        from backend.openai_client import chat_completion
+        if cancel is not None and cancel.is_set():
+            raise CallCancelled(self.name)
+        streamed = on_text is not None and self.stream
+        if streamed:
+            text = chat_completion(prompt, model=self.model, timeout=timeout or self.timeout,
+                                   on_text=on_text, cancel=cancel)
+        else:
+            # a non-streamed call can't be interrupted, so the remaining budget bounds it instead
+            text = chat_completion(prompt, model=self.model, timeout=timeout or self.timeout)
+            if cancel is not None and cancel.is_set():
+                raise CallCancelled(self.name)
+        if not text:
+            raise ValueError(f"{self.model} returned an empty reply")
+        if on_text is not None and not streamed:   # hand the whole reply over at once
+            on_text(text)
+        return text
+
+
+class PerplexityProvider(Provider):
+    def __init__(self, model: str, timeout: float = PERPLEXITY_STRATEGY_TIMEOUT, user_message: str | None = None):
+        self.model = model
+        self.name = f"perplexity:{model}"
+        self.timeout = timeout
+        self.user_message = user_message
+
+    def complete(self, prompt, on_text=None, timeout=None, cancel=None):
+        from backend.perplexity_client import call_perplexity_api, REPORT_USER_MESSAGE
+        sink = None
+        if on_text is not None:
+            def sink(delta):
+                if cancel is not None and cancel.is_set():
+                    raise CallCancelled(self.name)   # aborts the stream and drops the connection
+                on_text(delta)
+        return call_perplexity_api(prompt, on_text=sink, model=self.model,
+                                   user_message=self.user_message or REPORT_USER_MESSAGE,
+                                   timeout=timeout or self.timeout, cancel=cancel)
+
+
+class LocalProvider(Provider):
+    """
+    Deterministic stand-in: `reply` is a string or `reply(prompt) -> str`.
+    `latency` is the delay before the first chunk, `error` an exception to
+    raise instead of answering; `chunks` > 1 streams the reply in pieces.
+    """
+
+    def __init__(self, reply="", name: str = "local", latency: float = 0.0, error: Exception | None = None,
+                 chunks: int = 1, chunk_delay: float = 0.0, timeout: float = 30.0):
+        self.reply = reply
+        self.name = name
+        self.latency = latency
+        self.error = error
+        self.chunks = max(1, chunks)
+        self.chunk_delay = chunk_delay
+        self.timeout = timeout
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def complete(self, prompt, on_text=None, timeout=None, cancel=None):
+        with self._lock:
+            self.calls += 1
+        cancel = cancel or threading.Event()
+        if cancel.wait(self.latency):
+            raise CallCancelled(self.name)
+        if self.error is not None:
+            raise self.error
+        text = self.reply(prompt) if callable(self.reply) else self.reply
+        if on_text is not None:
+            size = math.ceil(len(text) / self.chunks) or 1
+            for i in range(0, len(text), size):
+                if cancel.is_set():
+                    raise CallCancelled(self.name)
+                on_text(text[i:i + size])
+                if self.chunk_delay and i + size < len(text):
+                    cancel.wait(self.chunk_delay)
+        return text
+
+
+# ------------------------------------------------------------------
+# Chain
+# ------------------------------------------------------------------
+class _Race:
+    """Lets only the first attempt that streams text reach `on_text`."""
+
+    def __init__(self, on_text):
+        self.on_text = on_text
+        self.cancels: list[CancelToken] = []
+        self.owner = None
+        self.first_chunk_at: float | None = None
+        self._lock = threading.Lock()
+
+    def sink(self, index: int):
+        def forward(delta):
+            with self._lock:
+                if self.owner is None:
+                    self.owner = index
+                    self.first_chunk_at = time.monotonic()
+                    for i, ev in enumerate(self.cancels):
+                        if i != index:
+                            ev.set()
+                if self.owner != index:
+                    raise CallCancelled("lost the race")
+            self.on_text(delta)
+        return forward
+
+
+class _Attempts:
+    """
+    Upstream slots and liveness of one _attempt's threads.  Each thread
+    releases its own slot when its call returns; the ones still running
+    when the chain stops waiting are counted as abandoned until then.
+    """
+
+    def __init__(self, upstream):
+        self.upstream = upstream
+        self.running = 0
+        self.detached = False
+        self._lock = threading.Lock()
+
+    def acquire(self, cancel, timeout: float) -> bool:
+        return self.upstream is None or self.upstream.acquire_upstream(cancel, timeout=max(0.0, timeout))
+
+    def try_acquire(self) -> bool:
+        return self.upstream is None or self.upstream.try_acquire_upstream()
+
+    def started(self):
+        with self._lock:
+            self.running += 1
+
+    def finished(self):
+        with self._lock:
+            self.running -= 1
+            abandoned = self.detached
+        if abandoned:
+            _count_abandoned(-1)
+        if self.upstream is not None:
+            self.upstream.release_upstream()
+
+    def detach(self):
+        """The chain stopped waiting; whatever still runs is abandoned."""
+        with self._lock:
+            self.detached = True
+            running = self.running
+        if running:
+            _count_abandoned(running)
+
+
+class LLMChain:
+    def __init__(self, providers: list[Provider], name: str = "llm", hedge: bool = True,
+                 hedge_percentile: float = LLM_HEDGE_PERCENTILE, hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES):
+        if not providers:
+            raise ValueError("an LLM chain needs at least one provider")
+        self.providers = providers
+        self.name = name
+        self.hedge = hedge and hedge_percentile > 0
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._latencies: dict[tuple[str, bool], collections.deque] = {}
+        self._lock = threading.Lock()
+
+    # ---------------- latency tracking ----------------
+    def _record(self, provider: Provider, streamed: bool, seconds: float):
+        with self._lock:
+            samples = self._latencies.setdefault((provider.name, streamed), collections.deque(maxlen=LATENCY_WINDOW))
+            samples.append(seconds)
+
+    def hedge_delay(self, provider: Provider, streamed: bool) -> float | None:
+        """Seconds after which a duplicate request is sent; None until there is enough history."""
+        if not self.hedge:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies.get((provider.name, streamed), ()))
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return samples[max(0, math.ceil(self.hedge_percentile / 100 * len(samples)) - 1)]
+
+    # ---------------- calls ----------------
+    def complete(self, prompt: str, on_text=None, on_restart=None, deadline: float | None = None,
+                 cancel: CancelToken | None = None, upstream=None) -> str:
+        """
+        First successful answer along the chain.  `deadline` is a
+        time.monotonic() value; by default each provider gets its own timeout.
+        Raises CallCancelled as soon as `cancel` is set.  `upstream` limits
+        concurrent attempts (acquire_upstream / try_acquire_upstream /
+        release_upstream, backend/scheduler.py).
+        """
+        if deadline is None:
+            deadline = time.monotonic() + sum(p.timeout for p in self.providers)
+        streamed_any = False
+        last_error: BaseException | None = None
+        for provider in self.providers:
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            if time.monotonic() >= deadline:
+                break
+            if streamed_any:
+                if on_restart is None:
+                    break   # the caller can't take the text back – surface the error
+                on_restart()
+            race = _Race(on_text) if on_text is not None else None
+            try:
+                return self._attempt(provider, prompt, race, min(deadline, time.monotonic() + provider.timeout),
+                                     cancel, upstream)
+            except Exception as exc:
+                if cancel is not None and cancel.is_set():
+                    raise CallCancelled(cancel.reason) from exc
+                last_error = exc
+                streamed_any = race is not None and race.owner is not None
+                llm_fallbacks.inc(provider=provider.name)
+                logging.warning("%s: %s failed (%s: %s)", self.name, provider.name, type(exc).__name__, exc)
+        raise last_error or DeadlineExceeded(f"{self.name}: deadline passed before any provider answered")
+
+    def _attempt(self, provider: Provider, prompt: str, race: _Race | None, deadline: float,
+                 cancel: CancelToken | None = None, upstream=None) -> str:
+        results: queue.Queue = queue.Queue()
+        cancels = race.cancels if race else []
+        started = time.monotonic()
+        # a cancelled job wakes the wait below; the attempts are stopped there
+        unlink = cancel.on_cancel(lambda: results.put((None, None, CallCancelled(cancel.reason)))) \
+            if cancel is not None else (lambda: None)
+        attempts = _Attempts(upstream)
+        try:
+            return self._wait(provider, prompt, race, deadline, results, cancels, started, cancel, attempts)
+        finally:
+            unlink()
+            attempts.detach()
+
+    def _wait(self, provider, prompt, race, deadline, results, cancels, started, job_cancel, attempts) -> str:
+        streamed = race is not None
+
+        def run(index, cancel):
+            try:
+                text = provider.complete(prompt, on_text=race.sink(index) if race else None,
+                                         timeout=max(0.1, deadline - time.monotonic()), cancel=cancel)
+                results.put((index, text, None))
+            except BaseException as exc:
+                results.put((index, None, exc))
+            finally:
+                attempts.finished()
+
+        def launch():
+            cancel = CancelToken()
+            cancels.append(cancel)
+            attempts.started()
+            threading.Thread(target=run, args=(len(cancels) - 1, cancel), daemon=True,
+                             name=f"{self.name}-{len(cancels) - 1}").start()
+
+        if not attempts.acquire(job_cancel, deadline - time.monotonic()):
+            llm_calls.inc(provider=provider.name, outcome="timeout")
+            raise DeadlineExceeded(f"{provider.name}: no upstream slot within {deadline - started:.0f}s")
+        launch()
+        hedge_at = self.hedge_delay(provider, streamed)
+        pending, errors = 1, []
+        while pending:
+            now = time.monotonic()
+            wait = deadline - now
+            if hedge_at is not None:
+                wait = min(wait, started + hedge_at - now)
+            try:
+                index, text, exc = results.get(timeout=max(0.0, wait))
+            except queue.Empty:
+                if time.monotonic() >= deadline:
+                    for ev in cancels:
+                        ev.set()
+                    llm_calls.inc(provider=provider.name, outcome="timeout")
+                    raise DeadlineExceeded(f"{provider.name}: no answer within {deadline - started:.0f}s")
+                hedge_at = None
+                # a stream that already started isn't hedged, and a hedge never waits for a slot
+                if (race is None or race.owner is None) and attempts.try_acquire():
+                    logging.info("%s: %s slow – sending a hedged request", self.name, provider.name)
+                    llm_hedges.inc(provider=provider.name)
+                    launch()
+                    pending += 1
+                continue
+            if index is None:   # the caller cancelled the whole chain
+                for ev in cancels:
+                    ev.set()
+                llm_calls.inc(provider=provider.name, outcome="cancelled")
+                raise exc
+            pending -= 1
+            if exc is None:
+                for ev in cancels:
+                    ev.set()
+                elapsed = (race.first_chunk_at if race and race.first_chunk_at else time.monotonic()) - started
+                self._record(provider, streamed, elapsed)
+                llm_calls.inc(provider=provider.name, outcome="ok")
+                return text
+            cancelled = isinstance(exc, CallCancelled)
+            llm_calls.inc(provider=provider.name, outcome="cancelled" if cancelled else "error")
+            if not cancelled:
+                errors.append(exc)
+        raise errors[0] if errors else CallCancelled(provider.name)
+
+
+# ------------------------------------------------------------------
+# The app's three chains
+# ------------------------------------------------------------------
+def roadmap_chain(hedge: bool = True) -> LLMChain:
+    models = [OPENAI_MODEL] + model_list(OPENAI_FALLBACK_MODELS)
+    return LLMChain([OpenAIProvider(m) for m in models], name="roadmap", hedge=hedge)
+
+
+def research_chain(model: str, user_message: str) -> LLMChain:
+    models = [model] + model_list(PERPLEXITY_RESEARCH_FALLBACK)
+    # deep research is slow *and* expensive, and its result is cached – fall back, don't hedge
+    return LLMChain([PerplexityProvider(m, PERPLEXITY_RESEARCH_TIMEOUT, user_message) for m in models],
+                    name="research", hedge=False)
+
+
+def strategy_chain(model: str, hedge: bool = True) -> LLMChain:
+    models = [model] + model_list(PERPLEXITY_STRATEGY_FALLBACK)
+    return LLMChain([PerplexityProvider(m, PERPLEXITY_STRATEGY_TIMEOUT) for m in models], name="strategy",
+                    hedge=hedge)
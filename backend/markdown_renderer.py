@@ -0,0 +1,104 @@
+# backend/markdown_renderer.py
+"""
+Incremental Markdown → HTML rendering for streamed reports.
+
+Text is fed in as it arrives.  A section (a heading plus everything up to
+the next heading) is rendered exactly once, as soon as the next heading
+shows up, so the cost of a streamed report stays linear instead of
+re-rendering the whole document on every chunk.  Scanning is linear too:
+each feed only searches the new text (plus a few characters a tag or
+heading marker may straddle) for headings and <think> tags.
+"""
+import re
+
+
+HEADING_RE = re.compile(r"^#{1,6} ", re.MULTILINE)
+THINK_RE   = re.compile(r"<think>.*?</think>\s*", re.DOTALL)   # sonar reasoning preamble
+THINK_OPEN = "<think>"
+THINK_END_RE = re.compile(r"</think>\s*")
+LOOKBEHIND = len("</think>") - 1   # longest tag / heading marker that may straddle two chunks
+
+
+class IncrementalMarkdownRenderer:
+    def __init__(self):
+        self._pending = ""                # text not yet rendered
+        self._think_at: int | None = None  # start of an unclosed <think> in _pending
+        self._scanned = 0                 # _pending before this holds no unseen heading
+        self._trim = False                # a block just closed: drop the whitespace after it
+        self._html: list[str] = []        # rendered sections, in order
+        self._source: list[str] = []      # their Markdown, kept for the report artifact
+        self.chars = 0                    # raw characters received
+
+    @property
+    def sections(self) -> int:
+        return len(self._html)
+
+    def feed(self, text: str) -> list[str]:
+        """Add streamed text; returns HTML for any sections completed by it."""
+        self.chars += len(text)
+        if self._trim:   # the rest of `</think>\s*`, as the one-shot regex would take it
+            text = text.lstrip()
+            self._trim = not text
+        tags_from = max(0, len(self._pending) - LOOKBEHIND)
+        self._pending += text
+        if self._strip_reasoning(tags_from):   # still inside the reasoning block
+            return []
+
+        starts = [m.start() for m in HEADING_RE.finditer(self._pending, self._scanned)]
+        self._scanned = max(0, len(self._pending) - LOOKBEHIND)
+        # the last heading's section is still open – render everything before it
+        cut = starts[-1] if starts else 0
+        if cut == 0:
+            return []
+        done, self._pending = self._pending[:cut], self._pending[cut:]
+        self._scanned = max(0, self._scanned - cut)
+        self._source.append(done)
+        new = [_render(chunk) for chunk in _split_sections(done)]
+        self._html.extend(new)
+        return new
+
+    def _strip_reasoning(self, start: int) -> bool:
+        """Cut <think>…</think> blocks found from `start` on; True while one is still open."""
+        while True:
+            if self._think_at is None:
+                found = self._pending.find(THINK_OPEN, start)
+                if found < 0:
+                    return False
+                self._think_at = found
+            end = THINK_END_RE.search(self._pending, max(start, self._think_at + len(THINK_OPEN)))
+            if end is None:
+                return True
+            self._trim = end.end() == len(self._pending)   # more whitespace may follow
+            self._pending = self._pending[:self._think_at] + self._pending[end.end():]
+            start, self._think_at = self._think_at, None
+            self._scanned = min(self._scanned, start)
+
+    def html(self) -> str:
+        """HTML for the completed sections only (the partial preview)."""
+        return "\n".join(self._html)
+
+    def finish(self) -> str:
+        """Render whatever is left and return the full document."""
+        tail = THINK_RE.sub("", self._pending).strip()
+        self._pending = ""
+        if tail:
+            self._source.append(tail + "\n")
+            self._html.append(_render(tail))
+        return self.html()
+
+    def source(self) -> str:
+        """The Markdown rendered so far (reasoning blocks removed)."""
+        return "".join(self._source)
+
+
+def _render(text: str) -> str:
+    import markdown   # first use, not worker boot (backend/preload.py)
+    return markdown.markdown(text)
+
+
+def _split_sections(text: str) -> list[str]:
+    starts = [m.start() for m in HEADING_RE.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    bounds = starts + [len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:]) if text[a:b].strip()]
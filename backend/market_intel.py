@@ -0,0 +1,135 @@
+# backend/market_intel.py
+"""
+Shareable location / role-family market-intelligence cache.
+
+The "Local Market Intelligence" section and the Stat-Dump are the same for
+every "Network Engineer, Tucson, AZ" request, so they are researched once
+per (location, role family), cached with a TTL and freshness metadata, and
+fed to the personalised strategy stage as context.
+
+Tier 1 is an in-memory TTL cache; tier 2 (optional, MARKET_INTEL_DIR) is a
+directory of JSON files shared by all workers on the host.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from backend.ttl_cache import TTLCache
+
+MARKET_INTEL_TTL     = int(os.getenv("MARKET_INTEL_TTL", 3 * 24 * 3600))
+MARKET_INTEL_ENTRIES = int(os.getenv("MARKET_INTEL_ENTRIES", 256))
+MARKET_INTEL_DIR     = os.getenv("MARKET_INTEL_DIR")              # unset ➜ memory only
+
+# words that say nothing about *which* job market to research
+_FILLER = {
+    "a", "an", "the", "my", "own", "be", "become", "becoming", "get", "land", "landing",
+    "secure", "earn", "achieve", "transition", "move", "into", "to", "as", "role", "position",
+    "job", "career", "work", "working", "promoted", "promotion", "senior", "sr", "junior", "jr",
+    "lead", "principal", "head", "level", "year", "years", "i", "want", "would", "like",
+}
+# everything after one of these is employer / context, not the role
+_CONTEXT_SPLIT = re.compile(r"\b(?:at|in|with|for|by|within|while|across|using|where|who|and)\b")
+
+
+def role_family(goal: str) -> str:
+    """
+    Reduce a free-text five-year goal to a short role-family label,
+    e.g. "Become a Senior Network Engineer at Raytheon" → "network engineer".
+    """
+    text = re.sub(r"[^a-z0-9+#/ ]+", " ", goal.casefold())
+    head = _CONTEXT_SPLIT.split(text, maxsplit=1)[0]
+    words = [w for w in head.split() if w not in _FILLER and not w.isdigit()]
+    if not words:   # goal was all filler – fall back to its first content words
+        words = [w for w in text.split() if w not in _FILLER][:4]
+    return " ".join(words[:4]) or "general"
+
+
+def market_intel_key(location: str, role: str) -> str:
+    location = re.sub(r"\s+", " ", location).strip().casefold()
+    return hashlib.sha256(f"{location}\0{role}".encode("utf-8")).hexdigest()
+
+
+class MarketIntelCache:
+    def __init__(self, ttl: float = MARKET_INTEL_TTL, max_entries: int = MARKET_INTEL_ENTRIES,
+                 disk_dir: str | None = MARKET_INTEL_DIR):
+        self.ttl = ttl
+        self._memory = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            intel = json.loads((self.disk_dir / f"{key}.json").read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+        if intel["fetched_at"] + self.ttl <= time.time():
+            return None
+        return intel
+
+    def _write_disk(self, key, intel):
+        if not self.disk_dir:
+            return
+        path = self.disk_dir / f"{key}.json"
+        try:
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(intel), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as exc:
+            logging.warning("Could not write market-intel cache entry: %s", exc)
+
+    def _lookup(self, key):
+        intel = self._memory.get(key)
+        if intel is None:
+            intel = self._read_disk(key)
+            if intel is not None:
+                self._memory.set(key, intel, ttl=intel["fetched_at"] + self.ttl - time.time())
+        return intel
+
+    def get_or_fetch(self, location: str, role: str, fetch) -> tuple[dict, bool]:
+        """
+        Return (intel, cache_hit).  `fetch()` returns fresh Markdown and is
+        called at most once per key at a time – concurrent jobs for the same
+        location and role wait for the first one instead of re-researching.
+        """
+        key = market_intel_key(location, role)
+        intel = self._lookup(key)
+        if intel is not None:
+            return intel, True
+        with self._locks_guard:
+            lock = self._key_locks.setdefault(key, threading.Lock())
+        with lock:
+            intel = self._lookup(key)
+            if intel is not None:
+                return intel, True
+            logging.info("Market-intel cache miss for %s / %s – researching", location, role)
+            intel = {
+                "location": location,
+                "role_family": role,
+                "markdown": fetch().strip(),
+                "fetched_at": time.time(),
+            }
+            self._memory.set(key, intel)
+            self._write_disk(key, intel)
+        with self._locks_guard:
+            self._key_locks.pop(key, None)
+        return intel, False
+
+    def stats(self) -> dict:
+        return self._memory.stats()
+
+
+def freshness_note(intel: dict) -> str:
+    fetched = datetime.fromtimestamp(intel["fetched_at"], tz=timezone.utc)
+    return (f"*Local market data for {intel['role_family']} roles in {intel['location']} "
+            f"researched {fetched:%b %d, %Y} (UTC).*")
@@ -0,0 +1,208 @@
+# backend/metrics.py
+"""
+In-process metrics in the Prometheus text exposition format (`/metrics`).
+
+    • Counter    – monotonically increasing, e.g. errors by stage and type
+    • Histogram  – fixed buckets; latency and payload sizes per stage
+    • Gauge      – read from a callback at scrape time (queue depth,
+                   in-flight upstream calls), so it costs nothing in between
+
+Recording is a dict lookup, a bisect and an add under a per-metric lock,
+so it is cheap enough for every request.  Values are per process: under
+gunicorn each worker exposes its own, so scrape every worker or read the
+numbers as one worker's share.
+
+    with metrics.stage("openai_call"):
+        ...
+    metrics.observe_size("extraction", chars=len(text))
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = "career_"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+SIZE_BUCKETS    = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = PREFIX + name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in values]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}   # key ➜ [per-bucket counts…, +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[:-1]) if series else 0
+
+    def _samples(self):
+        with self._lock:
+            snapshot = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in snapshot:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += n
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """`fn()` returns a number, or a {label value(s): number} dict for a labelled gauge."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, fn, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._fn = fn
+
+    def _samples(self):
+        try:
+            value = self._fn()
+        except Exception:   # a broken callback must not break the scrape
+            return []
+        if not isinstance(value, dict):
+            return [f"{self.name} {_number(value)}"]
+        return [f"{self.name}{_labels(self.labelnames, key if isinstance(key, tuple) else (key,))} {_number(v)}"
+                for key, v in sorted(value.items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics[metric.name] = metric   # re-registering a gauge replaces its callback
+        return metric
+
+    def counter(self, name, help_text, labelnames=()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, fn, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, help_text, fn, labelnames))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = Registry()
+
+stage_seconds = registry.histogram(
+    "stage_duration_seconds", "Wall-clock time per pipeline stage.", ("stage",))
+stage_errors = registry.counter(
+    "stage_errors_total", "Pipeline stage failures by exception type.", ("stage", "error"))
+stage_bytes = registry.histogram(
+    "stage_payload_bytes", "Byte size of stage inputs/outputs (uploads, HTML).", ("stage",), SIZE_BUCKETS)
+stage_chars = registry.histogram(
+    "stage_payload_chars", "Character count of stage inputs/outputs (résumé text, prompts, replies).",
+    ("stage",), SIZE_BUCKETS)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the block as `name`; an exception is counted by type and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as exc:
+        stage_errors.inc(stage=name, error=type(exc).__name__)
+        raise
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage=name)
+
+
+def observe_size(name: str, *, nbytes: int | None = None, chars: int | None = None):
+    if nbytes is not None:
+        stage_bytes.observe(nbytes, stage=name)
+    if chars is not None:
+        stage_chars.observe(chars, stage=name)
+
+
+def record_error(name: str, error: str):
+    """Count a failure that is handled without an exception reaching `stage()`."""
+    stage_errors.inc(stage=name, error=error)
@@ -1,6 +1,6 @@
 # backend/models.py
 from typing import List, Optional
-from pydantic import BaseModel, Field, constr, validator
+from pydantic import BaseModel, Field, constr, field_validator, model_validator
 
 # ---------- Form input (already used elsewhere) ----------
 class UserGoalInput(BaseModel):
@@ -21,27 +21,28 @@ class QuarterlyGoal(BaseModel):
     smart: SmartGoal
 
 class YearlyGoal(BaseModel):
-    year: int
+    year: int = Field(..., ge=1, le=5)
     year_goal: str
-    quarterly_smart_goals: Optional[List[QuarterlyGoal]] = None  # only required for year 1
-
-    # enforce 4 quarter goals when year == 1
-    @validator("quarterly_smart_goals", always=True)
-    def _validate_quarters(cls, v, values):
-        if values.get("year") == 1:
-            if not v or len(v) != 4:
-                raise ValueError("Year 1 must contain exactly 4 quarterly_smart_goals")
-        return v
+    quarterly_smart_goals: Optional[List[QuarterlyGoal]] = None  # only required for year 1
 
 class RoadmapOutput(BaseModel):
     five_year_goal: str
     location: str
-    yearly_goals: List[YearlyGoal] = Field(..., min_items=5, max_items=5)
+    yearly_goals: List[YearlyGoal] = Field(..., min_length=5, max_length=5)
 
     # enforce years 1‑5 present exactly once
-    @validator("yearly_goals")
+    @field_validator("yearly_goals")
+    @classmethod
     def _validate_year_list(cls, v):
         years = sorted(g.year for g in v)
         if years != [1, 2, 3, 4, 5]:
             raise ValueError("yearly_goals must include years 1–5 exactly once")
         return v
+
+    # enforce 4 quarter goals for year 1
+    @model_validator(mode="after")
+    def _validate_quarters(self):
+        for g in self.yearly_goals:
+            if g.year == 1 and len(g.quarterly_smart_goals or []) != 4:
+                raise ValueError("Year 1 must contain exactly 4 quarterly_smart_goals")
+        return self
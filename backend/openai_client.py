@@ -3,40 +3,123 @@ import os
 import logging
 import openai
 import sys
+import threading
+import time
 from dotenv import load_dotenv
 from openai import OpenAIError
+from backend import metrics
+from backend.cancellation import CallCancelled
+from backend.http_transport import transport, RetryableError, RETRY_STATUSES, parse_retry_after, remaining_timeout
 
 load_dotenv()
 logging.debug(f"Loaded environment: PYTHONPATH={os.environ.get('PYTHONPATH')}, CWD={os.getcwd()}, Executable={sys.executable}")
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY not found in environment variables.")
+_client = None
+_client_lock = threading.Lock()
 
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
 
-def call_openai_gpt4(prompt: str) -> str:
-    logging.info("Sending prompt to OpenAI o3-mini...")
-    try:
-        response = client.chat.completions.create(
-            model="o3-mini",
+def get_client() -> openai.OpenAI:
+    """
+    The shared OpenAI client, built on first call – a missing key fails that
+    call (and the roadmap chain falls back or reports it), not the import.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if not OPENAI_API_KEY:
+                    raise ValueError("OPENAI_API_KEY not found in environment variables.")
+                # Retries are handled by the shared transport, so the SDK's own are off
+                _client = openai.OpenAI(api_key=OPENAI_API_KEY, http_client=transport.httpx_client(), max_retries=0)
+    return _client
+
+
+def _create_with_retries(deadline=None, cancel=None, **kwargs):
+    client = get_client()
+    timeout = kwargs.pop("timeout", None)
+
+    def attempt():
+        try:
+            return client.chat.completions.create(timeout=remaining_timeout(timeout, deadline), **kwargs)
+        except openai.APITimeoutError:
+            raise   # the request may still be running upstream – don't pay twice
+        except openai.APIConnectionError as e:
+            raise RetryableError(f"connection error: {e}", original=e)
+        except openai.APIStatusError as e:
+            if e.status_code in RETRY_STATUSES:
+                retry_after = parse_retry_after(e.response.headers.get("retry-after"))
+                raise RetryableError(f"HTTP {e.status_code}", retry_after=retry_after, original=e)
+            raise
+
+    # a streamed reply keeps its host slot until _read_stream closes it
+    return transport.call(client.base_url.host, attempt, stream=kwargs.get("stream", False),
+                          deadline=deadline, cancel=cancel)
+
+def chat_completion(prompt: str, model: str = "o3-mini", timeout: float | None = None,
+                    system: str = "You are a helpful assistant.", max_completion_tokens: int = 4000,
+                    on_text=None, cancel=None) -> str:
+    """
+    One chat completion; raises on failure.  `timeout` bounds the HTTP call
+    (seconds; between chunks when streaming).  If `on_text` is given the
+    reply is streamed and `on_text(delta)` is called for every content
+    chunk; the full text is still returned.  Setting `cancel` (a
+    CancelToken) closes the stream and raises CallCancelled.
+    """
+    logging.info("Sending prompt to OpenAI %s (%d chars, stream=%s)...", model, len(prompt), on_text is not None)
+    metrics.observe_size("openai_call", chars=len(prompt))
+    deadline = time.monotonic() + timeout if timeout is not None else None   # retries included
+    with metrics.stage("openai_call"):
+        response = _create_with_retries(
+            deadline=deadline,
+            cancel=cancel,
+            model=model,
             messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
+                {"role": "system", "content": system},
                 {"role": "user", "content": prompt}
             ],
-            max_completion_tokens=4000,  # Correct parameter for o3-mini
+            max_completion_tokens=max_completion_tokens,  # Correct parameter for o3-mini
+            timeout=timeout,
+            stream=on_text is not None,
         )
-        result = response.choices[0].message.content
-        logging.info(f"o3-mini response received: {result}")
-        print("\n--- OPENAI o3-mini RESPONSE ---\n")
-        print(result)
-        return result
+        if on_text is None:
+            result = response.choices[0].message.content or ""
+        else:
+            result = _read_stream(response, on_text, cancel)
+    # only the size is logged – the reply itself is parsed and stored by the caller
+    logging.info("%s response received (%d chars)", model, len(result))
+    metrics.observe_size("openai_reply", chars=len(result))
+    return result
+
+
+def _read_stream(stream, on_text, cancel=None) -> str:
+    # closing the stream from the cancelling thread unblocks the read below
+    unregister = cancel.on_cancel(stream.close) if cancel is not None else (lambda: None)
+    try:
+        with stream:
+            parts = []
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    on_text(delta)
+            return "".join(parts)
+    except Exception as exc:
+        if cancel is not None and cancel.is_set():
+            raise CallCancelled(cancel.reason) from exc
+        raise
+    finally:
+        unregister()
+
+
+def call_openai_gpt4(prompt: str) -> str:
+    """o3-mini completion; returns "" on any error."""
+    try:
+        return chat_completion(prompt)
     except openai.OpenAIError as e:
         logging.error(f"OpenAI API error: {str(e)} - Details: {e.__dict__}")
-        print(f"Error calling OpenAI o3-mini: {str(e)}")
         return ""
     except Exception as e:
         logging.error(f"Unexpected error calling OpenAI: {str(e)}")
-        print(f"Error calling OpenAI o3-mini: {str(e)}")
-        return ""
\ No newline at end of file
+        return ""
@@ -0,0 +1,178 @@
+# backend/outbox.py
+"""
+Asynchronous e-mail outbox.
+
+`/send_report` used to open a fresh SMTP_SSL connection, log in and send
+while the request waited.  Now it only enqueues; a single sender thread
+drains the outbox over one reused, authenticated SMTPConnection:
+
+    • transient failures (dropped connection, 4xx, network errors) are
+      retried with jittered exponential backoff, up to EMAIL_MAX_ATTEMPTS
+    • bad credentials / refused recipients – and any unexpected error, so
+      one bad message can't stop the sender thread – fail at once
+    • every state change (queued → sending → retrying → sent | failed) is
+      reported through `on_state(job_id, state)` so it can live on the job
+    • the connection is closed after EMAIL_IDLE_CLOSE idle seconds
+"""
+import heapq
+import itertools
+import logging
+import os
+import random
+import smtplib
+import threading
+import time
+from dataclasses import dataclass, field
+
+from backend import metrics
+from backend.email_sender import SMTPConnection
+
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 5))
+EMAIL_BACKOFF_BASE = float(os.getenv("EMAIL_BACKOFF_BASE", 2.0))
+EMAIL_BACKOFF_MAX  = float(os.getenv("EMAIL_BACKOFF_MAX", 120.0))
+EMAIL_IDLE_CLOSE   = float(os.getenv("EMAIL_IDLE_CLOSE", 60.0))
+
+# retrying these cannot help
+PERMANENT_ERRORS = (smtplib.SMTPAuthenticationError, smtplib.SMTPRecipientsRefused,
+                    smtplib.SMTPSenderRefused, ValueError)
+
+
+@dataclass(order=True)
+class _Message:
+    ready_at: float
+    seq: int
+    job_id: str = field(compare=False)
+    recipient: str = field(compare=False)
+    subject: str = field(compare=False)
+    html_body: str = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+
+
+class Outbox:
+    def __init__(self, connection_factory=SMTPConnection, on_state=None,
+                 max_attempts: int = EMAIL_MAX_ATTEMPTS, backoff_base: float = EMAIL_BACKOFF_BASE,
+                 backoff_max: float = EMAIL_BACKOFF_MAX, idle_close: float = EMAIL_IDLE_CLOSE):
+        self._connection_factory = connection_factory
+        self._on_state = on_state
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.idle_close = idle_close
+        self._heap: list[_Message] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._conn = None
+        self._stopping = False
+        self._counts = {"queued": 0, "sent": 0, "failed": 0, "retries": 0}
+
+    # ---------------- producer side ----------------
+    def enqueue(self, job_id: str, recipient: str, subject: str, html_body: str):
+        msg = _Message(time.monotonic(), next(self._seq), job_id, recipient, subject, html_body)
+        self._report(msg, "queued")
+        with self._cond:
+            heapq.heappush(self._heap, msg)
+            self._counts["queued"] += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="EmailOutbox", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {**self._counts, "pending": len(self._heap), "connected": self._conn is not None}
+
+    def shutdown(self, timeout: float | None = None):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._close()
+
+    # ---------------- sender thread ----------------
+    def _report(self, msg: _Message, status: str, error: str | None = None):
+        if self._on_state is None:
+            return
+        try:
+            self._on_state(msg.job_id, {"status": status, "attempts": msg.attempts, "error": error})
+        except Exception:
+            logging.exception("Outbox state callback failed for job %s", msg.job_id)
+
+    def _next_message(self) -> _Message | None:
+        """Block until a message is due; close the connection while idle."""
+        with self._cond:
+            idle_since = time.monotonic()
+            while not self._stopping:
+                now = time.monotonic()
+                if self._heap and self._heap[0].ready_at <= now:
+                    return heapq.heappop(self._heap)
+                if self._conn is not None and now - idle_since >= self.idle_close:
+                    self._cond.release()
+                    try:
+                        self._close()
+                    finally:
+                        self._cond.acquire()
+                    continue
+                timeout = self.idle_close if self._conn is not None else None
+                if self._heap:
+                    due = self._heap[0].ready_at - now
+                    timeout = due if timeout is None else min(timeout, due)
+                self._cond.wait(timeout)
+            return None
+
+    def _run(self):
+        while (msg := self._next_message()) is not None:
+            self._deliver(msg)
+
+    def _deliver(self, msg: _Message):
+        msg.attempts += 1
+        self._report(msg, "sending")
+        try:
+            with metrics.stage("email_send"):   # includes (re)connecting
+                if self._conn is None:
+                    self._conn = self._connection_factory()
+                self._conn.send(msg.recipient, msg.subject, msg.html_body)
+        except PERMANENT_ERRORS as exc:
+            logging.error("E-mail for job %s failed permanently: %s", msg.job_id, exc)
+            self._close()
+            self._finish(msg, "failed", str(exc))
+        except (smtplib.SMTPException, OSError) as exc:
+            self._retry_or_fail(msg, exc)
+        except Exception as exc:   # e.g. a message the e-mail builder rejects – drop it, keep the thread
+            logging.exception("E-mail for job %s failed", msg.job_id)
+            self._close()
+            self._finish(msg, "failed", str(exc))
+        else:
+            logging.info("E-mail for job %s sent to %s", msg.job_id, msg.recipient)
+            self._finish(msg, "sent")
+
+    def _retry_or_fail(self, msg: _Message, exc: Exception):
+        self._close()
+        if msg.attempts >= self.max_attempts:
+            logging.error("E-mail for job %s failed after %d attempts: %s", msg.job_id, msg.attempts, exc)
+            self._finish(msg, "failed", str(exc))
+            return
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (msg.attempts - 1)))
+        logging.warning("E-mail for job %s: %s – retry %d/%d in %.1fs",
+                        msg.job_id, exc, msg.attempts, self.max_attempts - 1, delay)
+        self._report(msg, "retrying", str(exc))
+        with self._cond:
+            self._counts["retries"] += 1
+            msg.ready_at = time.monotonic() + delay
+            heapq.heappush(self._heap, msg)
+
+    def _finish(self, msg: _Message, status: str, error: str | None = None):
+        with self._cond:
+            self._counts[status] += 1
+        self._report(msg, status, error)
+
+    def _close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
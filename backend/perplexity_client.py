@@ -1,23 +1,58 @@
 # backend/perplexity_client.py
-import os, logging, requests, json
+import os, logging, json, time
 from dotenv import load_dotenv
+from backend import metrics
+from backend.cancellation import CallCancelled
+from backend.http_transport import transport
 load_dotenv()
 
 API_KEY = os.getenv("PERPLEXITY_API_KEY")
-if not API_KEY:
-    raise RuntimeError("PERPLEXITY_API_KEY missing")
 
-HEADERS = {
-    "Authorization": f"Bearer {API_KEY}",
-    "Content-Type": "application/json"
-}
 
-def call_perplexity_api(system_prompt: str) -> str:
+def _headers() -> dict:
+    # checked per call, not at import, so a missing key fails the report – not the worker
+    if not API_KEY:
+        raise RuntimeError("PERPLEXITY_API_KEY missing")
+    return {
+        "Authorization": f"Bearer {API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+# overridable so the benchmark harness (bench/) can point at a local stand-in
+PERPLEXITY_API_URL = os.getenv("PERPLEXITY_API_URL", "https://api.perplexity.ai/chat/completions")
+PERPLEXITY_STREAM = os.getenv("PERPLEXITY_STREAM", "1") == "1"
+# shared location/role research is cached, so it can afford deep research;
+# the per-user strategy stage builds on that research with a faster model
+PERPLEXITY_RESEARCH_MODEL = os.getenv("PERPLEXITY_RESEARCH_MODEL", "sonar-deep-research")
+PERPLEXITY_STRATEGY_MODEL = os.getenv("PERPLEXITY_STRATEGY_MODEL", "sonar-pro")
+
+REPORT_USER_MESSAGE = (
+    "Generate the market‑intelligence report exactly as instructed. "
+    "Return ONLY the final report in Markdown, starting with "
+    "`# Market Intelligence Report`."
+)
+
+MARKET_INTEL_USER_MESSAGE = (
+    "Compile the local market intelligence exactly as instructed. "
+    "Return ONLY Markdown, starting with `## Local Market Intelligence`."
+)
+
+def call_perplexity_api(system_prompt: str, on_text=None, model: str = "sonar-deep-research",
+                        user_message: str = REPORT_USER_MESSAGE, timeout: float = 480, cancel=None) -> str:
     """
     system_prompt already contains location, resume + roadmap details.
+    If `on_text` is given the answer is streamed (`stream: true`) and
+    `on_text(delta)` is called for every content chunk as it arrives;
+    the full Markdown is still returned at the end.  An exception raised
+    by `on_text` aborts the stream and closes the connection.
+    `timeout` is the read timeout (between chunks when streaming).
+    Setting `cancel` (a CancelToken) closes the response mid-stream and
+    raises CallCancelled.
     """
+    import requests   # first call, not worker boot (backend/preload.py)
+
     payload = {
-        "model": "sonar-deep-research",
+        "model": model,
         "messages": [
             {
                 "role": "system",
@@ -25,32 +60,78 @@ def call_perplexity_api(system_prompt: str) -> str:
             },
             {
                 "role": "user",
-                "content": (
-                    "Generate the market‑intelligence report exactly as instructed. "
-                    "Return ONLY the final report in Markdown, starting with "
-                    "`# Market Intelligence Report`."
-                )
+                "content": user_message
             }
         ],
         "max_tokens": 8000,
         "temperature": 0.3
     }
+    if on_text is not None:
+        payload["stream"] = True
 
-    logging.info("Calling Perplexity (job)…")
+    logging.info("Calling Perplexity (%s, stream=%s)…", model, on_text is not None)
+    metrics.observe_size("perplexity_call", chars=len(system_prompt))
     try:
-        r = requests.post(
-            "https://api.perplexity.ai/chat/completions",
-            headers=HEADERS,
-            json=payload,
-            timeout=(10, 480)   # 10 s connect timeout, 480 s read timeout
-        )
-        r.raise_for_status()
-        content = r.json()['choices'][0]['message']['content']
+        with metrics.stage("perplexity_call"):
+            content = _post(payload, on_text, timeout, cancel)
         logging.info("Perplexity returned %d chars", len(content))
+        metrics.observe_size("perplexity_reply", chars=len(content))
         return content
     except requests.exceptions.HTTPError as e:
         logging.error("Perplexity HTTP error: %s", e.response.text)
         raise
+    except CallCancelled:
+        logging.info("Perplexity call cancelled")
+        raise
     except Exception:
         logging.exception("Perplexity call failed")
         raise
+
+
+def _post(payload: dict, on_text, timeout: float, cancel=None) -> str:
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+    r = transport.post(   # pooled keep-alive session, retries 429/5xx with backoff
+        PERPLEXITY_API_URL,
+        headers=_headers(),
+        json=payload,
+        timeout=(10, timeout),  # 10 s connect timeout
+        stream=on_text is not None,
+        deadline=time.monotonic() + timeout if timeout else None,   # retries and their backoff included
+        cancel=cancel,
+    )
+    if not r.ok:
+        r.close()   # frees the host slot a streamed response holds
+        r.raise_for_status()
+    if on_text is None:
+        return r.json()['choices'][0]['message']['content']
+    # closing the response from the cancelling thread unblocks the read below
+    unregister = cancel.on_cancel(r.close) if cancel is not None else (lambda: None)
+    try:
+        with r:
+            parts = []
+            for delta in iter_stream_content(r.iter_lines(decode_unicode=True)):
+                parts.append(delta)
+                on_text(delta)
+            return "".join(parts)
+    except Exception as exc:
+        if cancel is not None and cancel.is_set():
+            raise CallCancelled(cancel.reason) from exc
+        raise
+    finally:
+        unregister()
+
+
+def iter_stream_content(lines):
+    """Yield content deltas from an OpenAI-style SSE stream (`data: {...}` lines)."""
+    for line in lines:
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        chunk = json.loads(data)
+        choices = chunk.get("choices") or [{}]
+        delta = (choices[0].get("delta") or {}).get("content")
+        if delta:
+            yield delta
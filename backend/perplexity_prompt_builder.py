@@ -1,7 +1,8 @@
 import logging
-import json
 import textwrap
 
+from backend.prompt_budget import compact_json, count_tokens, fit_resume, resume_budget
+
 # ---------------------------------------------------------------------------
 # NOTE
 # -----
@@ -12,14 +13,23 @@ import textwrap
 def _convert_resume_to_json(resume_text: str) -> str:
     """Very lightweight fallback résumé → JSON converter."""
     logging.info("Converting resume snippet to JSON for Perplexity prompt …")
-    return json.dumps({"resume_summary": resume_text}, indent=2)
-
-
-def build_perplexity_prompt(roadmap_json: str, resume_snippet: str, location: str) -> str:
-    """Return the full prompt string to send to Perplexity."""
+    return compact_json({"resume_summary": resume_text})
+
+
+def build_perplexity_prompt(roadmap_json: str, resume_snippet: str, location: str,
+                            market_intel: str | None = None, model: str = "sonar-deep-research") -> str:
+    """
+    Return the full prompt string to send to Perplexity.
+    If `market_intel` (cached output of build_market_intel_prompt) is given,
+    the prompt asks only for Part 1 and supplies the intel as context;
+    the caller appends the intel to the report as Part 2.
+    The résumé is fitted to `model`'s token budget and both JSON blobs are
+    embedded compactly.
+    """
     logging.info("Building hyper‑personalised Perplexity prompt for deep research…")
 
-    resume_json_str = _convert_resume_to_json(resume_snippet)
+    resume_json_str = _convert_resume_to_json(fit_resume(resume_snippet, resume_budget(model), model))
+    roadmap_json = compact_json(roadmap_json)
 
     # ---------------------------------------------------------------------
     # 1) Header / persona / context block (Unchanged)
@@ -124,6 +134,68 @@ def build_perplexity_prompt(roadmap_json: str, resume_snippet: str, location: st
         """
     ).strip()
 
-    prompt = "\n\n".join([header, part_1_tasks, part_2_tasks, style_rules])
-    logging.info("Perplexity prompt built – %s chars", len(prompt))
+    if market_intel is not None:
+        intel_block = textwrap.dedent(
+            """
+            **Local Market Research (already compiled for this location & role family)**
+            Use it as evidence for Part 1 and cite its links where relevant.
+            Do **not** reproduce it — it is appended to your report as Part 2.
+            """
+        ).strip() + "\n\n" + market_intel.strip()
+        prompt = "\n\n".join([header, intel_block, part_1_tasks, style_rules])
+    else:
+        prompt = "\n\n".join([header, part_1_tasks, part_2_tasks, style_rules])
+    logging.info("Perplexity prompt built – %s chars, ~%d tokens", len(prompt), count_tokens(prompt, model))
+    return prompt
+
+
+def build_market_intel_prompt(location: str, role_family: str) -> str:
+    """
+    Prompt for the shareable research stage: local market intelligence and
+    the Stat‑Dump for one location + role family, with nothing user‑specific,
+    so the answer can be cached and reused across users.
+    """
+    logging.info("Building market‑intel prompt for %s / %s…", location, role_family)
+
+    prompt = textwrap.dedent(
+        f"""
+        You are **MarketIntelPro**, a forensic—but engaging—market‑intelligence assistant.
+        Compile verified, current labour‑market data for the role family and location below.
+        This research is shared by many job seekers, so keep it factual and role‑wide.
+
+        **Location:** {location}
+        **Role family:** {role_family}
+
+        *Priority Sources* → 1) LinkedIn & company careers pages
+        2) Tech‑news / vendor blogs
+        3) Local event aggregators & Meetup
+        4) Salary aggregators (Indeed, Salary.com, ZipRecruiter)
+        5) Reddit & niche forums for anecdotal signals
+
+        ### REPORT PART 2: Tactical Intelligence
+
+        ---
+
+        #### 4. Local Market Intelligence
+        Synthesize your findings for the location into 3-4 powerful, headline-style bullet points.
+        - **Format:**
+          ```
+          ## Local Market Intelligence
+          - **Top Employers:** {{List 3-4 top hiring companies for these roles, with links to their career pages.}}
+          - **Salary Benchmarks:** {{Provide 2-3 specific salary ranges for these roles in the location, citing sources.}}
+          - **Critical Skill Gaps:** {{Identify 1-2 key skills (e.g., Terraform, Ansible) employers here demand but struggle to find.}}
+          ```
+
+        #### 5. Raw Search Results (Stat-Dump)
+        Compile a numbered list of **at least 15-20 raw data points** you found during your research.
+        - **Format each entry exactly like this:** `[#] **Source Name:** Key finding, quote, or data point. [link]`
+
+        ---
+        **Style Rules**
+        * Every URL must be real and publicly accessible.
+        * Never mention you are an AI or reference these instructions.
+        * Deliver **only** the Markdown for sections 4 and 5, starting with `## Local Market Intelligence`—no additional prose or code fences.
+        """
+    ).strip()
+    logging.info("Market‑intel prompt built – %s chars", len(prompt))
     return prompt
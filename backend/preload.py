@@ -0,0 +1,56 @@
+# backend/preload.py
+"""
+Heavy third-party dependencies, imported on first use or ahead of time.
+
+Nothing on the import path of app.py loads openai, httpx/requests,
+pdfplumber/pdfminer, python-docx/lxml, markdown or pytz.  Each one is
+imported by the function that first needs it, and the API clients are
+built on their first call (backend/openai_client.py,
+backend/perplexity_client.py).  So a worker boots on Flask + pydantic
+alone, and a missing API key fails that call instead of the process.
+
+`preload()` imports them all up front.  gunicorn.conf.py calls it in the
+master when PRELOAD_DEPENDENCIES=1: the modules are loaded once before
+the fork, shared copy-on-write by every worker, and no worker's first
+request pays for them.  Only libraries are preloaded, never app.py,
+because its threads, pools and sockets must be created per worker.
+"""
+import importlib
+import logging
+import os
+import sys
+import time
+
+PRELOAD_DEPENDENCIES = os.getenv("PRELOAD_DEPENDENCIES", "1") == "1"
+
+HEAVY_MODULES = (
+    "openai",        # roadmap calls (backend/openai_client.py)
+    "httpx",         # the OpenAI SDK's HTTP stack
+    "requests",      # Perplexity calls (backend/http_transport.py)
+    "pdfplumber",    # résumé parsing (backend/resume_extractor.py)
+    "docx",
+    "markdown",      # report rendering (backend/markdown_renderer.py)
+    "pytz",          # daily quota reset (backend/rate_limiter.py)
+)
+
+
+def preload(modules=HEAVY_MODULES) -> dict[str, float]:
+    """Import `modules`; returns seconds spent on each (0.0 if it was already loaded)."""
+    timings = {}
+    for name in modules:
+        if name in sys.modules:
+            timings[name] = 0.0
+            continue
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as exc:   # optional in some deployments – it'll fail again, loudly, on use
+            logging.warning("Preload of %s skipped: %s", name, exc)
+            continue
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def loaded(modules=HEAVY_MODULES) -> list[str]:
+    """Which of `modules` are imported in this process."""
+    return [name for name in modules if name in sys.modules]
@@ -0,0 +1,193 @@
+# backend/prompt_budget.py
+"""
+Token budgeting for the prompts we send upstream.
+
+    • count_tokens – tiktoken when installed (exact for OpenAI models, a
+      close proxy for Perplexity's), otherwise a local estimate
+    • compact_json – embedded JSON without indentation whitespace
+    • fit_resume – fills a per-model token budget with résumé content by
+      section priority (skills and the most recent experience first)
+      instead of cutting the text at an arbitrary character
+
+Budgets come from RESUME_TOKEN_BUDGETS ("model=tokens,..."), falling back
+to RESUME_TOKEN_BUDGET for models not listed.
+"""
+import json
+import logging
+import math
+import os
+import re
+from functools import lru_cache
+
+try:
+    import tiktoken   # optional – exact counts for OpenAI models
+except ImportError:   # pragma: no cover – estimate below is used instead
+    tiktoken = None
+
+DEFAULT_RESUME_BUDGETS = {"o3-mini": 1500, "sonar-pro": 800, "sonar-deep-research": 800}
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", 1000))
+
+
+def _parse_budgets(raw: str | None) -> dict[str, int]:
+    budgets = dict(DEFAULT_RESUME_BUDGETS)
+    for item in (raw or "").split(","):
+        model, _, tokens = item.partition("=")
+        if model.strip() and tokens.strip().isdigit():
+            budgets[model.strip()] = int(tokens)
+    return budgets
+
+
+RESUME_TOKEN_BUDGETS = _parse_budgets(os.getenv("RESUME_TOKEN_BUDGETS"))
+
+
+def resume_budget(model: str) -> int:
+    return RESUME_TOKEN_BUDGETS.get(model, RESUME_TOKEN_BUDGET)
+
+
+# ------------------------------------------------------------------
+# Counting
+# ------------------------------------------------------------------
+_WORDISH = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str | None):
+    try:
+        return tiktoken.encoding_for_model(model or "")
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str | None = None) -> int:
+    if not text:
+        return 0
+    if tiktoken is not None:
+        return len(_encoding(model).encode(text))
+    # BPE vocabularies average ~4 chars per token on English prose; long
+    # words and punctuation push the count up, so take the larger estimate
+    return max(math.ceil(len(text) / 4), math.ceil(len(_WORDISH.findall(text)) * 1.1))
+
+
+def compact_json(value) -> str:
+    """Serialise (or re-serialise a JSON string) without whitespace padding."""
+    if isinstance(value, str):
+        value = json.loads(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+# ------------------------------------------------------------------
+# Résumé fitting
+# ------------------------------------------------------------------
+# lower rank = kept first
+_SECTION_RANKS = [
+    ("skills",         0, r"(?:technical |core |key )?(?:skills|competencies|technologies|tech stack|tools)"),
+    ("certifications", 1, r"certifications?|licen[cs]es?(?: (?:&|and) certifications?)?|credentials"),
+    ("summary",        2, r"(?:professional |career )?(?:summary|profile|objective)|about me"),
+    ("experience",     3, r"(?:professional |work |relevant )?(?:experience|employment(?: history)?|work history)"),
+    ("projects",       4, r"(?:key |selected )?projects"),
+    ("education",      5, r"education(?: (?:&|and) training)?|training"),
+    ("other",          6, r"awards|achievements|accomplishments|volunteer(?:ing| experience)?|activities"
+                          r"|publications|languages|interests|hobbies|references|affiliations"),
+]
+_HEADINGS = [(name, rank, re.compile(rf"^(?:{pattern})$", re.IGNORECASE)) for name, rank, pattern in _SECTION_RANKS]
+_PREAMBLE_RANK = 7   # name / contact lines before the first heading
+
+
+def _heading(line: str):
+    text = line.strip().strip("#*•-–—:_ ").strip()
+    if not text or len(text) > 40:
+        return None
+    for name, rank, pattern in _HEADINGS:
+        if pattern.match(text):
+            return name, rank
+    return None
+
+
+def split_sections(text: str) -> list[tuple[str, int, str | None, list[list[str]]]]:
+    """
+    Split résumé text into (name, rank, heading_line, blocks) in document
+    order; blocks are runs of lines separated by blank lines, so in a
+    reverse-chronological experience section block 0 is the latest job.
+    """
+    sections = [["preamble", _PREAMBLE_RANK, None, [[]]]]
+    for line in text.splitlines():
+        found = _heading(line)
+        if found:
+            sections.append([found[0], found[1], line.strip(), [[]]])
+        elif not line.strip():
+            if sections[-1][3][-1]:
+                sections[-1][3].append([])
+        else:
+            sections[-1][3][-1].append(line.rstrip())
+    result = []
+    for name, rank, heading, blocks in sections:
+        blocks = [b for b in blocks if b]
+        if blocks or heading:
+            result.append((name, rank, heading, blocks))
+    return result
+
+
+_MIN_PARTIAL_LINE = 24   # tokens; below this a cut-off line isn't worth including
+
+
+def _truncate_to_tokens(line: str, budget: int, model: str | None) -> str:
+    """Longest word prefix of `line` within `budget` tokens (binary search)."""
+    words = line.split(" ")
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(" ".join(words[:mid]), model) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return " ".join(words[:lo])
+
+
+def fit_resume(text: str, budget: int, model: str | None = None) -> str:
+    """
+    Return résumé text that fits in `budget` tokens.  Blocks are admitted
+    by (section rank, position in section), line by line, then re-emitted
+    in their original order under their original headings.
+    """
+    text = (text or "").strip()
+    if not text or count_tokens(text, model) <= budget:
+        return text
+
+    sections = split_sections(text)
+    order = sorted(
+        ((rank, b, s) for s, (_, rank, _, blocks) in enumerate(sections) for b in range(len(blocks))),
+    )
+    kept: dict[tuple[int, int], list[str]] = {}
+    headed: set[int] = set()
+    used = 0
+    for _, b, s in order:
+        heading = sections[s][2]
+        heading_cost = count_tokens(heading, model) + 1 if heading and s not in headed else 0
+        lines = []
+        for line in sections[s][3][b]:
+            cost = count_tokens(line, model) + 1
+            if used + heading_cost + cost > budget:
+                # a long run-on line (common in PDF extractions) is cut at a word instead
+                room = budget - used - heading_cost - 1
+                line = _truncate_to_tokens(line, room, model) if room >= _MIN_PARTIAL_LINE else ""
+                if line:
+                    used += heading_cost + count_tokens(line, model) + 1
+                    lines.append(line)
+                break
+            used += heading_cost + cost
+            heading_cost = 0
+            lines.append(line)
+        if lines:
+            kept[(s, b)] = lines
+            if heading:
+                headed.add(s)
+
+    out: list[str] = []
+    for s, (_, _, heading, blocks) in enumerate(sections):
+        section_blocks = ["\n".join(kept[(s, b)]) for b in range(len(blocks)) if (s, b) in kept]
+        if not section_blocks:
+            continue
+        out.append("\n".join(([heading] if heading else []) + ["\n\n".join(section_blocks)]))
+    fitted = "\n\n".join(out)
+    logging.info("Résumé fitted to %d-token budget: %d → %d chars", budget, len(text), len(fitted))
+    return fitted
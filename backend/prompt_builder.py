@@ -2,13 +2,14 @@
 import logging
 import textwrap
 
-MAX_RESUME_CHARS = 3000  # hard cap to keep the prompt ≤ GPT‑4 limits
+from backend.prompt_budget import compact_json, count_tokens, fit_resume, resume_budget
 
 
 def build_career_roadmap_prompt(
     goal: str,
     location: str,
     resume_text: str | None = None,
+    model: str = "o3-mini",
 ) -> str:
     """
     Build the system/user prompt that instructs the LLM to return a five‑year
@@ -19,6 +20,7 @@ def build_career_roadmap_prompt(
         • Strong action‑verb style
         • No location‑awareness mandate
     The JSON schema remains unchanged, so downstream parsing still works.
+    The résumé is fitted to the model's token budget (backend/prompt_budget.py).
     """
     logging.info("Building roadmap prompt…")
 
@@ -41,6 +43,7 @@ def build_career_roadmap_prompt(
 
     # ——— Optional résumé block ———
     if resume_text:
+        resume_text = fit_resume(resume_text, resume_budget(model), model)
         # Escape embedded triple quotes to keep the f‑string intact
         safe_resume = resume_text.replace('"""', '\\"""')
         resume_chunk = textwrap.indent(safe_resume, "    ")
@@ -129,5 +132,55 @@ def build_career_roadmap_prompt(
     )
 
     prompt = "\n\n".join(chunks)
-    logging.info("Prompt built successfully.")
+    logging.info("Prompt built successfully – ~%d tokens.", count_tokens(prompt, model))
+    return prompt
+
+
+REPAIR_RESUME_BUDGET = 400   # tokens of résumé context for a targeted re-prompt
+
+
+def build_roadmap_repair_prompt(
+    goal: str,
+    location: str,
+    resume_text: str | None,
+    kept_years: list[dict],
+    missing_years: list[int],
+    model: str = "o3-mini",
+) -> str:
+    """
+    Ask only for the `yearly_goals` entries that failed validation, with
+    the years that did parse as context, instead of regenerating the whole
+    roadmap.
+    """
+    logging.info("Building roadmap repair prompt for years %s…", missing_years)
+    years = ", ".join(str(y) for y in missing_years)
+    chunks: list[str] = [
+        textwrap.dedent(
+            f"""
+            You are **Strat‑AI**, an elite, data‑driven career strategist,
+            completing a five‑year career roadmap that is missing some years.
+
+            Context:
+            - User’s 5‑year goal: "{goal}"
+            - User’s location :  "{location}"
+            """
+        ).strip()
+    ]
+    if resume_text:
+        chunks.append("- User’s résumé (excerpt):\n"
+                      + textwrap.indent(fit_resume(resume_text, REPAIR_RESUME_BUDGET, model), "    "))
+    if kept_years:
+        chunks.append("Years already planned (keep consistent with these):\n" + compact_json(kept_years))
+    year_one_rule = (
+        "\n- Year 1 must include **exactly four** `quarterly_smart_goals` (Q1–Q4), each with a "
+        "`goal` that cites a résumé detail and a `smart` object with keys S, M, A, R, T."
+        if 1 in missing_years else ""
+    )
+    chunks.append(
+        f"Return **only** a JSON array containing the `yearly_goals` entries for year(s) {years}, "
+        f"each shaped like {{\"year\": N, \"year_goal\": \"...\"}}.{year_one_rule}\n"
+        "No Markdown, code fences or prose."
+    )
+    prompt = "\n\n".join(chunks)
+    logging.info("Repair prompt built – ~%d tokens.", count_tokens(prompt, model))
     return prompt
@@ -0,0 +1,291 @@
+# backend/rate_limiter.py
+"""
+Rate limiting for the expensive endpoints.
+
+    • DailyQuota – the global "N reports per day" budget (resets at midnight
+      MST).  The SQLite backend increments atomically in one conditional
+      UPDATE, so concurrent threads and gunicorn workers can neither race
+      past the limit nor truncate a half-written file.  Once a day's quota
+      is spent that fact is remembered in memory, so rejected requests no
+      longer touch the disk at all.
+    • TokenBucketLimiter – per-client (IP, e-mail address) buckets so one
+      client cannot exhaust the day's budget for everyone.  The in-memory
+      backend is per process and bounded to the most recently seen keys;
+      the SQLite backend keeps one row per key in the usage database, so
+      every gunicorn worker draws on the same bucket.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+USAGE_LIMIT         = int(os.getenv("USAGE_LIMIT", 10))
+USAGE_STORE         = os.getenv("USAGE_STORE", "sqlite")          # memory | sqlite
+USAGE_DB_PATH       = os.getenv("USAGE_DB_PATH", "usage.db")
+IP_BURST            = int(os.getenv("IP_BURST", 3))               # reports one IP may start back-to-back
+IP_REFILL_SECONDS   = float(os.getenv("IP_REFILL_SECONDS", 1200))  # …then one more every 20 min
+EMAIL_BURST         = int(os.getenv("EMAIL_BURST", 3))            # report e-mails to one address
+EMAIL_REFILL_SECONDS = float(os.getenv("EMAIL_REFILL_SECONDS", 600))
+BUCKET_MAX_KEYS     = 10_000
+
+
+@dataclass(frozen=True)
+class LimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float           # seconds until the limit is fully available again
+    retry_after: float = 0.0     # seconds until the next request could pass (when refused)
+
+    def headers(self, prefix: str = "X-RateLimit") -> dict[str, str]:
+        headers = {
+            f"{prefix}-Limit": str(self.limit),
+            f"{prefix}-Remaining": str(self.remaining),
+            f"{prefix}-Reset": str(int(self.reset_after + 0.999)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, int(self.retry_after + 0.999)))
+        return headers
+
+
+@lru_cache(maxsize=1)
+def _mst():
+    import pytz   # first quota check, not worker boot (backend/preload.py)
+    return pytz.timezone("America/Phoenix")
+
+
+def _today_and_reset(now: float | None = None) -> tuple[str, float]:
+    """Current MST date and the seconds left until the next MST midnight."""
+    mst = _mst()
+    current = datetime.fromtimestamp(time.time() if now is None else now, mst)
+    midnight = mst.localize(datetime.combine(current.date() + timedelta(days=1), datetime.min.time()))
+    return current.strftime("%Y-%m-%d"), (midnight - current).total_seconds()
+
+
+# ------------------------------------------------------------------
+# Global daily quota
+# ------------------------------------------------------------------
+class DailyQuota:
+    """Interface shared by both backends."""
+
+    def __init__(self, limit: int = USAGE_LIMIT, clock=time.time):
+        self.limit = limit
+        self._clock = clock
+        self._exhausted_day: str | None = None   # in-memory fast path for the saturated case
+
+    def _increment(self, day: str) -> int | None:
+        """Atomically add one to `day`'s count if below the limit; return the new count or None."""
+        raise NotImplementedError
+
+    def _count(self, day: str) -> int:
+        raise NotImplementedError
+
+    def _decrement(self, day: str) -> None:
+        raise NotImplementedError
+
+    def try_acquire(self) -> LimitResult:
+        day, reset_after = _today_and_reset(self._clock())
+        if self._exhausted_day == day:
+            return LimitResult(False, self.limit, 0, reset_after, reset_after)
+        count = self._increment(day)
+        if count is None:
+            self._exhausted_day = day
+            return LimitResult(False, self.limit, 0, reset_after, reset_after)
+        return LimitResult(True, self.limit, max(0, self.limit - count), reset_after)
+
+    def refund(self):
+        """Give back a slot `try_acquire` granted to a request that then started no report."""
+        day, _ = _today_and_reset(self._clock())
+        self._decrement(day)
+        if self._exhausted_day == day:
+            self._exhausted_day = None
+
+    def peek(self) -> LimitResult:
+        day, reset_after = _today_and_reset(self._clock())
+        remaining = max(0, self.limit - self._count(day))
+        return LimitResult(remaining > 0, self.limit, remaining, reset_after, reset_after if not remaining else 0)
+
+
+class MemoryDailyQuota(DailyQuota):
+    """Single-process quota (tests, one worker)."""
+
+    def __init__(self, limit: int = USAGE_LIMIT, clock=time.time):
+        super().__init__(limit, clock)
+        self._lock = threading.Lock()
+        self._day, self._used = None, 0
+
+    def _increment(self, day):
+        with self._lock:
+            if self._day != day:
+                self._day, self._used = day, 0
+            if self._used >= self.limit:
+                return None
+            self._used += 1
+            return self._used
+
+    def _count(self, day):
+        with self._lock:
+            return self._used if self._day == day else 0
+
+    def _decrement(self, day):
+        with self._lock:
+            if self._day == day and self._used > 0:
+                self._used -= 1
+
+
+class SQLiteDailyQuota(DailyQuota):
+    """Quota shared by every worker on the host through one SQLite row per day."""
+
+    def __init__(self, path: str = USAGE_DB_PATH, limit: int = USAGE_LIMIT, clock=time.time):
+        super().__init__(limit, clock)
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS usage (day TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _increment(self, day):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR IGNORE INTO usage (day, count) VALUES (?, 0)", (day,))
+            cur = conn.execute("UPDATE usage SET count = count + 1 WHERE day = ? AND count < ?",
+                               (day, self.limit))
+            row = None
+            if cur.rowcount:
+                row = conn.execute("SELECT count FROM usage WHERE day = ?", (day,)).fetchone()
+            conn.execute("DELETE FROM usage WHERE day < ?", (day,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return row[0] if row else None
+
+    def _count(self, day):
+        row = self._conn().execute("SELECT count FROM usage WHERE day = ?", (day,)).fetchone()
+        return row[0] if row else 0
+
+    def _decrement(self, day):
+        self._conn().execute("UPDATE usage SET count = count - 1 WHERE day = ? AND count > 0", (day,))
+
+
+def create_daily_quota() -> DailyQuota:
+    if USAGE_STORE == "memory":
+        return MemoryDailyQuota()
+    return SQLiteDailyQuota()
+
+
+# ------------------------------------------------------------------
+# Per-client token buckets
+# ------------------------------------------------------------------
+class TokenBucketLimiter:
+    """
+    `burst` tokens per key, refilled at one token per `refill_seconds`.
+    Only the BUCKET_MAX_KEYS most recently used keys are kept; a forgotten
+    key simply starts again with a full bucket.
+    """
+
+    def __init__(self, burst: int, refill_seconds: float, max_keys: int = BUCKET_MAX_KEYS, clock=time.monotonic):
+        self.burst = burst
+        self.refill_seconds = refill_seconds
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()   # key → (tokens, updated)
+
+    def _refilled(self, bucket: tuple[float, float] | None, now: float) -> float:
+        tokens, updated = bucket if bucket is not None else (float(self.burst), now)
+        return min(float(self.burst), tokens + max(0.0, now - updated) / self.refill_seconds)
+
+    def _update(self, key: str, now: float, delta: float) -> float:
+        """Add `delta` (-1 to spend, +1 to refund) unless it would go below zero; returns the tokens before."""
+        with self._lock:
+            tokens = self._refilled(self._buckets.pop(key, None), now)
+            after = tokens + delta
+            self._buckets[key] = (min(float(self.burst), after) if after >= 0 else tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return tokens
+
+    def take(self, key: str) -> LimitResult:
+        tokens = self._update(key, self._clock(), -1)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        reset_after = (self.burst - tokens) * self.refill_seconds
+        retry_after = 0.0 if allowed else (1 - tokens) * self.refill_seconds
+        return LimitResult(allowed, self.burst, int(tokens), reset_after, retry_after)
+
+    def refund(self, key: str):
+        """Give back the token a `take` spent on a request refused further on."""
+        self._update(key, self._clock(), +1)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._buckets)
+
+
+class SQLiteTokenBucketLimiter(TokenBucketLimiter):
+    """Buckets shared by every worker on the host: one row per (`name`, key) in the usage database."""
+
+    PURGE_EVERY = 200   # takes between sweeps for buckets that have refilled completely
+
+    def __init__(self, name: str, burst: int, refill_seconds: float, path: str = USAGE_DB_PATH, clock=time.time):
+        super().__init__(burst, refill_seconds, clock=clock)   # wall clock: shared between processes
+        self.name = name
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT NOT NULL, key TEXT NOT NULL,"
+                         " tokens REAL NOT NULL, updated REAL NOT NULL, PRIMARY KEY (name, key))")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _update(self, key, now, delta):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")   # read-refill-write as one step across workers
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ? AND key = ?",
+                               (self.name, key)).fetchone()
+            tokens = self._refilled(row, now)
+            after = tokens + delta
+            conn.execute("INSERT OR REPLACE INTO buckets (name, key, tokens, updated) VALUES (?, ?, ?, ?)",
+                         (self.name, key, min(float(self.burst), after) if after >= 0 else tokens, now))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % self.PURGE_EVERY == 0
+        if purge:   # a full bucket is the same as no row
+            conn.execute("DELETE FROM buckets WHERE name = ? AND updated < ?",
+                         (self.name, now - self.burst * self.refill_seconds))
+        return tokens
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM buckets WHERE name = ?", (self.name,)).fetchone()[0]
+
+
+def create_token_bucket(name: str, burst: int, refill_seconds: float) -> TokenBucketLimiter:
+    if USAGE_STORE == "memory":
+        return TokenBucketLimiter(burst, refill_seconds)
+    return SQLiteTokenBucketLimiter(name, burst, refill_seconds)
@@ -0,0 +1,89 @@
+# backend/report_artifact.py
+"""
+Finished reports as compressed, content-addressed artifacts.
+
+A report is stored once, compressed, as blobs beside its job record:
+
+    report.html.gz   – always (gzip -9; every client understands it)
+    report.html.zst  – when the optional `zstandard` package is installed
+    report.md.gz     – the Markdown the HTML was rendered from
+
+The job record only carries the small metadata dict returned by
+`store_report` (sha256, ETag, sizes, encodings).  `/report/<id>` serves the
+variant the client accepts, and decompresses gzip for the rare client that
+accepts neither.
+"""
+import gzip
+import hashlib
+import logging
+import time
+
+try:
+    import zstandard   # optional – smaller and faster to decode than gzip
+except ImportError:   # pragma: no cover – gzip only
+    zstandard = None
+
+HTML_BLOBS = {"zstd": "report.html.zst", "gzip": "report.html.gz"}   # preference order
+MARKDOWN_BLOB = "report.md.gz"
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=19).compress(data)
+    return gzip.compress(data, compresslevel=9, mtime=0)   # mtime=0 → identical bytes for identical input
+
+
+def store_report(job_store, job_id: str, html: str, markdown_source: str) -> dict:
+    """Compress and attach the report to the job; returns the metadata for the record."""
+    body = html.encode("utf-8")
+    digest = hashlib.sha256(body).hexdigest()
+    encodings = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+    stored = {}
+    for encoding in encodings:
+        blob = _compress(body, encoding)
+        job_store.put_blob(job_id, HTML_BLOBS[encoding], blob)
+        stored[encoding] = len(blob)
+    md = markdown_source.encode("utf-8")
+    job_store.put_blob(job_id, MARKDOWN_BLOB, _compress(md, "gzip"))
+    logging.info("Report artifact for job %s: %d bytes → %s", job_id, len(body), stored)
+    return {
+        "sha256": digest,
+        "etag": f'"{digest[:32]}"',
+        "size": len(body),
+        "markdown_size": len(md),
+        "encodings": stored,
+        "created_at": time.time(),
+    }
+
+
+def negotiate_encoding(accept_encoding: str | None, available) -> str | None:
+    """
+    Pick the best of `available` (in preference order) that the
+    Accept-Encoding header allows; None means send it uncompressed.
+    """
+    accepted: dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    for encoding in available:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+def load_report_html(job_store, job_id: str) -> str | None:
+    blob = job_store.get_blob(job_id, HTML_BLOBS["gzip"])
+    return gzip.decompress(blob).decode("utf-8") if blob is not None else None
+
+
+def load_report_markdown(job_store, job_id: str) -> str | None:
+    blob = job_store.get_blob(job_id, MARKDOWN_BLOB)
+    return gzip.decompress(blob).decode("utf-8") if blob is not None else None
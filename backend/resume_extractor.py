@@ -1,35 +1,76 @@
+import io
 import logging
 from pathlib import Path
-from typing import Final
+from typing import BinaryIO, Final
 
-import pdfplumber
-from docx import Document   # pip install python-docx
+# pdfplumber and python-docx (pip install python-docx) are imported where they're
+# used: the web process only needs read_upload, parsing runs in backend/extraction_pool.py
 
 MIN_CHARS: Final[int] = 50   # treat anything shorter as “no resume”
+READ_CHUNK: Final[int] = 64 * 1024
 
-def extract_text_from_file(path: str | Path) -> str:
+
+class UploadTooLarge(ValueError):
+    """Raised by `read_upload` as soon as the stream passes the byte limit."""
+
+
+def read_upload(stream: BinaryIO, limit: int) -> bytes:
     """
-    Returns plaintext from PDF, DOCX, or TXT.
-    If the file can’t be read or is too short, returns an empty string.
+    Read an upload stream in chunks, aborting once more than `limit` bytes
+    have arrived instead of buffering the whole thing first.
     """
-    path = Path(path)
-    logging.info("Extracting resume text from %s", path)
+    buf = io.BytesIO()
+    while chunk := stream.read(READ_CHUNK):
+        if buf.tell() + len(chunk) > limit:
+            raise UploadTooLarge(f"upload exceeds {limit} bytes")
+        buf.write(chunk)
+    return buf.getvalue()
+
+
+def extract_text(source: bytes | BinaryIO, ext: str, max_chars: int | None = None) -> str:
+    """
+    Returns plaintext from PDF, DOCX, or TXT content held in memory.
+    `ext` is the file type (".pdf", "docx", …).  Parsing stops as soon as
+    `max_chars` characters have been collected and the result is cut to
+    that length, so callers can detect “too long” with max_chars = limit + 1.
+    If the content can’t be read or is too short, returns an empty string.
+    """
+    ext = "." + ext.lower().lstrip(".")
+    stream = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    budget = max_chars if max_chars is not None else float("inf")
+    logging.info("Extracting resume text from in-memory %s (budget %s chars)", ext, max_chars)
 
     try:
-        match path.suffix.lower():
+        parts: list[str] = []
+        collected = 0
+        match ext:
             case ".pdf":
-                with pdfplumber.open(path) as pdf:
-                    text = "\n".join(page.extract_text() or "" for page in pdf.pages)
+                import pdfplumber
+                with pdfplumber.open(stream) as pdf:
+                    for page in pdf.pages:
+                        page_text = page.extract_text() or ""
+                        page.close()   # drop cached layout objects as we go
+                        parts.append(page_text)
+                        collected += len(page_text) + 1
+                        if collected >= budget:
+                            logging.info("Character budget reached – stopped PDF parse early")
+                            break
             case ".docx":
-                doc = Document(path)
-                text = "\n".join(p.text for p in doc.paragraphs)
+                from docx import Document
+                for para in Document(stream).paragraphs:
+                    parts.append(para.text)
+                    collected += len(para.text) + 1
+                    if collected >= budget:
+                        break
             case ".txt":
-                text = path.read_text(encoding="utf-8")
+                parts.append(stream.read().decode("utf-8"))
             case _:
-                logging.warning("Unsupported resume format: %s", path.suffix)
+                logging.warning("Unsupported resume format: %s", ext)
                 return ""
 
-        text = text.strip()
+        text = "\n".join(parts).strip()
+        if max_chars is not None:
+            text = text[:max_chars]
         if len(text) < MIN_CHARS:
             logging.warning("Resume text too short – treating as missing.")
             return ""
@@ -39,4 +80,19 @@ def extract_text_from_file(path: str | Path) -> str:
 
     except Exception as exc:  # broad on purpose – we never want to crash the CLI
         logging.error("Failed to extract resume: %s", exc)
-        return "" 
\ No newline at end of file
+        return ""
+
+
+def extract_text_from_file(path: str | Path, max_chars: int | None = None) -> str:
+    """
+    Returns plaintext from PDF, DOCX, or TXT.
+    If the file can’t be read or is too short, returns an empty string.
+    """
+    path = Path(path)
+    logging.info("Extracting resume text from %s", path)
+    try:
+        data = path.read_bytes()
+    except OSError as exc:
+        logging.error("Failed to extract resume: %s", exc)
+        return ""
+    return extract_text(data, path.suffix, max_chars=max_chars)
@@ -0,0 +1,36 @@
+# backend/roadmap_cache.py
+"""
+Cache of parsed o3-mini roadmaps.
+
+Keyed on the normalised goal, the normalised location and a hash of the
+résumé text that went into the prompt, so retries, back-button resubmits
+and repeat test runs return in milliseconds without another upstream call.
+"""
+import hashlib
+import os
+import re
+
+from backend.ttl_cache import TTLCache
+
+ROADMAP_CACHE_TTL     = int(os.getenv("ROADMAP_CACHE_TTL", 24 * 3600))
+ROADMAP_CACHE_ENTRIES = int(os.getenv("ROADMAP_CACHE_ENTRIES", 512))
+
+roadmap_cache = TTLCache(max_entries=ROADMAP_CACHE_ENTRIES, ttl=ROADMAP_CACHE_TTL)
+
+
+def normalize_text(text: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", text).strip().rstrip(".!").casefold()
+
+
+def roadmap_cache_key(goal: str, location: str, resume_text: str) -> str:
+    resume_hash = hashlib.sha256(resume_text.encode("utf-8")).hexdigest()
+    raw = "\0".join([normalize_text(goal), normalize_text(location), resume_hash])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def submission_fingerprint(goal: str, location: str, resume_bytes: bytes) -> str:
+    """Identity of a /generate_prompt submission, taken before the résumé is parsed."""
+    upload_hash = hashlib.sha256(resume_bytes).hexdigest()
+    raw = "\0".join(["submission", normalize_text(goal), normalize_text(location), upload_hash])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
@@ -0,0 +1,166 @@
+# backend/roadmap_parser.py
+"""
+Parsing stage for the o3-mini roadmap reply.
+
+    1. validate the reply straight into RoadmapOutput with pydantic's
+       compiled JSON validator (no json.loads → dict → model round trip)
+    2. on failure, repair the JSON locally with json_repair and keep every
+       yearly goal that is valid on its own; a missing five_year_goal or
+       location is filled from the user's input
+    3. only then re-prompt – and only for the years still missing, with
+       the valid ones as context (ROADMAP_REPAIR_ATTEMPTS rounds)
+
+While the reply streams in, RoadmapPreview validates each yearly goal and
+each Year-1 quarterly goal as soon as its JSON closes
+(backend/incremental_json.py), so the browser can show them before the
+reply is complete.  parse_roadmap still decides on the final roadmap.
+"""
+import json
+import logging
+import os
+import re
+
+from json_repair import repair_json
+from pydantic import ValidationError
+
+from backend.incremental_json import JSONStreamScanner
+from backend.models import QuarterlyGoal, RoadmapOutput, YearlyGoal
+from backend.prompt_builder import build_roadmap_repair_prompt
+
+ROADMAP_REPAIR_ATTEMPTS = int(os.getenv("ROADMAP_REPAIR_ATTEMPTS", 1))
+
+_FENCE = re.compile(r"^```(?:json)?\s*|```$", re.MULTILINE)
+
+
+class RoadmapParseError(ValueError):
+    """The reply could not be turned into a valid RoadmapOutput."""
+
+
+def strip_fences(text: str) -> str:
+    return _FENCE.sub("", (text or "").strip()).strip()
+
+
+def _year_items(data) -> list:
+    """yearly_goals entries from a repaired object, a bare list or a single year."""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        if isinstance(data.get("yearly_goals"), list):
+            return data["yearly_goals"]
+        if "year" in data:
+            return [data]
+    return []
+
+
+def _valid_years(items) -> dict[int, YearlyGoal]:
+    years: dict[int, YearlyGoal] = {}
+    for item in items:
+        try:
+            goal = YearlyGoal.model_validate(item)
+        except ValidationError:
+            continue
+        if goal.year == 1 and len(goal.quarterly_smart_goals or []) != 4:
+            continue
+        years.setdefault(goal.year, goal)
+    return years
+
+
+def parse_roadmap(raw: str, goal: str, location: str, reask=None, resume_text: str | None = None) -> RoadmapOutput:
+    """
+    Return the validated roadmap.  `reask(prompt) -> str` is called for a
+    targeted re-prompt when local repair cannot produce all five years.
+    """
+    text = strip_fences(raw)
+    if not text:
+        raise RoadmapParseError("empty roadmap reply")
+    try:
+        return RoadmapOutput.model_validate_json(text)
+    except ValidationError as exc:
+        logging.warning("Roadmap reply failed validation (%d errors) – repairing", exc.error_count())
+
+    data = repair_json(text, return_objects=True)
+    top = data if isinstance(data, dict) else {}
+    five_year_goal = top.get("five_year_goal") if isinstance(top.get("five_year_goal"), str) else goal
+    loc = top.get("location") if isinstance(top.get("location"), str) else location
+    years = _valid_years(_year_items(data))
+
+    for attempt in range(ROADMAP_REPAIR_ATTEMPTS + 1):
+        missing = [y for y in range(1, 6) if y not in years]
+        if not missing:
+            break
+        if attempt == ROADMAP_REPAIR_ATTEMPTS or reask is None:
+            raise RoadmapParseError(f"roadmap is missing valid entries for years {missing}")
+        logging.info("Re-prompting for roadmap years %s only", missing)
+        kept = [years[y].model_dump(exclude_none=True) for y in sorted(years, reverse=True)]
+        reply = reask(build_roadmap_repair_prompt(goal, location, resume_text, kept, missing))
+        patch = _valid_years(_year_items(repair_json(strip_fences(reply), return_objects=True)))
+        years.update({y: g for y, g in patch.items() if y in missing})
+
+    try:
+        return RoadmapOutput(five_year_goal=five_year_goal, location=loc,
+                             yearly_goals=[years[y] for y in sorted(years, reverse=True)])
+    except ValidationError as exc:   # pragma: no cover – every part was validated above
+        raise RoadmapParseError(str(exc)) from exc
+
+
+class RoadmapPreview:
+    """
+    The parts of a streaming roadmap reply that are complete and valid.
+    `feed(delta)` returns True when something new can be shown; `to_json()`
+    is a RoadmapOutput-shaped preview (years newest first, like the final
+    roadmap).  Year 1's quarters are shown as they finish, under the
+    year_goal streamed so far, until the whole Year-1 entry closes.
+    """
+    _YEAR      = ("yearly_goals", "*")
+    _YEAR_GOAL = ("yearly_goals", "*", "year_goal")
+    _QUARTER   = ("yearly_goals", "*", "quarterly_smart_goals", "*")
+
+    def __init__(self, goal: str, location: str):
+        self.goal = goal
+        self.location = location
+        self.reset()
+
+    def reset(self):
+        """Forget everything – the chain restarted the reply on another model."""
+        self._scanner = JSONStreamScanner(self._YEAR, self._YEAR_GOAL, self._QUARTER)
+        self.years: dict[int, YearlyGoal] = {}
+        self._open_goals: dict[int, str] = {}                  # entry index → year_goal
+        self._open_quarters: dict[int, list[QuarterlyGoal]] = {}
+
+    @property
+    def items(self) -> int:
+        """Years and quarters shown so far."""
+        quarters = sum(len(g.quarterly_smart_goals or []) for g in self.years.values())
+        return len(self.years) + quarters + sum(len(q) for q in self._open_quarters.values())
+
+    def feed(self, delta: str) -> bool:
+        changed = False
+        for path, raw in self._scanner.feed(delta):
+            index = path[1]
+            try:
+                if len(path) == 2:
+                    self._open_goals.pop(index, None)
+                    self._open_quarters.pop(index, None)
+                    goal = YearlyGoal.model_validate_json(raw)
+                    if goal.year == 1 and len(goal.quarterly_smart_goals or []) != 4:
+                        continue   # left to parse_roadmap's repair
+                    if goal.year not in self.years:
+                        self.years[goal.year] = goal
+                        changed = True
+                elif path[-1] == "year_goal":
+                    self._open_goals[index] = json.loads(raw)
+                else:
+                    self._open_quarters.setdefault(index, []).append(QuarterlyGoal.model_validate_json(raw))
+                    changed = True
+            except ValidationError:
+                continue
+        return changed
+
+    def to_json(self) -> str:
+        years = [self.years[y].model_dump(exclude_none=True) for y in sorted(self.years, reverse=True)]
+        if 1 not in self.years:   # quarterly goals belong to Year 1 only
+            for index, quarters in self._open_quarters.items():
+                years.append({"year": 1, "year_goal": self._open_goals.get(index, ""),
+                              "quarterly_smart_goals": [q.model_dump() for q in quarters]})
+                break
+        return json.dumps({"five_year_goal": self.goal, "location": self.location, "yearly_goals": years})
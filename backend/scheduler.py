@@ -0,0 +1,208 @@
+# backend/scheduler.py
+"""
+Bounded background scheduler for long-running report jobs.
+
+A fixed pool of worker threads drains a bounded priority queue (lower
+priority value runs first, FIFO within a priority).  `submit` raises
+QueueFullError – carrying a Retry-After hint – instead of growing without
+limit, and `acquire_upstream()` / `upstream_slot()` cap how many upstream
+API calls are in flight at once across all workers.
+
+The queue lives in the process that accepted the job: under gunicorn,
+`position` / `estimated_start` are only known to that worker process
+(None elsewhere), and a priority only orders jobs within one process.
+"""
+import heapq
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+JOB_WORKERS            = int(os.getenv("JOB_WORKERS", 4))
+JOB_QUEUE_MAX          = int(os.getenv("JOB_QUEUE_MAX", 32))
+UPSTREAM_MAX_IN_FLIGHT = int(os.getenv("UPSTREAM_MAX_IN_FLIGHT", 4))
+INITIAL_JOB_SECONDS    = 180.0   # duration guess until real jobs have finished
+SLOT_POLL_SECONDS      = 0.25    # how often a job waiting for an upstream slot checks for cancellation
+
+
+class QueueFullError(Exception):
+    """Raised by `submit` when the queue is at capacity."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue full – retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobScheduler:
+    def __init__(self, workers: int = JOB_WORKERS, max_queue: int = JOB_QUEUE_MAX,
+                 max_in_flight: int = UPSTREAM_MAX_IN_FLIGHT, name: str = "JobWorker"):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._heap: list[tuple[int, int, str, object, tuple]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running: dict[str, float] = {}     # job_id ➜ start time
+        self._avg_duration = INITIAL_JOB_SECONDS
+        self._upstream = threading.BoundedSemaphore(max_in_flight)
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._worker, daemon=True, name=f"{name}-{i}")
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    # ---------------- submission ----------------
+    def has_capacity(self) -> bool:
+        with self._cond:
+            return len(self._heap) < self.max_queue
+
+    def submit(self, job_id: str, fn, *args, priority: int = 0) -> int:
+        """Queue `fn(*args)`; returns the 1-based queue position."""
+        with self._cond:
+            if len(self._heap) >= self.max_queue:
+                raise QueueFullError(self._retry_after())
+            heapq.heappush(self._heap, (priority, next(self._seq), job_id, fn, args))
+            self._cond.notify()
+            position = self._position(job_id)
+        logging.info("Queued job %s at position %d", job_id, position)
+        return position
+
+    def discard(self, job_id: str) -> bool:
+        """Drop a job that hasn't started yet; False if it isn't queued here."""
+        with self._cond:
+            kept = [item for item in self._heap if item[2] != job_id]
+            if len(kept) == len(self._heap):
+                return False
+            self._heap[:] = kept
+            heapq.heapify(self._heap)
+        logging.info("Dropped queued job %s", job_id)
+        return True
+
+    # ---------------- introspection ----------------
+    def position(self, job_id: str) -> int | None:
+        """1-based queue position, 0 if running, None if unknown to this process."""
+        with self._cond:
+            if job_id in self._running:
+                return 0
+            return self._position(job_id)
+
+    def estimated_start(self, job_id: str) -> float | None:
+        """Seconds until the job is expected to start (0 if running)."""
+        with self._cond:
+            if job_id in self._running:
+                return 0.0
+            position = self._position(job_id)
+            if position is None:
+                return None
+            return self._eta(position)
+
+    def retry_after(self) -> int:
+        """Seconds until a worker is expected to free up (Retry-After hint)."""
+        with self._cond:
+            return self._retry_after()
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued, running = len(self._heap), len(self._running)
+        return {
+            "queued": queued,
+            "running": running,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "upstream_in_flight": self._in_flight,
+            "avg_job_seconds": round(self._avg_duration, 1),
+        }
+
+    def acquire_upstream(self, cancel=None, timeout: float | None = None) -> bool:
+        """
+        Take one of the UPSTREAM_MAX_IN_FLIGHT slots; False if none freed up
+        within `timeout`.  With `cancel` (a CancelToken) the wait ends in
+        CallCancelled once the job is cancelled.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if cancel is not None:
+                wait = SLOT_POLL_SECONDS if wait is None else min(wait, SLOT_POLL_SECONDS)
+            if self._upstream.acquire(timeout=wait):
+                break
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+        if cancel is not None and cancel.is_set():
+            self._upstream.release()
+            cancel.raise_if_cancelled()
+        with self._in_flight_lock:
+            self._in_flight += 1
+        return True
+
+    def try_acquire_upstream(self) -> bool:
+        """Take a slot only if one is free right now (hedged requests)."""
+        if not self._upstream.acquire(blocking=False):
+            return False
+        with self._in_flight_lock:
+            self._in_flight += 1
+        return True
+
+    def release_upstream(self):
+        with self._in_flight_lock:
+            self._in_flight -= 1
+        self._upstream.release()
+
+    @contextmanager
+    def upstream_slot(self, cancel=None):
+        """Hold one upstream slot for the duration of the block (see acquire_upstream)."""
+        self.acquire_upstream(cancel)
+        try:
+            yield
+        finally:
+            self.release_upstream()
+
+    # ---------------- internals (call with _cond held) ----------------
+    def _position(self, job_id):
+        for i, item in enumerate(sorted(self._heap)):
+            if item[2] == job_id:
+                return i + 1
+        return None
+
+    def _worker_free_times(self):
+        now = time.time()
+        free = [max(0.0, self._avg_duration - (now - started)) for started in self._running.values()]
+        free += [0.0] * (self.workers - len(free))
+        heapq.heapify(free)
+        return free
+
+    def _eta(self, position):
+        free = self._worker_free_times()
+        start = 0.0
+        for _ in range(position):
+            start = heapq.heappop(free)
+            heapq.heappush(free, start + self._avg_duration)
+        return start
+
+    def _retry_after(self):
+        return max(1, math.ceil(min(self._worker_free_times())))
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, job_id, fn, args = heapq.heappop(self._heap)
+                started = time.time()
+                self._running[job_id] = started
+            try:
+                fn(*args)
+            except Exception:
+                logging.exception("Scheduled job %s raised", job_id)
+            finally:
+                elapsed = time.time() - started
+                with self._cond:
+                    self._running.pop(job_id, None)
+                    self._avg_duration = 0.8 * self._avg_duration + 0.2 * elapsed
@@ -0,0 +1,101 @@
+# bench/corpus.py
+"""
+Sample résumé corpus for the benchmark: the same synthetic careers rendered
+as TXT, DOCX and PDF, short and long, so extraction cost is part of the run.
+
+    python -m bench.corpus --out bench/corpus   # write the files to disk
+"""
+import argparse
+import io
+import random
+from pathlib import Path
+
+from docx import Document
+
+ROLES = [
+    ("Network Engineer", ["Cisco IOS-XE", "BGP", "OSPF", "SD-WAN", "Palo Alto firewalls", "Ansible"]),
+    ("Data Analyst", ["SQL", "Python", "pandas", "Tableau", "dbt", "Snowflake"]),
+    ("Registered Nurse", ["Epic EHR", "ACLS", "patient triage", "telemetry", "wound care", "charge nurse"]),
+    ("Software Developer", ["TypeScript", "React", "Node.js", "PostgreSQL", "Docker", "AWS"]),
+    ("Marketing Coordinator", ["HubSpot", "Google Analytics", "SEO", "copywriting", "Canva", "A/B testing"]),
+]
+EMPLOYERS = ["Raytheon", "Banner Health", "Hexagon Mining", "Pima County", "Caterpillar", "Tucson Electric Power"]
+
+
+def resume_text(index: int, jobs: int = 3) -> str:
+    """A plausible plain-text résumé; `jobs` controls its length."""
+    rng = random.Random(index)
+    role, skills = ROLES[index % len(ROLES)]
+    lines = [f"Candidate {index}", f"candidate{index}@example.com | Tucson, AZ", "",
+             "Summary", f"{role} with {2 + jobs} years of experience delivering measurable results.", "",
+             "Experience"]
+    for j in range(jobs):
+        start = 2024 - 2 * (j + 1)
+        lines += [f"{role}, {rng.choice(EMPLOYERS)}, {start} - {start + 2 if j else 'present'}"]
+        lines += [f"- Delivered {rng.randint(5, 40)} projects using {rng.choice(skills)}, "
+                  f"improving throughput by {rng.randint(10, 60)}%." for _ in range(4)]
+        lines.append("")
+    lines += ["Education", "A.A.S., Pima Community College", "",
+              "Skills", ", ".join(skills), "",
+              "Certifications", f"Certified {role} Associate"]
+    return "\n".join(lines)
+
+
+def _pdf_bytes(text: str) -> bytes:
+    """Minimal single-font PDF, one page per 40 lines."""
+    lines = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in text.splitlines()]
+    pages = [lines[i:i + 40] for i in range(0, len(lines), 40)] or [[""]]
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for page in pages:
+        stream = "BT /F1 10 Tf 14 TL 40 750 Td " + " ".join(f"({line}) '" for line in page) + " ET"
+        objs.append(f"<< /Length {len(stream.encode('cp1252', 'replace'))} >>\nstream\n{stream}\nendstream")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>")
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out, offsets = io.BytesIO(), []
+    out.write(b"%PDF-1.4\n")
+    for i, body in enumerate(objs, 1):
+        offsets.append(out.tell())
+        out.write(f"{i} 0 obj\n{body}\nendobj\n".encode("cp1252", "replace"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode())
+    for off in offsets:
+        out.write(f"{off:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+def _docx_bytes(text: str) -> bytes:
+    doc = Document()
+    for line in text.splitlines():
+        doc.add_paragraph(line)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def build_corpus(size: int = 15) -> list[tuple[str, bytes]]:
+    """(filename, bytes) pairs cycling through txt / docx / pdf and short / long résumés."""
+    corpus = []
+    for i in range(size):
+        text = resume_text(i, jobs=2 if i % 2 else 6)
+        kind = ("txt", "docx", "pdf")[i % 3]
+        data = {"txt": lambda: text.encode("utf-8"), "docx": lambda: _docx_bytes(text),
+                "pdf": lambda: _pdf_bytes(text)}[kind]()
+        corpus.append((f"resume_{i:02d}.{kind}", data))
+    return corpus
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="bench/corpus")
+    parser.add_argument("--size", type=int, default=15)
+    args = parser.parse_args()
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    for name, data in build_corpus(args.size):
+        (out / name).write_bytes(data)
+    print(f"Wrote {args.size} résumés to {out}")
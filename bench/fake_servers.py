@@ -0,0 +1,219 @@
+# bench/fake_servers.py
+"""
+Local stand-ins for the three upstream services, so the whole pipeline can
+be load-tested without API keys:
+
+    • FakeOpenAI      – POST /v1/chat/completions, answers with a valid roadmap
+                        (JSON, or an SSE stream of chunk objects)
+    • FakePerplexity  – POST /chat/completions, JSON or SSE stream with a
+                        configurable time-to-first-byte and per-chunk delay
+    • FakeSMTP        – just enough SMTP (EHLO/MAIL/RCPT/DATA/NOOP/QUIT)
+                        to accept the report e-mails
+
+Each server runs on 127.0.0.1 on a free port in a daemon thread and counts
+the requests it served.
+"""
+import json
+import re
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _roadmap(goal: str, location: str) -> dict:
+    quarter = lambda q: {"quarter": q, "goal": f"Building on your résumé, {q} milestone toward {goal}",
+                         "smart": {k: f"{k}: benchmark detail" for k in "SMAR"} | {"T": f"Time-bound: end of {q}"}}
+    years = [{"year": y, "year_goal": f"Year {y}: step toward {goal}"} for y in (5, 4, 3, 2)]
+    years.append({"year": 1, "year_goal": "Year 1: close the first gap",
+                  "quarterly_smart_goals": [quarter(q) for q in ("Q1", "Q2", "Q3", "Q4")]})
+    return {"five_year_goal": goal, "location": location, "yearly_goals": years}
+
+
+def _report(sections: int = 8, words: int = 120) -> str:
+    body = " ".join(["Hiring demand for this role rose year over year [https://example.com/data]."] * (words // 10))
+    parts = ["# Market Intelligence Report\n\n## 1. Executive Summary\n" + body]
+    parts += [f"## Year {y} Focus\n- **Primary Opportunity:** {body}\n- **Risk Watch:** {body}" for y in range(1, 6)]
+    parts += [f"## Section {i}\n{body}" for i in range(sections - 6)]
+    return "\n\n".join(parts) + "\n"
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):   # clients dropping keep-alives is normal
+            super().handle_error(request, client_address)
+
+
+class _Server:
+    handler = BaseHTTPRequestHandler
+
+    def __init__(self, **options):
+        self.options = options
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = _QuietHTTPServer(("127.0.0.1", 0), self.handler)
+        self.httpd.fake = self
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, name=type(self).__name__, daemon=True).start()
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real APIs
+
+    def log_message(self, *args):
+        pass
+
+    def _payload(self) -> dict:
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+    def _send_json(self, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class _OpenAIHandler(_JSONHandler):
+    def do_POST(self):
+        fake = self.server.fake
+        payload = self._payload()
+        fake.count()
+        time.sleep(fake.options["latency"])
+        prompt = payload["messages"][-1]["content"]
+        goal = (re.search(r'year goal: "([^"]*)"', prompt) or [None, "Become a network architect"])[1]
+        location = (re.search(r'location\s*:\s*"([^"]*)"', prompt) or [None, "Tucson, AZ"])[1]
+        content = json.dumps(_roadmap(goal, location))
+        if payload.get("stream"):
+            self._start_stream()
+            size = fake.options["chunk_chars"]
+            for i in range(0, len(content), size):
+                event = {"id": f"chatcmpl-bench-{fake.requests}", "object": "chat.completion.chunk",
+                         "created": int(time.time()), "model": payload.get("model", "o3-mini"),
+                         "choices": [{"index": 0, "delta": {"content": content[i:i + size]},
+                                      "finish_reason": None}]}
+                self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+                time.sleep(fake.options["chunk_delay"])
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+            return
+        self._send_json({
+            "id": f"chatcmpl-bench-{fake.requests}", "object": "chat.completion", "created": int(time.time()),
+            "model": payload.get("model", "o3-mini"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        })
+
+
+class _PerplexityHandler(_JSONHandler):
+    def do_POST(self):
+        fake = self.server.fake
+        payload = self._payload()
+        fake.count()
+        opts = fake.options
+        report = _report(opts["sections"])
+        time.sleep(opts["latency"])
+        if not payload.get("stream"):
+            self._send_json({"choices": [{"index": 0, "message": {"role": "assistant", "content": report}}]})
+            return
+        self._start_stream()
+        size = opts["chunk_chars"]
+        for i in range(0, len(report), size):
+            event = {"choices": [{"index": 0, "delta": {"content": report[i:i + size]}}]}
+            self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+            time.sleep(opts["chunk_delay"])
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+
+class FakeOpenAI(_Server):
+    handler = _OpenAIHandler
+
+    def __init__(self, latency: float = 2.0, chunk_delay: float = 0.02, chunk_chars: int = 80):
+        super().__init__(latency=latency, chunk_delay=chunk_delay, chunk_chars=chunk_chars)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+
+class FakePerplexity(_Server):
+    handler = _PerplexityHandler
+
+    def __init__(self, latency: float = 1.0, chunk_delay: float = 0.02, chunk_chars: int = 80, sections: int = 8):
+        super().__init__(latency=latency, chunk_delay=chunk_delay, chunk_chars=chunk_chars, sections=sections)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/chat/completions"
+
+
+# ------------------------------------------------------------------
+# SMTP
+# ------------------------------------------------------------------
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        fake = self.server.fake
+        fake.connections += 1
+        self._reply("220 bench ESMTP")
+        while line := self.rfile.readline():
+            cmd = line.decode(errors="replace").strip().upper()
+            if cmd.startswith(("EHLO", "HELO")):
+                self._reply("250 bench")
+            elif cmd == "DATA":
+                self._reply("354 end with <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                time.sleep(fake.latency)
+                with fake.lock:
+                    fake.messages += 1
+                self._reply("250 queued")
+            elif cmd == "QUIT":
+                self._reply("221 bye")
+                return
+            else:   # MAIL FROM, RCPT TO, RSET, NOOP
+                self._reply("250 ok")
+
+
+class FakeSMTP:
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.messages = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SMTPHandler)
+        self.server.daemon_threads = True
+        self.server.fake = self
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, name="FakeSMTP", daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
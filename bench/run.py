@@ -0,0 +1,250 @@
+# bench/run.py
+"""
+Offline end-to-end load benchmark.
+
+Starts local stand-ins for OpenAI, Perplexity and SMTP (bench/fake_servers.py),
+points the app at them through its env settings, serves the Flask app on a
+threaded local server and drives concurrent clients through the whole flow:
+
+    POST /generate_prompt → long-poll /report_status → POST /send_report → e-mail sent
+
+Per-stage latencies (p50/p95/p99), completed flows per second and memory
+are printed at the end.
+
+    python -m bench.run --requests 40 --concurrency 8 --perplexity-latency 2
+    python -m bench.run --output bench_output.txt --json
+
+Any tuning env var (JOB_WORKERS, UPSTREAM_MAX_IN_FLIGHT, EXTRACTION_WORKERS,
+JOB_STORE, …) can be set as usual to benchmark a different configuration.
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench.corpus import build_corpus
+from bench.fake_servers import FakeOpenAI, FakePerplexity, FakeSMTP
+
+STAGES = ["submit", "queue_wait", "first_year", "roadmap", "first_section", "report", "email", "end_to_end"]
+GOALS = ["Become a network architect", "Lead a data analytics team", "Become a nurse manager",
+         "Become a staff software engineer", "Become a marketing director"]
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: dict[str, list[float]] = {stage: [] for stage in STAGES}
+        self.counters = {"completed": 0, "failed": 0, "rejected_503": 0}
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def incr(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+
+def _configure_env(args, openai_fake, perplexity_fake, smtp_fake):
+    """Point the app at the fakes – must run before `app` is imported."""
+    os.environ.update({
+        "OPENAI_API_KEY": "bench", "OPENAI_BASE_URL": openai_fake.base_url,
+        "PERPLEXITY_API_KEY": "bench", "PERPLEXITY_API_URL": perplexity_fake.url,
+        "PERPLEXITY_STREAM": "1" if args.stream else "0", "OPENAI_STREAM": "1" if args.stream else "0",
+        "SMTP_HOST": "127.0.0.1", "SMTP_PORT": str(smtp_fake.port), "SMTP_SSL": "0",
+        "EMAIL_SENDER": "bench@example.com", "GMAIL_APP_PASSWORD": "",
+        "USAGE_LIMIT": "1000000000", "IP_BURST": "1000000000", "EMAIL_BURST": "1000000000",
+    })
+    os.environ.setdefault("JOB_STORE", "memory")
+    os.environ.setdefault("USAGE_STORE", "memory")
+    os.environ.setdefault("JOB_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-"), "jobs.db"))
+
+
+def _wait(session, base, job_id, version, done):
+    """Long-poll /report_status until `done(body)`; yields every status body seen."""
+    while True:
+        body = session.get(f"{base}/report_status",
+                           params={"id": job_id, "wait": 25, "version": version}, timeout=60).json()
+        version = body.get("version")
+        yield body
+        if done(body):
+            return
+
+
+def client_flow(base: str, index: int, corpus, recorder: Recorder, refresh: bool):
+    name, data = corpus[index % len(corpus)]
+    session = requests.Session()
+    start = time.perf_counter()
+    form = {"goal": GOALS[index % len(GOALS)], "location": "Tucson, AZ"}
+    if refresh:
+        form["refresh"] = "1"
+    while True:
+        t = time.perf_counter()
+        r = session.post(f"{base}/generate_prompt", data=form, files={"resume": (name, data)}, timeout=60)
+        if r.status_code != 503:
+            break
+        recorder.incr("rejected_503")
+        time.sleep(min(float(r.headers.get("Retry-After", 1)), 5))
+    recorder.add("submit", time.perf_counter() - t)
+    if r.status_code != 202:
+        recorder.incr("failed")
+        print(f"[{index}] /generate_prompt → {r.status_code} {r.text[:120]}", file=sys.stderr)
+        return
+    submitted = time.perf_counter()
+    job_id = r.json()["job_id"]
+
+    seen = set()
+    final = None
+    for body in _wait(session, base, job_id, None, lambda b: b["status"] in ("ready", "sent", "error")):
+        now = time.perf_counter() - submitted
+        status = body["status"]
+        if status != "queued" and "started" not in seen:
+            seen.add("started")
+            recorder.add("queue_wait", now)
+        if body.get("roadmap_preview_items") and "year" not in seen:
+            seen.add("year")
+            recorder.add("first_year", now)
+        if status in ("roadmap_ready", "report_running", "ready", "sent") and "roadmap" not in seen:
+            seen.add("roadmap")
+            recorder.add("roadmap", now)
+        if body.get("preview_sections") and "section" not in seen:
+            seen.add("section")
+            recorder.add("first_section", now)
+        final = body
+    if final["status"] not in ("ready", "sent"):   # "sent": a duplicate shared another flow's job
+        recorder.incr("failed")
+        print(f"[{index}] job {job_id} ended in {final['status']}: {final.get('error')}", file=sys.stderr)
+        return
+    recorder.add("report", time.perf_counter() - submitted)
+
+    t = time.perf_counter()
+    r = session.post(f"{base}/send_report", json={"id": job_id, "email": f"user{index}@example.com"}, timeout=60)
+    version = r.json().get("version")
+    for body in _wait(session, base, job_id, version,
+                      lambda b: (b.get("email") or {}).get("status") in ("sent", "failed")):
+        final = body
+    if final["email"]["status"] != "sent":
+        recorder.incr("failed")
+        return
+    recorder.add("email", time.perf_counter() - t)
+    recorder.add("end_to_end", time.perf_counter() - start)
+    recorder.incr("completed")
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:   # not Linux – fall back to the peak
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def format_report(args, recorder: Recorder, wall: float, memory: dict, fakes: dict) -> str:
+    lines = [
+        f"requests={args.requests} concurrency={args.concurrency} stream={args.stream} "
+        f"openai_latency={args.openai_latency}s perplexity_latency={args.perplexity_latency}s "
+        f"chunk_delay={args.chunk_delay}s",
+        "",
+        f"{'stage':<14}{'n':>5}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}",
+    ]
+    for stage in STAGES:
+        values = recorder.samples[stage]
+        if values:
+            lines.append(f"{stage:<14}{len(values):>5}" + "".join(
+                f"{v * 1000:>8.0f}ms" for v in (percentile(values, 50), percentile(values, 95),
+                                               percentile(values, 99), max(values))))
+    completed = recorder.counters["completed"]
+    lines += [
+        "",
+        f"completed={completed} failed={recorder.counters['failed']} "
+        f"rejected_503={recorder.counters['rejected_503']} wall={wall:.1f}s "
+        f"throughput={completed / wall if wall else 0:.2f} flows/s",
+        f"memory: rss_start={memory['rss_start_mb']:.0f}MB rss_end={memory['rss_end_mb']:.0f}MB "
+        f"peak={memory['peak_mb']:.0f}MB children_peak={memory['children_peak_mb']:.0f}MB",
+        f"upstream: openai={fakes['openai']} perplexity={fakes['perplexity']} "
+        f"smtp_messages={fakes['smtp_messages']} smtp_connections={fakes['smtp_connections']}",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--openai-latency", type=float, default=1.0)
+    parser.add_argument("--perplexity-latency", type=float, default=0.5, help="time to first byte")
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="delay between streamed chunks")
+    parser.add_argument("--smtp-latency", type=float, default=0.05)
+    parser.add_argument("--no-stream", dest="stream", action="store_false")
+    parser.add_argument("--use-cache", action="store_true", help="let repeat résumés hit the roadmap cache")
+    parser.add_argument("--corpus-size", type=int, default=15)
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--json", action="store_true", help="print raw samples as JSON as well")
+    args = parser.parse_args(argv)
+
+    openai_fake = FakeOpenAI(latency=args.openai_latency, chunk_delay=args.chunk_delay)
+    perplexity_fake = FakePerplexity(latency=args.perplexity_latency, chunk_delay=args.chunk_delay)
+    smtp_fake = FakeSMTP(latency=args.smtp_latency)
+    _configure_env(args, openai_fake, perplexity_fake, smtp_fake)
+
+    import logging
+    from werkzeug.serving import make_server
+    import app as flask_app   # imported only now so it picks up the env above
+    logging.getLogger().setLevel(logging.WARNING)
+
+    server = make_server("127.0.0.1", 0, flask_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="BenchServer", daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    corpus = build_corpus(args.corpus_size)
+    recorder = Recorder()
+    rss_start = _rss_mb()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="BenchClient") as pool:
+        for future in [pool.submit(client_flow, base, i, corpus, recorder, not args.use_cache)
+                       for i in range(args.requests)]:
+            future.result()
+    wall = time.perf_counter() - started
+
+    memory = {
+        "rss_start_mb": rss_start,
+        "rss_end_mb": _rss_mb(),
+        "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "children_peak_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+    fakes = {"openai": openai_fake.requests, "perplexity": perplexity_fake.requests,
+             "smtp_messages": smtp_fake.messages, "smtp_connections": smtp_fake.connections}
+    report = format_report(args, recorder, wall, memory, fakes)
+    print(report)
+    if args.json:
+        print(json.dumps({"samples": recorder.samples, "counters": recorder.counters,
+                          "wall": wall, "memory": memory, "upstream": fakes}))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+
+    server.shutdown()
+    flask_app.extraction_pool.shutdown()
+    for fake in (openai_fake, perplexity_fake, smtp_fake):
+        fake.close()
+    return 0 if recorder.counters["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
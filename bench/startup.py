@@ -0,0 +1,89 @@
+# bench/startup.py
+"""
+Worker start-up benchmark.
+
+Boots the app in fresh interpreters, the way a gunicorn worker does, and
+reports how long `import app` takes, the RSS afterwards and the first
+`GET /`.  Two modes are compared:
+
+    lazy       – a plain worker: heavy libraries load on first use
+    preloaded  – a worker forked from a master that ran backend.preload
+                 (the libraries are already in memory, shared copy-on-write)
+
+No API keys are set, so this also checks that a worker boots without them.
+
+    python -m bench.startup --runs 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from bench.run import percentile
+
+PROBE = r"""
+import json, os, sys, time
+from backend import preload as p
+result = {}
+if os.environ.get("PROBE_PRELOAD") == "1":
+    start = time.perf_counter()
+    p.preload()
+    result["preload_seconds"] = time.perf_counter() - start
+start = time.perf_counter()
+import app
+result["import_seconds"] = time.perf_counter() - start
+with open("/proc/self/statm") as f:
+    result["rss_mb"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+result["heavy_loaded"] = p.loaded()
+start = time.perf_counter()
+status = app.app.test_client().get("/").status_code
+result["first_request_seconds"] = time.perf_counter() - start
+result["status"] = status
+start = time.perf_counter()
+p.preload()   # what a lazy worker pays on first use of the deferred libraries
+result["first_use_seconds"] = time.perf_counter() - start
+app.extraction_pool.shutdown()
+print(json.dumps(result))
+"""
+
+
+def probe(preloaded: bool) -> dict:
+    """Boot the app once in a fresh interpreter and return its measurements."""
+    env = {**os.environ, "OPENAI_API_KEY": "", "PERPLEXITY_API_KEY": "",
+           "JOB_STORE": "memory", "USAGE_STORE": "memory", "PROBE_PRELOAD": "1" if preloaded else "0"}
+    out = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, timeout=120,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if out.returncode != 0:
+        raise RuntimeError(f"start-up probe failed:\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def format_report(results: dict[str, list[dict]]) -> str:
+    lines = [f"{'mode':<11}{'runs':>5}{'import p50':>12}{'rss p50':>10}{'first GET /':>13}"
+             f"{'first use':>11}{'preload':>10}  heavy modules at boot"]
+    for mode, runs in results.items():
+        def p50(key):
+            return percentile([r.get(key, 0.0) for r in runs], 50)
+        heavy = runs[0]["heavy_loaded"]
+        lines.append(f"{mode:<11}{len(runs):>5}{p50('import_seconds') * 1000:>10.0f}ms{p50('rss_mb'):>8.0f}MB"
+                     f"{p50('first_request_seconds') * 1000:>11.0f}ms{p50('first_use_seconds') * 1000:>9.0f}ms"
+                     f"{p50('preload_seconds') * 1000:>8.0f}ms  {', '.join(heavy) or 'none'}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per mode")
+    parser.add_argument("--json", action="store_true", help="print raw measurements as JSON as well")
+    args = parser.parse_args(argv)
+
+    results = {mode: [probe(mode == "preloaded") for _ in range(args.runs)] for mode in ("lazy", "preloaded")}
+    print(format_report(results))
+    if args.json:
+        print(json.dumps(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+# gunicorn.conf.py  –  picked up automatically by `gunicorn app:app`
+import os
+
+# bind ($PORT) and worker count ($WEB_CONCURRENCY) keep gunicorn's own defaults
+
+# report-status SSE streams and long-polls each park one thread while they wait;
+# app.py parks at most PUSH_MAX_WAITERS (8) of them so the rest stay free
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 16))
+
+# app.py starts threads, process pools and HTTP pools at import, none of which
+# survive a fork – so the app itself is always imported per worker …
+preload_app = False
+
+
+def on_starting(server):
+    # … while its heavy libraries can be imported once in the master and shared
+    # copy-on-write by every worker (backend/preload.py, PRELOAD_DEPENDENCIES)
+    from backend.preload import PRELOAD_DEPENDENCIES, preload
+
+    if PRELOAD_DEPENDENCIES:
+        timings = preload()
+        server.log.info("Preloaded %s in %.2fs", ", ".join(timings), sum(timings.values()))
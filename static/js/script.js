@@ -1,6 +1,6 @@
 /* static/js/script.js */
 
-/* ---------- 1. FORM SUBMIT & ROADMAP RENDER (Existing Code) ---------- */
+/* ---------- 1. FORM SUBMIT ---------- */
 document.getElementById('uploadForm').addEventListener('submit', async function (event) {
     event.preventDefault();
     const formData  = new FormData(this);
@@ -27,15 +27,16 @@ document.getElementById('uploadForm').addEventListener('submit', async function
         outputDiv.innerHTML = '';
 
         if (data.error) throw new Error(data.error);
+        outputDiv.innerHTML = '<p>Generating roadmap…</p>';
 
-        /* ----- roadmap render ----- */
-        const roadmapObj = JSON.parse(data.roadmap);
-        renderRoadmap(formatRoadmapData(roadmapObj));
-
-        /* ----- NEW: start polling for the market intelligence report ----- */
+        /* ----- roadmap + market report arrive over the job's status channel ----- */
         window.currentJobId = data.job_id; // Stash job_id globally
-        if (window.pollInterval) clearInterval(window.pollInterval); // Clear any old timers
-        window.pollInterval = setInterval(() => pollReportStatus(data.job_id), 4000); // Poll every 4s
+        window.currentSubscriber = data.subscriber; // our hold on a job other tabs may share
+        window.roadmapRendered = false;
+        window.roadmapPreviewItems = 0;
+        window.previewSections = 0;
+        document.getElementById('reportPreview').classList.add('hidden');
+        watchReportStatus(data.job_id);
 
     } catch (err) {
         outputDiv.innerHTML = '';
@@ -45,31 +46,166 @@ document.getElementById('uploadForm').addEventListener('submit', async function
 });
 
 
-/* ---------- 2. POLLING & MODAL DISPLAY (NEW LOGIC) ---------- */
-async function pollReportStatus(jobId) {
-    try {
-        const res = await fetch(`/report_status?id=${jobId}`);
-        if (!res.ok) { // Handle server errors during polling
-            console.error(`Polling failed with status: ${res.status}`);
-            clearInterval(window.pollInterval);
-            return;
+/* ---------- 2. REPORT STATUS PUSH CHANNEL & MODAL DISPLAY ---------- */
+const TERMINAL_STATUSES = ['ready', 'error', 'sent', 'cancelled'];
+
+/**
+ * Subscribes to /report_events (Server-Sent Events). If EventSource is
+ * unavailable or the stream fails (503 once the worker's stream slots are
+ * taken), falls back to /report_status long-polling.
+ * @param {string} jobId
+ */
+function watchReportStatus(jobId) {
+    if (window.reportEvents) window.reportEvents.close(); // Drop any old stream
+    if (!window.EventSource) { longPollReportStatus(jobId); return; }
+
+    const source = new EventSource(`/report_events?id=${jobId}`);
+    window.reportEvents = source;
+    source.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        handleReportStatus(jobId, data);
+        if (TERMINAL_STATUSES.includes(data.status)) source.close();
+    };
+    source.addEventListener('gone', () => source.close());
+    source.onerror = () => {
+        // CLOSED means the browser gave up reconnecting – switch to long-poll
+        if (source.readyState === EventSource.CLOSED) longPollReportStatus(jobId);
+    };
+}
+
+async function longPollReportStatus(jobId) {
+    let version = '';
+    while (jobId === window.currentJobId) {
+        try {
+            const res = await fetch(`/report_status?id=${jobId}&wait=25&version=${version}`);
+            if (!res.ok) { // Handle server errors during polling
+                console.error(`Long-poll failed with status: ${res.status}`);
+                return;
+            }
+            const data = await res.json();
+            version = data.version;
+            handleReportStatus(jobId, data);
+            if (TERMINAL_STATUSES.includes(data.status)) return;
+            // the server had no thread to park this poll on – ask again shortly
+            if (data.poll_after) await new Promise(resolve => setTimeout(resolve, data.poll_after * 1000));
+        } catch (err) {
+            console.error('Error during long-poll:', err);
+            await new Promise(resolve => setTimeout(resolve, 4000)); // Back off on network errors
+        }
+    }
+}
+
+const ROADMAP_STATUSES = ['roadmap_ready', 'report_running', 'ready', 'sent'];
+
+function handleReportStatus(jobId, data) {
+    console.log(`Job ${jobId}, status: ${data.status}`);
+    window.currentJobStatus = data.status;
+    if (ROADMAP_STATUSES.includes(data.status) && !window.roadmapRendered) {
+        window.roadmapRendered = true;
+        loadRoadmap(jobId);
+    } else if (data.roadmap_preview_items && data.roadmap_preview_items !== window.roadmapPreviewItems
+               && !window.roadmapRendered) {
+        window.roadmapPreviewItems = data.roadmap_preview_items;
+        loadRoadmap(jobId, true); // years validated so far, while the rest streams in
+    }
+    if (data.preview_sections && data.preview_sections !== window.previewSections) {
+        window.previewSections = data.preview_sections;
+        refreshReportPreview(jobId);
+    }
+    if (data.status === 'queued' && data.queue_position !== undefined) {   // only the queueing worker knows it
+        console.log(`Job ${jobId} queued at position ${data.queue_position}, ~${Math.round(data.estimated_start_seconds || 0)}s to start`);
+    } else if (data.status === 'retrying') {
+        console.log(`Job ${jobId} hit an upstream error – retrying automatically`);
+    } else if (data.status === 'ready') {
+        if (data.report_url) refreshReportPreview(jobId); // swap the preview for the finished report
+        document.getElementById('emailModal').classList.remove('hidden'); // Show the modal
+    } else if (data.status === 'error') {
+        if (!window.roadmapRendered) document.getElementById('roadmapCardContainer').innerHTML = '';
+        document.getElementById('error').textContent = data.error || 'Could not generate market report. Please try again.';
+        if (data.retryable) showRetryButton(jobId);
+    } else if (data.status === 'cancelled') {
+        document.getElementById('error').textContent = data.error || 'Report cancelled.';
+    }
+}
+
+// Leaving the page gives up on an unfinished report, so its worker is freed
+// right away instead of when the server notices nobody is polling any more
+// (a job other tabs attached to runs on until they let go too)
+window.addEventListener('pagehide', (event) => {
+    if (event.persisted || !window.currentJobId || TERMINAL_STATUSES.includes(window.currentJobStatus)) return;
+    navigator.sendBeacon('/cancel', new Blob([JSON.stringify({ id: window.currentJobId,
+                                                             subscriber: window.currentSubscriber })],
+                                             { type: 'application/json' }));
+});
+
+/**
+ * Resumes a failed job from the stage that failed – no re-upload, no extra daily usage.
+ * @param {string} jobId
+ */
+function showRetryButton(jobId) {
+    const errorDiv = document.getElementById('error');
+    const button = document.createElement('button');
+    button.textContent = 'Retry';
+    button.addEventListener('click', async () => {
+        button.disabled = true;
+        try {
+            const res  = await fetch('/retry', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ id: jobId })
+            });
+            const data = await res.json();
+            if (data.error) throw new Error(data.error);
+            errorDiv.textContent = '';
+            watchReportStatus(jobId);
+        } catch (err) {
+            errorDiv.textContent = err.message || 'Server error – try again.';
         }
+    });
+    errorDiv.append(' ', button);
+}
+
+/**
+ * Fetches and renders the roadmap.  With `preview` it shows the years
+ * finished so far; a late preview never replaces the complete roadmap.
+ * @param {string} jobId
+ * @param {boolean} preview
+ */
+async function loadRoadmap(jobId, preview = false) {
+    try {
+        const res  = await fetch(`/roadmap?id=${jobId}`);
         const data = await res.json();
+        if (data.error) throw new Error(data.error);
+        if (preview && (window.roadmapRendered || data.items < window.roadmapPreviewItems)) return;
+        renderRoadmap(formatRoadmapData(JSON.parse(data.roadmap)));
+    } catch (err) {
+        if (!preview) window.roadmapRendered = false; // Retry on the next status event
+        console.error('Error loading roadmap:', err);
+    }
+}
 
-        console.log(`Polling job ${jobId}, status: ${data.status}`);
 
-        if (data.status === 'ready') {
-            clearInterval(window.pollInterval); // Stop polling
-            document.getElementById('emailModal').classList.remove('hidden'); // Show the modal
-        } else if (data.status === 'error') {
-            clearInterval(window.pollInterval); // Stop polling on error
-            // Optionally, show an error message to the user
-            document.getElementById('error').textContent = 'Could not generate market report. Please try again.';
+/**
+ * Loads the sections rendered so far into the sandboxed preview iframe.
+ * @param {string} jobId
+ */
+async function refreshReportPreview(jobId) {
+    try {
+        const res = await fetch(`/report_preview?id=${jobId}`);
+        if (!res.ok) return;
+        const data = await res.json();
+        const frame = document.getElementById('reportPreviewFrame');
+        if (data.complete && data.url) {
+            frame.removeAttribute('srcdoc');   // srcdoc would take precedence over src
+            frame.src = data.url;              // cacheable, compressed report artifact
+        } else if (data.html) {
+            frame.srcdoc = data.html;
+        } else {
+            return;
         }
-        // If status is 'running' or 'sent', do nothing and let the polling continue or timeout naturally
+        document.getElementById('reportPreview').classList.remove('hidden');
     } catch (err) {
-        console.error('Error during polling:', err);
-        clearInterval(window.pollInterval); // Stop polling on network error
+        console.error('Error loading report preview:', err);
     }
 }
 
@@ -99,13 +235,13 @@ document.getElementById('sendReportBtn').addEventListener('click', async functio
 
         if (data.error) throw new Error(data.error);
 
-        if (data.status === 'sent') {
-            emailStatus.textContent = '✅ Report sent! Check your inbox.';
-            // Hide the modal after a short delay
-            setTimeout(() => {
-                document.getElementById('emailModal').classList.add('hidden');
-            }, 3000);
-        }
+        // The server only queues the e-mail; wait for the outbox to deliver it
+        await waitForEmailDelivery(window.currentJobId, data.version, emailStatus);
+        emailStatus.textContent = '✅ Report sent! Check your inbox.';
+        // Hide the modal after a short delay
+        setTimeout(() => {
+            document.getElementById('emailModal').classList.add('hidden');
+        }, 3000);
     } catch (err) {
         emailStatus.textContent = `Error: ${err.message}`;
         this.disabled = false; // Re-enable button on failure
@@ -113,6 +249,24 @@ document.getElementById('sendReportBtn').addEventListener('click', async functio
 });
 
 
+async function waitForEmailDelivery(jobId, version, emailStatus) {
+    const deadline = Date.now() + 5 * 60 * 1000;
+    while (Date.now() < deadline) {
+        const res = await fetch(`/report_status?id=${jobId}&wait=25&version=${version || 0}`);
+        const data = await res.json();
+        if (data.error && !data.email) throw new Error(data.error);
+        version = data.version;
+        const email = data.email || {};
+        if (email.status === 'sent') return;
+        if (email.status === 'failed') throw new Error(email.error || 'Failed to email report.');
+        if (email.status === 'retrying') {
+            emailStatus.textContent = `Sending... (mail server busy, retrying – attempt ${email.attempts + 1})`;
+        }
+    }
+    throw new Error('Timed out waiting for the email to send.');
+}
+
+
 /* ---------- 4. ROADMAP FORMATTING & RENDERING (Existing Code, No Changes) ---------- */
 /**
  * Formats and validates the roadmap data to prevent rendering errors.
@@ -0,0 +1,315 @@
+import gzip
+import io
+import json
+import os
+import threading
+import time
+os.environ.setdefault("JOB_STORE", "memory")
+os.environ.setdefault("USAGE_STORE", "memory")
+os.environ.setdefault("EXTRACTION_WORKERS", "0")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("PERPLEXITY_API_KEY", "test-key")
+
+import pytest
+
+import app as app_module
+from backend.extraction_pool import ExtractionPool
+from backend.job_store import MemoryJobStore
+from backend.llm_providers import LLMChain, LocalProvider
+from backend.market_intel import MarketIntelCache
+from backend.rate_limiter import MemoryDailyQuota, TokenBucketLimiter
+from backend.scheduler import JobScheduler
+from backend.ttl_cache import TTLCache
+
+QUARTER = {"quarter": "Q1", "goal": "Earn the CCNP", "smart": {"S": "s", "M": "m", "A": "a", "R": "r", "T": "t"}}
+ROADMAP = json.dumps({"five_year_goal": "Become a network architect", "location": "Tucson, AZ", "yearly_goals": [
+    {"year": y, "year_goal": f"Year {y} goal", **({"quarterly_smart_goals": [QUARTER] * 4} if y == 1 else {})}
+    for y in (5, 4, 3, 2, 1)]})
+REPORT = "# Market Intelligence Report\n\n## 1. Executive Summary\nDemand is rising.\n\n## Year 1 Focus\n- Certify.\n"
+RESUME = ("Network engineer with CCNA and five years of experience running campus networks. " * 5).encode()
+
+
+class Upstream:
+    """The three LLM chains, each one LocalProvider the test can tune."""
+
+    def __init__(self):
+        self.roadmap = LocalProvider(ROADMAP, name="roadmap")
+        self.research = LocalProvider("## Local Market Intelligence\n- Employers are hiring.\n", name="research")
+        self.strategy = LocalProvider(REPORT, name="strategy", chunks=3)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    store = MemoryJobStore(ttl=600)
+    monkeypatch.setattr(app_module, "job_store", store)
+    monkeypatch.setattr(app_module.watchdog, "job_store", store)
+    monkeypatch.setattr(app_module, "scheduler", JobScheduler(workers=1, name="TestWorker"))
+    monkeypatch.setattr(app_module, "usage_quota", MemoryDailyQuota(limit=100))
+    monkeypatch.setattr(app_module, "ip_limiter", TokenBucketLimiter(100, 1))
+    monkeypatch.setattr(app_module, "extraction_pool", ExtractionPool(workers=0))
+    monkeypatch.setattr(app_module, "market_intel_cache", MarketIntelCache())
+    monkeypatch.setattr(app_module, "roadmap_cache", TTLCache(max_entries=16, ttl=60))
+    fakes = Upstream()
+    monkeypatch.setattr(app_module, "roadmap_llm", LLMChain([fakes.roadmap], hedge=False))
+    monkeypatch.setattr(app_module, "research_llm", LLMChain([fakes.research], hedge=False))
+    monkeypatch.setattr(app_module, "strategy_llm", LLMChain([fakes.strategy], hedge=False))
+    return fakes
+
+
+@pytest.fixture
+def client(upstream):
+    return app_module.app.test_client()
+
+
+def submit(client, goal="Become a network architect", resume=RESUME):
+    return client.post("/generate_prompt", data={"goal": goal, "location": "Tucson, AZ",
+                                                 "resume": (io.BytesIO(resume), "cv.txt")},
+                       content_type="multipart/form-data")
+
+
+def wait_for(client, job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        body = client.get(f"/report_status?id={job_id}").get_json()
+        if body["status"] in statuses:
+            return body
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {body['status']}")
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_cancel_during_research_frees_the_worker(client, upstream):
+    upstream.research.latency = 30   # shared deep research that would hold the worker for 30 s
+    job_id = submit(client).get_json()["job_id"]
+    wait_for(client, job_id, ("report_running",))
+    wait_until(lambda: upstream.research.calls == 1)
+
+    assert client.post("/cancel", json={"id": job_id}).status_code == 200
+    wait_until(lambda: app_module.scheduler.stats()["running"] == 0)
+    assert client.get(f"/report_status?id={job_id}").get_json()["status"] == "cancelled"
+
+
+def test_cancel_while_waiting_for_an_upstream_slot(client, upstream, monkeypatch):
+    monkeypatch.setattr(app_module, "scheduler", JobScheduler(workers=1, max_in_flight=1, name="TestWorker"))
+    with app_module.scheduler.upstream_slot():   # every slot taken by someone else
+        job_id = submit(client).get_json()["job_id"]
+        wait_for(client, job_id, ("roadmap_running",))
+        assert client.post("/cancel", json={"id": job_id}).status_code == 200
+        wait_until(lambda: app_module.scheduler.stats()["running"] == 0)
+    assert upstream.roadmap.calls == 0
+
+
+@pytest.mark.parametrize("via", ["status", "retry"])
+def test_overdue_retry_is_requeued(client, upstream, monkeypatch, via):
+    monkeypatch.setattr(app_module, "_auto_retry", lambda job_id: None)   # the worker holding the timer died
+    upstream.roadmap.error = RuntimeError("upstream down")
+    job_id = submit(client).get_json()["job_id"]
+    wait_for(client, job_id, ("retrying",))
+    upstream.roadmap.error = None
+
+    assert client.post("/retry", json={"id": job_id}).status_code == 409   # not due yet
+    app_module.job_store.update(job_id, retry_at=time.time() - app_module.RETRY_GRACE - 1)
+    if via == "retry":
+        assert client.post("/retry", json={"id": job_id}).status_code == 202
+    assert wait_for(client, job_id, ("ready",))["status"] == "ready"
+    assert app_module.job_store.get(job_id)["attempts"] == 2
+
+
+def test_report_is_private_and_sandboxed(client):
+    job_id = submit(client).get_json()["job_id"]
+    wait_for(client, job_id, ("ready",))
+    r = client.get(f"/report/{job_id}")
+    assert r.status_code == 200
+    assert r.headers["Cache-Control"] == "private, no-cache"
+    assert r.headers["Content-Security-Policy"] == "sandbox"
+
+
+class Outbox:
+    def __init__(self):
+        self.sent = []
+
+    def enqueue(self, job_id, recipient, subject, html_body):
+        self.sent.append(job_id)
+        time.sleep(0.05)   # let a racing request read the same record
+
+
+def test_concurrent_sends_enqueue_one_email(client, upstream, monkeypatch):
+    outbox = Outbox()
+    monkeypatch.setattr(app_module, "outbox", outbox)
+    monkeypatch.setattr(app_module, "email_limiter", TokenBucketLimiter(100, 1))
+    job_id = submit(client).get_json()["job_id"]
+    wait_for(client, job_id, ("ready",))
+
+    codes = []
+    def send():
+        r = app_module.app.test_client().post("/send_report", json={"id": job_id, "email": "a@example.com"})
+        codes.append(r.status_code)
+    threads = [threading.Thread(target=send) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert codes == [202] * 6
+    assert outbox.sent == [job_id]
+
+    # a send stuck in 'queued' (its worker died) can be sent again once stale
+    email = app_module.job_store.get(job_id)["email"]
+    app_module.job_store.update(job_id, email={**email, "updated_at": time.time() - app_module.EMAIL_STALE_AFTER - 1})
+    assert client.post("/send_report", json={"id": job_id, "email": "a@example.com"}).status_code == 202
+    assert outbox.sent == [job_id, job_id]
+
+
+def test_submission_is_validated(client):
+    assert client.post("/generate_prompt", data={"goal": "x"}).status_code == 400
+    r = client.post("/generate_prompt", data={"goal": "Become a network architect", "location": "Tucson, AZ",
+                                              "resume": (io.BytesIO(RESUME), "cv.exe")},
+                    content_type="multipart/form-data")
+    assert r.status_code == 400
+
+
+def test_duplicate_submission_shares_the_job(client, upstream):
+    upstream.research.latency = 0.5   # keep the first job in flight
+    first = submit(client)
+    second = submit(client)
+    assert first.status_code == second.status_code == 202
+    assert second.get_json()["job_id"] == first.get_json()["job_id"]
+    assert second.get_json()["deduplicated"] is True
+    wait_for(client, first.get_json()["job_id"], ("ready",))
+    assert upstream.roadmap.calls == 1
+
+
+def test_retry_resumes_a_failed_job_from_its_checkpoints(client, upstream, monkeypatch):
+    monkeypatch.setattr(app_module.checkpoints, "JOB_AUTO_RETRIES", 0)
+    assert client.post("/retry", json={"id": "missing"}).status_code == 404
+    upstream.strategy.error = RuntimeError("upstream down")
+    errors = app_module.metrics.stage_errors.value(stage="strategy", error="RuntimeError")
+    job_id = submit(client).get_json()["job_id"]
+    body = wait_for(client, job_id, ("error",))
+    assert body["retryable"] is True
+    assert app_module.metrics.stage_errors.value(stage="strategy", error="RuntimeError") == errors + 1
+
+    upstream.strategy.error = None
+    r = client.post("/retry", json={"id": job_id})
+    assert r.status_code == 202 and r.get_json()["status"] == "queued"
+    wait_for(client, job_id, ("ready",))
+    assert upstream.roadmap.calls == 1   # the roadmap checkpoint was reused
+    assert client.post("/retry", json={"id": job_id}).status_code == 409
+
+
+def test_cancel_status_codes(client, upstream):
+    assert client.post("/cancel", json={"id": "missing"}).status_code == 404
+    upstream.research.latency = 30
+    job_id = submit(client).get_json()["job_id"]
+    r = client.post("/cancel", json={"id": job_id})
+    assert r.status_code == 200 and r.get_json()["status"] == "cancelled"
+    assert client.post("/cancel", json={"id": job_id}).status_code == 409
+
+
+def test_report_revalidates_and_negotiates_encoding(client):
+    assert client.get("/report/missing").status_code == 404
+    job_id = submit(client).get_json()["job_id"]
+    wait_for(client, job_id, ("ready",))
+
+    plain = client.get(f"/report/{job_id}", headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200 and "Content-Encoding" not in plain.headers
+    assert b"Market Intelligence Report" in plain.data
+    gzipped = client.get(f"/report/{job_id}", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(gzipped.data) == plain.data
+    assert gzipped.headers["ETag"] == plain.headers["ETag"]
+    assert gzipped.headers["Vary"] == "Accept-Encoding"
+
+    r = client.get(f"/report/{job_id}", headers={"If-None-Match": plain.headers["ETag"]})
+    assert r.status_code == 304 and not r.data
+    markdown = client.get(f"/report/{job_id}?format=md", headers={"Accept-Encoding": "identity"})
+    assert markdown.mimetype == "text/markdown"
+    assert markdown.headers["ETag"] != plain.headers["ETag"]
+
+
+def test_resumed_jobs_go_ahead_of_new_ones(client, upstream, monkeypatch):
+    monkeypatch.setattr(app_module.checkpoints, "JOB_AUTO_RETRIES", 0)
+    upstream.strategy.error = RuntimeError("upstream down")
+    failed = submit(client, goal="Become a cloud architect").get_json()["job_id"]
+    wait_for(client, failed, ("error",))
+    upstream.strategy.error = None
+
+    upstream.research.latency = 30   # hold the only worker
+    running = submit(client).get_json()["job_id"]
+    wait_for(client, running, ("report_running",))
+    fresh = submit(client, goal="Become a security engineer").get_json()["job_id"]
+    assert client.post("/retry", json={"id": failed}).status_code == 202
+    assert client.get(f"/report_status?id={failed}").get_json()["queue_position"] == 1
+    assert client.get(f"/report_status?id={fresh}").get_json()["queue_position"] == 2
+    for job_id in (fresh, failed, running):
+        client.post("/cancel", json={"id": job_id})
+
+
+def test_quota_refusal_does_not_spend_the_ip_token(client, monkeypatch):
+    monkeypatch.setattr(app_module, "usage_quota", MemoryDailyQuota(limit=0))
+    monkeypatch.setattr(app_module, "ip_limiter", TokenBucketLimiter(1, 3600))
+    assert submit(client).status_code == 429
+    monkeypatch.setattr(app_module, "usage_quota", MemoryDailyQuota(limit=1))
+    assert submit(client).status_code == 202
+
+
+def test_send_of_an_expired_report_is_refused(client, upstream, monkeypatch):
+    outbox = Outbox()
+    monkeypatch.setattr(app_module, "outbox", outbox)
+    monkeypatch.setattr(app_module, "email_limiter", TokenBucketLimiter(100, 1))
+    job_id = submit(client).get_json()["job_id"]
+    wait_for(client, job_id, ("ready",))
+    monkeypatch.setattr(app_module, "load_report_html", lambda store, job_id: None)
+    assert client.post("/send_report", json={"id": job_id, "email": "a@example.com"}).status_code == 410
+    assert outbox.sent == []
+    assert not app_module.job_store.get(job_id).get("email")   # the claim was handed back
+
+
+def test_rejected_upload_spends_no_quota(client, monkeypatch):
+    quota, limiter = MemoryDailyQuota(limit=10), TokenBucketLimiter(1, 3600)
+    monkeypatch.setattr(app_module, "usage_quota", quota)
+    monkeypatch.setattr(app_module, "ip_limiter", limiter)
+    assert submit(client, resume=b"short").status_code == 400
+    assert quota.peek().remaining == 10
+    assert submit(client).status_code == 202   # the IP token was given back too
+    assert quota.peek().remaining == 9
+
+
+def test_shared_job_is_cancelled_once_every_client_lets_go(client, upstream):
+    upstream.research.latency = 30
+    first, second = submit(client).get_json(), submit(client).get_json()
+    job_id = first["job_id"]
+    assert second["job_id"] == job_id and first["subscriber"] != second["subscriber"]
+
+    for _ in range(2):   # a repeated beacon only lets go once
+        r = client.post("/cancel", json={"id": job_id, "subscriber": first["subscriber"]})
+        assert r.status_code == 200 and r.get_json()["subscribers"] == 1
+    assert client.get(f"/report_status?id={job_id}").get_json()["status"] != "cancelled"
+    r = client.post("/cancel", json={"id": job_id, "subscriber": second["subscriber"]})
+    assert r.get_json()["status"] == "cancelled"
+    wait_until(lambda: app_module.scheduler.stats()["running"] == 0)
+
+
+def test_status_waiters_are_capped(client, monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(app_module, "push_slots", slots)
+    job_id = submit(client).get_json()["job_id"]
+    wait_for(client, job_id, ("ready",))
+
+    slots.acquire()   # every waiting thread taken
+    r = client.get(f"/report_events?id={job_id}")
+    assert r.status_code == 503 and r.get_json()["poll_after"] == app_module.FALLBACK_POLL_SECONDS
+    start = time.monotonic()
+    body = client.get(f"/report_status?id={job_id}&wait=10&version={2**31}").get_json()
+    assert time.monotonic() - start < 1 and body["poll_after"] == app_module.FALLBACK_POLL_SECONDS
+    slots.release()
+
+    r = client.get(f"/report_events?id={job_id}")
+    assert r.status_code == 200 and b'"status": "ready"' in r.data
+    r.close()
+    assert slots.acquire(blocking=False)   # the finished stream gave its slot back
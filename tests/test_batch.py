@@ -0,0 +1,94 @@
+import io
+import json
+import os
+import time
+
+os.environ.setdefault("PERPLEXITY_API_KEY", "test-key")
+
+from backend.batch import BatchRunner, Checkpoint, RateGate, read_csv_rows, read_directory_rows
+from backend.llm_providers import LLMChain, LocalProvider
+
+RESUME = "Network technician with a CCNA and five years of campus LAN support. " * 3
+
+
+def _roadmap(prompt):
+    years = [{"year": n, "year_goal": f"Year {n} goal"} for n in (5, 4, 3, 2, 1)]
+    years[-1]["quarterly_smart_goals"] = [
+        {"quarter": q, "goal": f"Quarter {q}", "smart": {"S": "s", "M": "m", "A": "a", "R": "r", "T": "t"}}
+        for q in ("Q1", "Q2", "Q3", "Q4")]
+    return json.dumps({"five_year_goal": "Network architect", "location": "Tucson, AZ", "yearly_goals": years})
+
+
+def _cohort(tmp_path, rows=3, bad_row=None):
+    lines = ["goal,location,resume,email"]
+    for i in range(rows):
+        name = f"r{i}.txt"
+        (tmp_path / name).write_text("" if i == bad_row else RESUME, encoding="utf-8")
+        lines.append(f"Become a network architect,\"Tucson, AZ\",{name},")
+    csv_path = tmp_path / "cohort.csv"
+    csv_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return csv_path
+
+
+def _runner(out_dir, providers):
+    return BatchRunner(out_dir, extract_workers=0, openai_rpm=0, perplexity_rpm=0, progress_every=60,
+                       roadmap_llm=LLMChain([providers["roadmap"]]), research_llm=LLMChain([providers["research"]]),
+                       strategy_llm=LLMChain([providers["strategy"]]), strategy_model="sonar-pro",
+                       stream=io.StringIO())
+
+
+def _providers():
+    return {"roadmap": LocalProvider(_roadmap, name="roadmap"),
+            "research": LocalProvider("## Local market\nHiring is steady.", name="research"),
+            "strategy": LocalProvider("# Strategy\n\n## Next steps\nApply.", name="strategy")}
+
+
+def test_reads_csv_and_directory_rows(tmp_path):
+    rows = list(read_csv_rows(_cohort(tmp_path, rows=2)))
+    assert [r.id for r in rows] == ["0001-r0", "0002-r1"]
+    assert rows[0].resume == tmp_path / "r0.txt" and rows[0].location == "Tucson, AZ" and rows[0].email is None
+    rows = list(read_directory_rows(tmp_path, "goal", "Tucson, AZ"))
+    assert [r.id for r in rows] == ["r0.txt", "r1.txt"]
+
+
+def test_pipeline_writes_reports_and_resumes_from_checkpoint(tmp_path):
+    csv_path, out = _cohort(tmp_path, rows=3, bad_row=1), tmp_path / "out"
+    providers = _providers()
+    counts = _runner(out, providers).run(read_csv_rows(csv_path))
+    assert (counts["done"], counts["failed"]) == (2, 1)
+    assert providers["research"].calls == 1   # one location/role researched once for the cohort
+    assert "<h2" in (out / "0001-r0" / "report.html").read_text(encoding="utf-8")
+    assert json.loads((out / "0003-r2" / "roadmap.json").read_text())["yearly_goals"]
+    assert "0002-r1,failed" in (out / "summary.csv").read_text()
+
+    (tmp_path / "r1.txt").write_text(RESUME, encoding="utf-8")   # fix the broken row and re-run
+    rerun = _providers()
+    counts = _runner(out, rerun).run(read_csv_rows(csv_path))
+    assert (counts["done"], counts["skipped"], counts["failed"]) == (1, 2, 0)
+    assert rerun["roadmap"].calls == 1 and rerun["strategy"].calls == 1
+    assert "0002-r1,done" in (out / "summary.csv").read_text()
+
+
+def test_saved_roadmap_is_not_regenerated(tmp_path):
+    csv_path, out = _cohort(tmp_path, rows=1), tmp_path / "out"
+    out.mkdir()
+    checkpoint = Checkpoint(out / "checkpoint.jsonl")
+    checkpoint.record("0001-r0", roadmap=_roadmap(""))
+    checkpoint.close()
+    providers = _providers()
+    assert _runner(out, providers).run(read_csv_rows(csv_path))["done"] == 1
+    assert providers["roadmap"].calls == 0
+
+
+def test_checkpoint_ignores_a_torn_last_line(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    path.write_text(json.dumps({"id": "a", "roadmap": "{}"}) + "\n" + '{"id": "a", "rep', encoding="utf-8")
+    assert Checkpoint(path).get("a")["roadmap"] == "{}"
+
+
+def test_rate_gate_spaces_calls():
+    gate = RateGate(rpm=600)   # one call per 0.1 s
+    start = time.monotonic()
+    for _ in range(3):
+        gate.wait()
+    assert time.monotonic() - start >= 0.18
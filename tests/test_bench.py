@@ -0,0 +1,71 @@
+import json
+import os
+os.environ.setdefault("PERPLEXITY_API_KEY", "test-key")
+import requests
+from backend.email_sender import SMTPConnection
+from backend.perplexity_client import iter_stream_content
+from bench.corpus import build_corpus
+from bench.fake_servers import FakeOpenAI, FakePerplexity, FakeSMTP
+from bench.run import percentile
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 95) == 3.0
+
+def test_fake_perplexity_streams_sse():
+    fake = FakePerplexity(latency=0, chunk_delay=0)
+    try:
+        r = requests.post(fake.url, json={"stream": True}, stream=True, timeout=5)
+        text = "".join(iter_stream_content(r.iter_lines(decode_unicode=True)))
+        assert text.startswith("# Market Intelligence Report") and "## Year 5 Focus" in text
+        assert fake.requests == 1
+    finally:
+        fake.close()
+
+def test_fake_openai_returns_a_roadmap():
+    fake = FakeOpenAI(latency=0)
+    try:
+        prompt = '- User’s 5‑year goal: "Lead a data team"\n- User’s location :  "Mesa, AZ"'
+        r = requests.post(fake.base_url + "/chat/completions",
+                          json={"model": "o3-mini", "messages": [{"role": "user", "content": prompt}]}, timeout=5)
+        roadmap = json.loads(r.json()["choices"][0]["message"]["content"])
+        assert roadmap["five_year_goal"] == "Lead a data team" and roadmap["location"] == "Mesa, AZ"
+    finally:
+        fake.close()
+
+def test_fake_openai_streams_a_roadmap_readable_by_the_client():
+    import openai
+    from backend.openai_client import _read_stream
+    fake = FakeOpenAI(latency=0, chunk_delay=0, chunk_chars=50)
+    try:
+        client = openai.OpenAI(api_key="bench", base_url=fake.base_url, max_retries=0)
+        stream = client.chat.completions.create(model="o3-mini", stream=True,
+                                                messages=[{"role": "user", "content": "roadmap"}])
+        deltas = []
+        roadmap = json.loads(_read_stream(stream, deltas.append))
+        assert len(deltas) > 1 and len(roadmap["yearly_goals"]) == 5
+    finally:
+        fake.close()
+
+def test_fake_smtp_accepts_mail_over_one_connection():
+    fake = FakeSMTP(latency=0)
+    try:
+        conn = SMTPConnection("127.0.0.1", fake.port, use_ssl=False, sender_email="a@example.com", app_password="")
+        conn.send("b@example.com", "subject", "<p>1</p>")
+        conn.send("c@example.com", "subject", "<p>2</p>")
+        conn.close()
+        assert fake.messages == 2 and fake.connections == 1
+    finally:
+        fake.close()
+
+def test_corpus_mixes_formats():
+    names = [name for name, _ in build_corpus(6)]
+    assert {n.rsplit(".", 1)[1] for n in names} == {"txt", "docx", "pdf"}
+
+def test_worker_boots_without_keys_or_heavy_imports():
+    from bench.startup import probe
+    result = probe(preloaded=False)
+    assert result["status"] == 200
+    assert result["heavy_loaded"] == []
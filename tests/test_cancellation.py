@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from backend.cancellation import CallCancelled, CancelToken, JobWatchdog
+from backend.job_store import MemoryJobStore, SQLiteJobStore
+from backend.llm_providers import LLMChain, LocalProvider
+
+
+def test_token_runs_callbacks_once_and_late_ones_at_once():
+    token, seen = CancelToken(), []
+    unregister = token.on_cancel(lambda: seen.append("dropped"))
+    unregister()
+    token.on_cancel(lambda: seen.append("first"))
+    token.cancel("client")
+    token.cancel("again")
+    token.on_cancel(lambda: seen.append("late"))
+    assert seen == ["first", "late"]
+    assert token.reason == "client"
+    with pytest.raises(CallCancelled):
+        token.raise_if_cancelled()
+
+
+def test_watchdog_cancels_cancelled_expired_and_abandoned_jobs():
+    store = MemoryJobStore(ttl=60)
+    abandoned = []
+    watchdog = JobWatchdog(store, on_abandoned=abandoned.append, abandon_after=60, interval=3600)
+    now = time.time()
+    store.create("live", {"status": "report_running", "last_seen": now})
+    store.create("stopped", {"status": "cancelled", "cancel_reason": "cancelled by client", "last_seen": now})
+    store.create("idle", {"status": "queued", "last_seen": now - 120})
+    tokens = {job_id: watchdog.register(job_id) for job_id in ("live", "stopped", "idle", "gone")}
+
+    watchdog.check(now)
+    assert not tokens["live"].is_set()
+    assert tokens["stopped"].reason == "cancelled by client"
+    assert tokens["gone"].reason == "expired"
+    assert abandoned == ["idle"]
+    assert watchdog.active() == 2
+
+
+def test_cancel_aborts_the_chain_without_falling_back():
+    slow, backup = LocalProvider("late", name="slow", latency=5), LocalProvider("backup", name="backup")
+    chain, token = LLMChain([slow, backup], hedge=False), CancelToken()
+    threading.Timer(0.1, token.cancel, ("client",)).start()
+    start = time.monotonic()
+    with pytest.raises(CallCancelled):
+        chain.complete("prompt", cancel=token)
+    assert time.monotonic() - start < 1
+    assert backup.calls == 0
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_touch_and_cancel_are_kept(backend, tmp_path):
+    store = MemoryJobStore(ttl=60) if backend == "memory" else SQLiteJobStore(str(tmp_path / "jobs.db"), ttl=60)
+    store.create("a", {"status": "queued"})
+    version = store.get("a").get("version")
+    assert store.touch("a", last_seen=123.0)
+    assert store.get("a")["last_seen"] == 123.0
+    assert store.get("a").get("version") == version   # long-polls aren't woken
+    assert not store.touch("missing", last_seen=1.0)
+
+    store.update("a", status="cancelled")
+    store.update("a", status="report_running", preview_sections=1)   # a pipeline write racing the cancel
+    assert store.get("a")["status"] == "cancelled"
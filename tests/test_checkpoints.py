@@ -0,0 +1,30 @@
+from backend import checkpoints
+from backend.job_store import MemoryJobStore
+
+
+def test_checkpoints_round_trip_and_expire_with_the_job():
+    store = MemoryJobStore(ttl=60)
+    store.create("a", {"status": "queued"})
+    assert checkpoints.save(store, "a", "resume", "Résumé text ✓")
+    assert checkpoints.load(store, "a", "resume") == "Résumé text ✓"
+    assert checkpoints.load(store, "a", "markdown") is None
+    store.delete("a")
+    assert checkpoints.load(store, "a", "resume") is None
+    assert not checkpoints.save(store, "a", "resume", "gone")
+
+
+def test_retry_needs_inputs_and_attempts_left(monkeypatch):
+    monkeypatch.setattr(checkpoints, "JOB_MAX_ATTEMPTS", 3)
+    inputs = {"goal": "g", "location": "l", "use_cache": True}
+    assert checkpoints.can_retry({"inputs": inputs, "attempts": 2})
+    assert not checkpoints.can_retry({"inputs": inputs, "attempts": 3})
+    assert not checkpoints.can_retry({"attempts": 1})   # submitted before checkpoints existed
+
+
+def test_auto_retry_backs_off_then_stops(monkeypatch):
+    monkeypatch.setattr(checkpoints, "JOB_AUTO_RETRIES", 2)
+    monkeypatch.setattr(checkpoints, "JOB_RETRY_DELAY", 10)
+    record = {"inputs": {"goal": "g"}, "attempts": 1}
+    assert 5 <= checkpoints.auto_retry_delay(record) <= 10
+    assert 10 <= checkpoints.auto_retry_delay({**record, "attempts": 2}) <= 20
+    assert checkpoints.auto_retry_delay({**record, "attempts": 3}) is None
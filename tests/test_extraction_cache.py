@@ -0,0 +1,29 @@
+from backend.extraction_cache import ExtractionCache, cached_extract, content_key
+
+def test_content_key_depends_on_bytes_and_type():
+    assert content_key(b"abc", ".pdf") == content_key(b"abc", "PDF")
+    assert content_key(b"abc", ".pdf") != content_key(b"abc", ".docx")
+    assert content_key(b"abc", ".pdf") != content_key(b"abd", ".pdf")
+
+def test_hit_skips_extraction_and_caches_failures():
+    cache = ExtractionCache(max_entries=8, disk_dir=None)
+    calls = []
+    def extract():
+        calls.append(1)
+        return ""
+    assert cached_extract(cache, b"garbage", ".pdf", extract) == ""
+    assert cached_extract(cache, b"garbage", ".pdf", extract) == ""
+    assert len(calls) == 1
+
+def test_disk_tier_shared_between_instances(tmp_path):
+    first = ExtractionCache(max_entries=8, disk_dir=str(tmp_path))
+    cached_extract(first, b"resume", ".txt", lambda: "Network engineer")
+    second = ExtractionCache(max_entries=8, disk_dir=str(tmp_path))
+    assert cached_extract(second, b"resume", ".txt", lambda: 1 / 0) == "Network engineer"
+
+def test_memory_tier_is_bounded():
+    cache = ExtractionCache(max_entries=2, disk_dir=None)
+    for i in range(3):
+        cache.put(content_key(bytes([i]), ".txt"), str(i))
+    assert cache.get(content_key(bytes([0]), ".txt")) is None
+    assert cache.get(content_key(bytes([2]), ".txt")) == "2"
@@ -0,0 +1,42 @@
+import pytest
+from backend.extraction_pool import ExtractionPool, ExtractionTimeout, ExtractionFailed
+
+RESUME = ("Network engineer with CCNA, five years running campus networks. " * 4).encode()
+
+def test_extracts_in_child_process_and_reuses_it():
+    pool = ExtractionPool(workers=1, timeout=30, max_memory_mb=0, max_tasks=10)
+    try:
+        assert pool.extract(RESUME, ".txt") == RESUME.decode().strip()
+        assert pool.extract(RESUME, ".txt", max_chars=60) == RESUME.decode()[:60]
+        assert pool.stats() == {"workers": 1, "alive": 1, "recycled": 0}
+    finally:
+        pool.shutdown()
+
+def test_child_recycled_after_max_tasks():
+    pool = ExtractionPool(workers=1, timeout=30, max_memory_mb=0, max_tasks=1)
+    try:
+        for _ in range(3):
+            assert pool.extract(RESUME, ".txt")
+        assert pool.recycled >= 1
+    finally:
+        pool.shutdown()
+
+def test_timeout_kills_worker():
+    pool = ExtractionPool(workers=1, timeout=0.001, max_memory_mb=0)
+    try:
+        with pytest.raises(ExtractionTimeout):
+            pool.extract(RESUME, ".txt")
+        assert pool.stats()["alive"] == 0
+    finally:
+        pool.shutdown()
+
+def test_memory_cap_crash_is_reported():
+    pool = ExtractionPool(workers=1, timeout=30, max_memory_mb=16)
+    try:
+        with pytest.raises(ExtractionFailed):
+            pool.extract(RESUME, ".txt")
+    finally:
+        pool.shutdown()
+
+def test_inline_mode():
+    assert ExtractionPool(workers=0).extract(RESUME, ".txt") == RESUME.decode().strip()
@@ -0,0 +1,138 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from backend.http_transport import Transport, RetryableError, parse_retry_after
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    statuses = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status = self.statuses.pop(0) if self.statuses else 200
+        body = b'{"ok": true}'
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "2")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):   # a slow streamed body: headers at once, then one line every 20 ms
+        self.send_response(200)
+        self.send_header("Content-Length", "45")
+        self.end_headers()
+        for _ in range(5):
+            self.wfile.write(b"data: x\n\n")
+            self.wfile.flush()
+            time.sleep(0.02)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}/chat"
+    srv.shutdown()
+
+def test_retries_429_and_5xx_honouring_retry_after(server):
+    sleeps = []
+    transport = Transport(max_retries=3, sleep=sleeps.append)
+    _Handler.statuses = [429, 503]
+    r = transport.post(server, json={"q": 1}, timeout=5)
+    assert r.status_code == 200
+    assert sleeps[0] == 2.0
+    stats = transport.stats()
+    host = next(iter(stats["hosts"].values()))
+    assert host["requests"] == 3 and host["retries"] == 2 and host["failures"] == 0
+    # every attempt rode the same keep-alive connection
+    assert stats["connections_opened"] == 1
+
+def test_returns_last_response_when_retries_run_out(server):
+    transport = Transport(max_retries=1, sleep=lambda s: None)
+    _Handler.statuses = [500, 500]
+    r = transport.post(server, json={}, timeout=5)
+    assert r.status_code == 500
+    with pytest.raises(requests.exceptions.HTTPError):
+        r.raise_for_status()
+
+def test_connection_errors_are_retried_then_raised():
+    transport = Transport(max_retries=2, sleep=lambda s: None)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        transport.post("http://127.0.0.1:1/chat", timeout=1)
+    assert transport.stats()["hosts"]["127.0.0.1:1"]["requests"] == 3
+
+def test_call_and_backoff():
+    transport = Transport(max_retries=2, backoff_base=1, backoff_max=3, sleep=lambda s: None)
+    attempts = []
+    def attempt():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RetryableError("flaky")
+        return "done"
+    assert transport.call("api.example.com", attempt) == "done"
+    assert all(0 <= transport.backoff_delay(n) <= 3 for n in range(10))
+    assert transport.backoff_delay(0, retry_after=60) == 3
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+
+def test_streamed_response_holds_its_host_slot_until_closed(server):
+    transport = Transport(per_host_limit=2)
+    url = server.replace("/chat", "/stream")
+    host = url.split("/")[2]
+    opened, closed = [], threading.Event()
+
+    def open_stream():
+        r = transport.request("GET", url, stream=True, timeout=5)
+        opened.append(r)
+        closed.wait(5)
+        with r:
+            for _ in r.iter_lines():
+                pass
+
+    threads = [threading.Thread(target=open_stream) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.3)
+    # headers are in, bodies unread: only two streams got a slot
+    assert len(opened) == 2
+    assert transport.stats()["hosts"][host]["in_flight"] == 2
+    closed.set()
+    for t in threads:
+        t.join(5)
+    assert len(opened) == 4
+    assert transport.stats()["hosts"][host]["in_flight"] == 0
+
+def test_retries_stop_at_the_deadline_and_on_cancel():
+    from backend.cancellation import CallCancelled, CancelToken
+    transport = Transport(max_retries=5, backoff_base=10, backoff_max=10)
+    calls = []
+    def attempt():
+        calls.append(1)
+        raise RetryableError("busy", retry_after=0.5)
+    start = time.monotonic()
+    with pytest.raises(RetryableError):
+        transport.call("api.example.com", attempt, deadline=start + 0.2)
+    assert len(calls) == 1 and time.monotonic() - start < 0.1   # a backoff past the deadline isn't slept
+
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel, ("client",)).start()
+    start = time.monotonic()
+    with pytest.raises(CallCancelled):
+        transport.call("api.example.com", attempt, cancel=token)
+    assert time.monotonic() - start < 0.4 and len(calls) == 2   # the backoff was cut short
+    assert transport.stats()["hosts"]["api.example.com"]["in_flight"] == 0
+
+def test_attempt_timeout_is_capped_to_the_deadline():
+    from backend.http_transport import remaining_timeout
+    assert remaining_timeout((10, 300), time.monotonic() + 5)[1] <= 5
+    assert remaining_timeout(None, None) is None
+    assert remaining_timeout(2, time.monotonic() + 60) == 2
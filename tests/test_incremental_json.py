@@ -0,0 +1,32 @@
+import json
+
+from backend.incremental_json import JSONStreamScanner
+
+DOC = {"five_year_goal": "x", "yearly_goals": [
+    {"year": 2, "year_goal": "tricky \"quotes\", {braces} and [brackets]"},
+    {"year": 1, "year_goal": "b", "quarterly_smart_goals": [{"quarter": "Q1", "smart": {"S": "s"}}, {"quarter": "Q2"}]},
+]}
+
+
+def _scan(text, size, *patterns):
+    scanner, found = JSONStreamScanner(*patterns), []
+    for i in range(0, len(text), size):
+        found += scanner.feed(text[i:i + size])
+    return found
+
+
+def test_values_are_reported_as_they_close_whatever_the_chunking():
+    text = "Here you go:\n```json\n" + json.dumps(DOC, indent=2) + "\n```\n{\"ignored\": 1}"
+    for size in (1, 7, len(text)):
+        found = _scan(text, size, ("yearly_goals", "*"), ("yearly_goals", "*", "quarterly_smart_goals", "*"))
+        assert [path for path, _ in found] == [
+            ("yearly_goals", 0), ("yearly_goals", 1, "quarterly_smart_goals", 0),
+            ("yearly_goals", 1, "quarterly_smart_goals", 1), ("yearly_goals", 1)]
+        assert json.loads(found[0][1]) == DOC["yearly_goals"][0]
+        assert json.loads(found[-1][1]) == DOC["yearly_goals"][1]
+
+
+def test_strings_and_escaped_keys():
+    text = json.dumps({"a\"b": {"year_goal": "one"}, "year_goal": "top"})
+    assert _scan(text, 3, ("a\"b", "year_goal"), ("year_goal",)) == [
+        (("a\"b", "year_goal"), '"one"'), (("year_goal",), '"top"')]
@@ -0,0 +1,140 @@
+import threading
+import time
+import pytest
+from backend.job_store import MemoryJobStore, SQLiteJobStore
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryJobStore(ttl=60, max_entries=3)
+    return SQLiteJobStore(path=str(tmp_path / "jobs.db"), ttl=60, max_entries=3)
+
+def test_create_get_update(store):
+    store.create("a", {"status": "running", "html": None})
+    assert store.get("a") == {"status": "running", "html": None, "version": 1}
+    updated = store.update("a", status="ready", html="<p>x</p>")
+    assert updated["status"] == "ready"
+    assert updated["version"] == 2
+    assert store.get("a")["html"] == "<p>x</p>"
+
+def test_unknown_job(store):
+    assert store.get("missing") is None
+    assert store.update("missing", status="ready") is None
+
+def test_update_if_lets_one_writer_win(store):
+    store.create("a", {"status": "retrying"})
+    version = store.get("a")["version"]
+    won = []
+    def claim(n):
+        if store.update_if("a", version, status="queued", by=n):
+            won.append(n)
+    threads = [threading.Thread(target=claim, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(won) == 1
+    assert store.get("a")["by"] == won[0]
+    assert store.update_if("missing", 1, status="queued") is None
+
+def test_ttl_expiry(store):
+    store.ttl = 0.05
+    store.create("a", {"status": "running"})
+    time.sleep(0.1)
+    assert store.get("a") is None
+    assert store.update("a", status="ready") is None
+
+def test_bounded_size_evicts_only_finished_jobs(store):
+    statuses = ["running", "ready", "queued", "error", "running"]
+    for i, status in enumerate(statuses):
+        store.create(f"job{i}", {"status": status})
+        time.sleep(0.01)   # distinct expiry times for SQLite's ordering
+    store.purge_expired()
+    assert len(store) == 3
+    assert store.get("job1") is None and store.get("job3") is None
+    assert all(store.get(f"job{i}") is not None for i in (0, 2, 4))
+
+def test_waiters_do_not_hold_the_lock_while_reading(store):
+    store.create("a", {"status": "running"})
+    reading, release = threading.Event(), threading.Event()
+    get = store.get
+    def slow_get(job_id):
+        if threading.current_thread().name == "waiter":
+            reading.set()
+            release.wait(5)
+        return get(job_id)
+    store.get = slow_get
+    waiter = threading.Thread(target=store.wait_for_change, args=("a", 1, 5), name="waiter")
+    waiter.start()
+    assert reading.wait(5)
+    started = time.monotonic()
+    store.update("a", status="ready")   # _notify isn't blocked by the waiter's read
+    assert time.monotonic() - started < 1
+    release.set()
+    waiter.join(5)
+    assert not waiter.is_alive()
+
+def test_sqlite_shared_between_instances(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    writer = SQLiteJobStore(path=path, ttl=60)
+    reader = SQLiteJobStore(path=path, ttl=60)
+    writer.create("a", {"status": "running"})
+    writer.update("a", status="ready")
+    assert reader.get("a")["status"] == "ready"
+    assert "a" in reader.snapshot()
+
+def test_wait_for_change_wakes_on_update(store):
+    store.create("a", {"status": "running"})
+    threading.Timer(0.05, store.update, args=("a",), kwargs={"status": "ready"}).start()
+    started = time.monotonic()
+    record = store.wait_for_change("a", 1, timeout=5)
+    assert record["status"] == "ready"
+    assert time.monotonic() - started < 2
+
+def test_wait_for_change_times_out(store):
+    store.create("a", {"status": "running"})
+    record = store.wait_for_change("a", 1, timeout=0.05)
+    assert record["version"] == 1
+
+def test_blobs_live_and_die_with_the_job(store):
+    assert store.put_blob("a", "report.html.gz", b"x") is False   # unknown job
+    store.create("a", {"status": "ready"})
+    assert store.put_blob("a", "report.html.gz", b"\x1f\x8b data")
+    assert store.get_blob("a", "report.html.gz") == b"\x1f\x8b data"
+    assert "report.html.gz" not in store.get("a")
+    store.delete("a")
+    assert store.get_blob("a", "report.html.gz") is None
+
+def test_claim_attaches_duplicates_to_the_live_job(store):
+    assert store.claim("fp", "a", {"status": "queued"}) == ("a", True)
+    assert store.claim("fp", "b", {"status": "queued"}) == ("a", False)
+    assert store.get("b") is None
+    store.update("a", status="ready")
+    assert store.claim("fp", "c", {"status": "queued"}) == ("a", False)
+    # refresh: a finished job is not reused
+    assert store.claim("fp", "d", {"status": "queued"}, reuse_finished=False) == ("d", True)
+
+def test_claim_skips_failed_expired_and_released_jobs(store):
+    store.claim("fp", "a", {"status": "queued"})
+    store.update("a", status="error")
+    assert store.claim("fp", "b", {"status": "queued"}) == ("b", True)
+    store.release("fp", "b")
+    assert store.claim("fp", "c", {"status": "queued"}) == ("c", True)
+    assert store.claim("other", "d", {"status": "queued"}, window=0) == ("d", True)
+    assert store.claim("other", "e", {"status": "queued"}) == ("e", True)
+
+def test_claim_is_atomic_across_threads(store):
+    results = []
+    barrier = threading.Barrier(8)
+
+    def submit(i):
+        barrier.wait()
+        results.append(store.claim("fp", f"job{i}", {"status": "queued"}))
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(created for _, created in results) == 1
+    assert len({job_id for job_id, _ in results}) == 1
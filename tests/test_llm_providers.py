@@ -0,0 +1,133 @@
+import time
+
+import pytest
+
+from backend.llm_providers import LLMChain, LocalProvider, DeadlineExceeded, model_list, abandoned_attempts
+from backend.scheduler import JobScheduler
+
+
+def test_first_provider_answers():
+    primary, backup = LocalProvider("roadmap", name="a"), LocalProvider("other", name="b")
+    assert LLMChain([primary, backup]).complete("prompt") == "roadmap"
+    assert (primary.calls, backup.calls) == (1, 0)
+
+
+def test_reply_can_depend_on_the_prompt():
+    chain = LLMChain([LocalProvider(lambda p: p.upper())])
+    assert chain.complete("abc") == "ABC"
+
+
+def test_falls_back_on_error():
+    chain = LLMChain([LocalProvider(name="deep", error=RuntimeError("HTTP 500")), LocalProvider("fast", name="fast")])
+    assert chain.complete("prompt") == "fast"
+
+
+def test_falls_back_when_a_provider_times_out():
+    slow = LocalProvider("deep", name="deep", latency=5, timeout=0.1)
+    chain = LLMChain([slow, LocalProvider("fast", name="fast")], hedge=False)
+    start = time.monotonic()
+    assert chain.complete("prompt") == "fast"
+    assert time.monotonic() - start < 1
+
+
+def test_chain_deadline_is_enforced():
+    chain = LLMChain([LocalProvider("late", latency=5)], hedge=False)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        chain.complete("prompt", deadline=time.monotonic() + 0.1)
+    assert time.monotonic() - start < 1
+
+
+def test_last_error_is_raised_when_every_provider_fails():
+    chain = LLMChain([LocalProvider(name="a", error=RuntimeError("a")), LocalProvider(name="b", error=KeyError("b"))])
+    with pytest.raises(KeyError):
+        chain.complete("prompt")
+
+
+def test_hedge_sent_after_percentile_latency():
+    provider = LocalProvider("ok", name="p")
+    chain = LLMChain([provider], hedge_percentile=50, hedge_min_samples=3)
+    assert chain.hedge_delay(provider, streamed=False) is None   # no history yet
+    for _ in range(3):
+        chain.complete("warm-up")
+    delay = chain.hedge_delay(provider, streamed=False)
+    assert delay is not None and delay < 0.05
+
+    provider.latency = 0.3   # every call is now slower than the recorded p50 → a hedge is sent
+    calls = provider.calls
+    assert chain.complete("prompt") == "ok"
+    assert provider.calls == calls + 2
+
+
+class BlockingProvider(LocalProvider):
+    """Like a non-streamed SDK call: ignores cancellation until it returns."""
+
+    def complete(self, prompt, on_text=None, timeout=None, cancel=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return self.reply
+
+
+@pytest.mark.parametrize("slots, calls", [(1, 1), (2, 2)])
+def test_hedge_only_sent_when_an_upstream_slot_is_free(slots, calls):
+    upstream = JobScheduler(workers=0, max_in_flight=slots)
+    provider = LocalProvider("ok", name="p")
+    chain = LLMChain([provider], hedge_percentile=50, hedge_min_samples=1)
+    chain.complete("warm-up", upstream=upstream)
+    provider.latency, provider.calls = 0.2, 0
+    assert chain.complete("prompt", upstream=upstream) == "ok"
+    assert provider.calls == calls
+    time.sleep(0.05)
+    assert upstream.stats()["upstream_in_flight"] == 0
+
+
+def test_abandoned_attempt_keeps_its_slot_until_it_finishes():
+    upstream = JobScheduler(workers=0, max_in_flight=1)
+    chain = LLMChain([BlockingProvider("late", latency=0.3)], hedge=False)
+    abandoned = abandoned_attempts()   # other tests' stragglers may still be counted
+    with pytest.raises(DeadlineExceeded):
+        chain.complete("prompt", deadline=time.monotonic() + 0.05, upstream=upstream)
+    assert upstream.stats()["upstream_in_flight"] == 1 and abandoned_attempts() >= 1
+    assert not upstream.try_acquire_upstream()
+    for _ in range(200):   # the attempt finishes 0.3 s in, however slow the machine
+        if upstream.stats()["upstream_in_flight"] == 0:
+            break
+        time.sleep(0.01)
+    assert upstream.stats()["upstream_in_flight"] == 0 and abandoned_attempts() <= abandoned
+
+
+def test_hedged_stream_keeps_only_the_winner():
+    provider = LocalProvider("abcdef", name="p", chunks=3, chunk_delay=0.01)
+    chain = LLMChain([provider], hedge_percentile=50, hedge_min_samples=1)
+    chain.complete("warm-up", on_text=lambda d: None)
+    provider.latency = 0.2
+    seen = []
+    assert chain.complete("prompt", on_text=seen.append) == "abcdef"
+    assert "".join(seen) == "abcdef"   # the losing attempt never reached on_text
+
+
+def test_partial_stream_is_reset_before_fallback():
+    class Breaks(LocalProvider):
+        def complete(self, prompt, on_text=None, timeout=None, cancel=None):
+            on_text("half a rep")
+            raise ConnectionError("stream dropped")
+
+    seen, restarts = [], []
+
+    def restart():
+        restarts.append(1)
+        seen.clear()
+
+    chain = LLMChain([Breaks(name="deep"), LocalProvider("full report", name="fast")], hedge=False)
+    assert chain.complete("prompt", on_text=seen.append, on_restart=restart) == "full report"
+    assert restarts == [1] and "".join(seen) == "full report"
+
+    chain = LLMChain([Breaks(name="deep"), LocalProvider("full report", name="fast")], hedge=False)
+    with pytest.raises(ConnectionError):   # without on_restart the streamed text can't be taken back
+        chain.complete("prompt", on_text=lambda d: None)
+
+
+def test_model_list():
+    assert model_list(" sonar-pro, ,sonar ") == ["sonar-pro", "sonar"]
+    assert model_list("") == []
@@ -0,0 +1,86 @@
+import random
+
+import markdown
+from backend.markdown_renderer import IncrementalMarkdownRenderer
+
+REPORT = """# Market Intelligence Report
+
+## Year 1 Focus
+- **Primary Opportunity:** SD-WAN demand
+
+## Local Market Intelligence
+- **Top Employers:** Raytheon
+"""
+
+def test_sections_render_once_next_heading_arrives():
+    renderer = IncrementalMarkdownRenderer()
+    assert renderer.feed("# Market Intelligence Report\n\n## Year 1 Fo") == ["<h1>Market Intelligence Report</h1>"]
+    assert renderer.feed("cus\n- item\n") == []
+    new = renderer.feed("## Local Market Intelligence\n")
+    assert len(new) == 1 and "<h2>Year 1 Focus</h2>" in new[0]
+    assert renderer.sections == 2
+    assert "Local Market" not in renderer.html()
+
+def test_chunked_feed_matches_full_render():
+    renderer = IncrementalMarkdownRenderer()
+    for i in range(0, len(REPORT), 7):
+        renderer.feed(REPORT[i:i + 7])
+    html = renderer.finish()
+    for tag in ("<h1>", "<h2>Year 1 Focus</h2>", "<h2>Local Market Intelligence</h2>", "<li><strong>Top Employers:</strong> Raytheon</li>"):
+        assert tag in html
+    assert html.count("<ul>") == markdown.markdown(REPORT).count("<ul>")
+
+def test_think_block_is_dropped():
+    renderer = IncrementalMarkdownRenderer()
+    assert renderer.feed("<think>\n## not a section\n") == []
+    renderer.feed("still thinking</think>\n# Report\n")
+    assert "think" not in renderer.finish()
+
+def test_source_keeps_markdown_without_reasoning():
+    r = IncrementalMarkdownRenderer()
+    r.feed("<think>plan</think># A\ntext\n")
+    r.feed("## B\nmore")
+    r.finish()
+    assert r.source() == "# A\ntext\n## B\nmore\n"
+
+def test_char_by_char_feed_matches_one_shot():
+    text = "intro\n<think>a\n# no</think>\n# A\nx <think>b</think>y\n## B\n<think>c</think>z\n"
+    one, chars = IncrementalMarkdownRenderer(), IncrementalMarkdownRenderer()
+    one.feed(text)
+    for c in text:
+        chars.feed(c)
+    assert chars.finish() == one.finish()
+    assert one.source() == "intro\n# A\nx y\n## B\nz\n"
+
+def test_long_reasoning_block_is_scanned_once(monkeypatch):
+    from backend import markdown_renderer
+    searched = []
+    real = markdown_renderer.THINK_END_RE
+    class Counting:
+        def search(self, text, pos):
+            searched.append(len(text) - pos)
+            return real.search(text, pos)
+    monkeypatch.setattr(markdown_renderer, "THINK_END_RE", Counting())
+    r = IncrementalMarkdownRenderer()
+    r.feed("<think>")
+    for _ in range(1000):
+        assert r.feed("reasoning ") == []
+    r.feed("</think># Report\n")
+    assert max(searched) < 30   # each feed looks at its own chunk, not the whole block
+    assert r.finish() == "<h1>Report</h1>"
+
+def test_random_chunking_matches_one_shot():
+    text = ("text <think>inner</think> more\n# A\nx<think>\n# no\n</think>\n\n  y\n"
+            "## B\n<think>a</think>  \n<think>b</think>\tz\n### C\nend <think>open")
+    one = IncrementalMarkdownRenderer()
+    one.feed(text)
+    expected = one.finish()
+    rng = random.Random(4)
+    for _ in range(200):
+        r, i = IncrementalMarkdownRenderer(), 0
+        while i < len(text):
+            step = rng.randint(1, 12)
+            r.feed(text[i:i + step])
+            i += step
+        assert r.finish() == expected
+        assert r.source() == one.source()
@@ -0,0 +1,53 @@
+import threading
+import time
+from backend.market_intel import MarketIntelCache, role_family, freshness_note
+from backend.perplexity_prompt_builder import build_perplexity_prompt, build_market_intel_prompt
+
+INTEL = "## Local Market Intelligence\n- **Top Employers:** Raytheon"
+
+def test_role_family_strips_filler_and_context():
+    assert role_family("Become a Senior Network Engineer at Raytheon") == "network engineer"
+    assert role_family("Transition into cloud security architecture within 5 years") == "cloud security architecture"
+    assert role_family("Become a lead") == "general"
+
+def test_fetch_once_then_hit():
+    cache = MarketIntelCache(ttl=60, disk_dir=None)
+    calls = []
+    def fetch():
+        calls.append(1)
+        return INTEL
+    intel, hit = cache.get_or_fetch("Tucson, AZ", "network engineer", fetch)
+    assert not hit and intel["markdown"] == INTEL
+    intel, hit = cache.get_or_fetch(" tucson,  az", "network engineer", fetch)
+    assert hit and len(calls) == 1
+    assert "network engineer roles in Tucson, AZ" in freshness_note(intel)
+
+def test_concurrent_misses_research_once():
+    cache = MarketIntelCache(ttl=60, disk_dir=None)
+    calls = []
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return INTEL
+    threads = [threading.Thread(target=cache.get_or_fetch, args=("Tucson, AZ", "soc analyst", fetch)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+
+def test_disk_tier_and_expiry(tmp_path):
+    cache = MarketIntelCache(ttl=60, disk_dir=str(tmp_path))
+    cache.get_or_fetch("Tucson, AZ", "network engineer", lambda: INTEL)
+    other = MarketIntelCache(ttl=60, disk_dir=str(tmp_path))
+    assert other.get_or_fetch("Tucson, AZ", "network engineer", lambda: 1 / 0)[1]
+    stale = MarketIntelCache(ttl=0, disk_dir=str(tmp_path))
+    assert not stale.get_or_fetch("Tucson, AZ", "network engineer", lambda: INTEL)[1]
+
+def test_prompts_split_research_from_strategy():
+    research = build_market_intel_prompt("Tucson, AZ", "network engineer")
+    assert "Local Market Intelligence" in research and "Résumé" not in research
+    strategy = build_perplexity_prompt("{}", "resume", "Tucson, AZ", market_intel=INTEL)
+    assert "REPORT PART 1" in strategy and "REPORT PART 2" not in strategy
+    assert "Raytheon" in strategy
+    assert "REPORT PART 2" in build_perplexity_prompt("{}", "resume", "Tucson, AZ")
@@ -0,0 +1,58 @@
+import pytest
+
+from backend import metrics
+from backend.metrics import Registry, LATENCY_BUCKETS
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    hist = registry.histogram("demo_seconds", "Demo.", ("stage",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 5):
+        hist.observe(value, stage="parse")
+    text = registry.render()
+    assert '# TYPE career_demo_seconds histogram' in text
+    assert 'career_demo_seconds_bucket{stage="parse",le="0.1"} 1' in text
+    assert 'career_demo_seconds_bucket{stage="parse",le="1"} 3' in text
+    assert 'career_demo_seconds_bucket{stage="parse",le="+Inf"} 4' in text
+    assert 'career_demo_seconds_sum{stage="parse"} 6.05' in text
+    assert 'career_demo_seconds_count{stage="parse"} 4' in text
+
+
+def test_counter_and_label_escaping():
+    registry = Registry()
+    counter = registry.counter("demo_total", "Demo.", ("error",))
+    counter.inc(error='bad "quote"')
+    counter.inc(2, error='bad "quote"')
+    assert counter.value(error='bad "quote"') == 3
+    assert 'career_demo_total{error="bad \\"quote\\""} 3' in registry.render()
+
+
+def test_gauges_are_read_at_scrape_time():
+    registry = Registry()
+    depth = [0]
+    registry.gauge("queue", "Demo.", lambda: depth[0])
+    registry.gauge("per_host", "Demo.", lambda: {"api.example.com": 2}, ("host",))
+    registry.gauge("broken", "Demo.", lambda: 1 / 0)
+    depth[0] = 7
+    text = registry.render()
+    assert "career_queue 7" in text
+    assert 'career_per_host{host="api.example.com"} 2' in text
+    assert "# TYPE career_broken gauge" in text   # a failing callback only drops its samples
+
+
+def test_stage_times_and_counts_errors_by_type():
+    before = metrics.stage_seconds.count(stage="test_stage")
+    with metrics.stage("test_stage"):
+        pass
+    with pytest.raises(KeyError):
+        with metrics.stage("test_stage"):
+            raise KeyError("x")
+    assert metrics.stage_seconds.count(stage="test_stage") == before + 2
+    assert metrics.stage_errors.value(stage="test_stage", error="KeyError") >= 1
+
+
+def test_observe_size_buckets_bytes_and_chars():
+    metrics.observe_size("test_size", nbytes=300_000, chars=900)
+    assert metrics.stage_bytes.count(stage="test_size") >= 1
+    assert metrics.stage_chars.count(stage="test_size") >= 1
+    assert LATENCY_BUCKETS == tuple(sorted(LATENCY_BUCKETS))
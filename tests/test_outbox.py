@@ -0,0 +1,128 @@
+import smtplib
+import socket
+import threading
+import pytest
+from backend.email_sender import SMTPConnection
+from backend.outbox import Outbox
+
+class FakeConnection:
+    opened = 0
+
+    def __init__(self, failures=()):
+        FakeConnection.opened += 1
+        self.failures = list(failures)
+        self.sent = []
+
+    def send(self, recipient, subject, html_body):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append(recipient)
+
+    def close(self):
+        pass
+
+def _wait_for(states, job_id, status):
+    for _ in range(300):
+        if states.get(job_id, [{}])[-1].get("status") == status:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"{job_id} never reached {status}: {states.get(job_id)}")
+
+def _recorder():
+    states = {}
+    return states, lambda job_id, state: states.setdefault(job_id, []).append(state)
+
+def test_reuses_one_connection_for_many_messages():
+    FakeConnection.opened = 0
+    conn = FakeConnection()
+    states, on_state = _recorder()
+    box = Outbox(connection_factory=lambda: conn, on_state=on_state)
+    for i in range(5):
+        box.enqueue(f"job{i}", f"user{i}@example.com", "s", "<p>hi</p>")
+    _wait_for(states, "job4", "sent")
+    assert FakeConnection.opened == 1
+    assert conn.sent == [f"user{i}@example.com" for i in range(5)]
+    assert [s["status"] for s in states["job0"]] == ["queued", "sending", "sent"]
+    box.shutdown(1)
+
+def test_retries_transient_errors_with_backoff():
+    conns = [FakeConnection([smtplib.SMTPServerDisconnected("gone")]), FakeConnection()]
+    states, on_state = _recorder()
+    box = Outbox(connection_factory=lambda: conns.pop(0), on_state=on_state,
+                 backoff_base=0.01, backoff_max=0.01)
+    box.enqueue("job", "a@example.com", "s", "body")
+    _wait_for(states, "job", "sent")
+    assert [s["status"] for s in states["job"]] == ["queued", "sending", "retrying", "sending", "sent"]
+    assert states["job"][-1]["attempts"] == 2
+    assert box.stats()["retries"] == 1
+    box.shutdown(1)
+
+def test_permanent_errors_fail_immediately():
+    conn = FakeConnection([smtplib.SMTPAuthenticationError(535, b"bad credentials")])
+    states, on_state = _recorder()
+    box = Outbox(connection_factory=lambda: conn, on_state=on_state, backoff_base=0.01)
+    box.enqueue("job", "a@example.com", "s", "body")
+    _wait_for(states, "job", "failed")
+    assert states["job"][-1]["attempts"] == 1
+    assert "bad credentials" in states["job"][-1]["error"]
+    box.shutdown(1)
+
+def test_unexpected_error_fails_the_message_not_the_thread():
+    class Picky(FakeConnection):
+        def send(self, recipient, subject, html_body):
+            if html_body is None:
+                raise TypeError("expected string or bytes-like object")
+            super().send(recipient, subject, html_body)
+    conn = Picky()
+    states, on_state = _recorder()
+    box = Outbox(connection_factory=lambda: conn, on_state=on_state)
+    box.enqueue("bad", "a@example.com", "s", None)
+    _wait_for(states, "bad", "failed")
+    box.enqueue("good", "b@example.com", "s", "<p>hi</p>")
+    _wait_for(states, "good", "sent")
+    assert box.stats()["failed"] == 1
+    box.shutdown(1)
+
+def test_gives_up_after_max_attempts():
+    conn = FakeConnection([OSError("unreachable")] * 3)
+    states, on_state = _recorder()
+    box = Outbox(connection_factory=lambda: conn, on_state=on_state, max_attempts=3,
+                 backoff_base=0.01, backoff_max=0.01)
+    box.enqueue("job", "a@example.com", "s", "body")
+    _wait_for(states, "job", "failed")
+    assert states["job"][-1]["attempts"] == 3
+    assert conn.sent == []
+    box.shutdown(1)
+
+def test_delivers_through_local_smtp_server():
+    pytest.importorskip("aiosmtpd")
+    from aiosmtpd.controller import Controller
+
+    class Handler:
+        def __init__(self):
+            self.messages = []
+
+        async def handle_DATA(self, server, session, envelope):
+            self.messages.append(envelope)
+            return "250 OK"
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        states, on_state = _recorder()
+        box = Outbox(connection_factory=lambda: SMTPConnection("127.0.0.1", port, use_ssl=False,
+                                                                sender_email="noreply@example.com",
+                                                                app_password=""),
+                     on_state=on_state)
+        box.enqueue("job1", "one@example.com", "Report", "<h1>1</h1>")
+        box.enqueue("job2", "two@example.com", "Report", "<h1>2</h1>")
+        _wait_for(states, "job2", "sent")
+        assert [m.rcpt_tos for m in handler.messages] == [["one@example.com"], ["two@example.com"]]
+        assert box.stats()["connected"]
+        box.shutdown(1)
+    finally:
+        controller.stop()
@@ -0,0 +1,15 @@
+import os
+os.environ.setdefault("PERPLEXITY_API_KEY", "test-key")
+from backend.perplexity_client import iter_stream_content
+
+def test_iter_stream_content_parses_sse_chunks():
+    lines = [
+        'data: {"choices":[{"delta":{"content":"# Market"}}]}',
+        "",
+        ": keep-alive",
+        'data: {"choices":[{"delta":{"content":" Intelligence Report"}}]}',
+        'data: {"choices":[{"delta":{}}]}',
+        "data: [DONE]",
+        'data: {"choices":[{"delta":{"content":"ignored"}}]}',
+    ]
+    assert "".join(iter_stream_content(lines)) == "# Market Intelligence Report"
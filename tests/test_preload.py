@@ -0,0 +1,20 @@
+import pytest
+
+from backend import preload
+
+
+def test_preload_times_each_module_and_skips_missing_ones():
+    timings = preload.preload(("json", "no_such_module_for_preload"))
+    assert timings == {"json": 0.0}   # already imported → free
+    assert preload.loaded(("json", "no_such_module_for_preload")) == ["json"]
+
+
+def test_missing_api_keys_fail_the_call_not_the_import(monkeypatch):
+    from backend import openai_client, perplexity_client
+    monkeypatch.setattr(openai_client, "OPENAI_API_KEY", None)
+    monkeypatch.setattr(openai_client, "_client", None)
+    with pytest.raises(ValueError):
+        openai_client.get_client()
+    monkeypatch.setattr(perplexity_client, "API_KEY", None)
+    with pytest.raises(RuntimeError):
+        perplexity_client.call_perplexity_api("prompt")
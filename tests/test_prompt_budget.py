@@ -0,0 +1,71 @@
+import json
+from backend.prompt_budget import compact_json, count_tokens, fit_resume, split_sections, resume_budget
+from backend.perplexity_prompt_builder import build_perplexity_prompt
+from backend.prompt_builder import build_career_roadmap_prompt
+
+RESUME = """Jane Doe
+jane@example.com | Tucson, AZ
+
+Summary
+Network engineer with eight years of campus and data-centre experience.
+
+Experience
+Senior Network Engineer, Raytheon, 2021 - present
+- Migrated 40 sites to SD-WAN and cut WAN spend by 30%.
+- Automated switch provisioning with Ansible.
+
+Network Engineer, Hexagon Mining, 2017 - 2021
+- Ran a 2,000-port campus network.
+
+Help Desk Technician, Pima College, 2015 - 2017
+- Reset passwords and imaged laptops for faculty and staff across three campuses.
+
+Education
+A.A.S. Network Technology, Pima Community College
+
+Skills
+Cisco IOS-XE, BGP, OSPF, Ansible, Python, Palo Alto firewalls
+
+Certifications
+CCNP Enterprise, AWS Solutions Architect Associate
+"""
+
+def test_count_tokens_grows_with_text():
+    assert count_tokens("") == 0
+    assert 0 < count_tokens("network engineer") < count_tokens("network engineer " * 20)
+
+def test_compact_json_strips_whitespace():
+    pretty = json.dumps({"a": [1, 2], "b": "é"}, indent=2)
+    assert compact_json(pretty) == '{"a":[1,2],"b":"é"}'
+
+def test_split_sections_recognises_headings():
+    names = [name for name, *_ in split_sections(RESUME)]
+    assert names == ["preamble", "summary", "experience", "education", "skills", "certifications"]
+
+def test_fit_resume_returns_short_text_unchanged():
+    assert fit_resume(RESUME, 10_000) == RESUME.strip()
+
+def test_fit_resume_keeps_skills_and_recent_experience_first():
+    fitted = fit_resume(RESUME, 90)
+    assert count_tokens(fitted) <= 90
+    assert "Ansible, Python" in fitted and "CCNP Enterprise" in fitted
+    assert "Raytheon" in fitted
+    assert "Help Desk" not in fitted and "jane@example.com" not in fitted
+    # original order is preserved
+    assert fitted.index("Experience") < fitted.index("Skills") < fitted.index("Certifications")
+
+def test_fit_resume_cuts_run_on_text_at_a_word():
+    text = " ".join(["word"] * 2000)
+    fitted = fit_resume(text, 100)
+    assert 0 < count_tokens(fitted) <= 100
+    assert text.startswith(fitted)
+
+def test_prompts_embed_compact_json_and_fitted_resume():
+    roadmap = json.dumps({"five_year_goal": "x", "yearly_goals": []}, indent=2)
+    long_resume = RESUME + "\n\nProjects\n" + "\n".join(f"- project {i} " * 20 for i in range(200))
+    prompt = build_perplexity_prompt(roadmap, long_resume, "Tucson, AZ", model="sonar-pro")
+    assert '{"five_year_goal":"x","yearly_goals":[]}' in prompt
+    assert "project 199" not in prompt
+    roadmap_prompt = build_career_roadmap_prompt("Network architect", "Tucson, AZ", long_resume)
+    assert count_tokens(roadmap_prompt) < count_tokens(long_resume)
+    assert resume_budget("unknown-model") > 0
@@ -0,0 +1,98 @@
+import threading
+import pytest
+from backend.rate_limiter import MemoryDailyQuota, SQLiteDailyQuota, SQLiteTokenBucketLimiter, TokenBucketLimiter
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_quota(request, tmp_path):
+    def make(limit, clock):
+        if request.param == "memory":
+            return MemoryDailyQuota(limit=limit, clock=clock)
+        return SQLiteDailyQuota(str(tmp_path / "usage.db"), limit=limit, clock=clock)
+    return make
+
+def test_daily_quota_counts_down_and_resets_next_day(make_quota):
+    now = [1_750_000_000.0]
+    quota = make_quota(3, lambda: now[0])
+    results = [quota.try_acquire() for _ in range(4)]
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results] == [2, 1, 0, 0]
+    assert results[-1].headers()["Retry-After"] == str(int(results[-1].reset_after + 0.999))
+    now[0] += 24 * 3600
+    assert quota.try_acquire().allowed
+    assert quota.peek().remaining == 2
+
+def test_daily_quota_refund(make_quota):
+    quota = make_quota(1, lambda: 1_750_000_000.0)
+    assert quota.try_acquire().allowed
+    assert not quota.try_acquire().allowed
+    quota.refund()
+    assert quota.peek().remaining == 1
+    assert quota.try_acquire().allowed
+    quota.refund()
+    quota.refund()   # never below zero
+    assert quota.peek().remaining == 1
+
+def test_daily_quota_is_atomic_across_threads(make_quota):
+    quota = make_quota(25, lambda: 1_750_000_000.0)
+    granted = []
+    def worker():
+        for _ in range(10):
+            granted.append(quota.try_acquire().allowed)
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert granted.count(True) == 25
+
+def test_sqlite_quota_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "usage.db")
+    clock = lambda: 1_750_000_000.0
+    a = SQLiteDailyQuota(path, limit=2, clock=clock)
+    b = SQLiteDailyQuota(path, limit=2, clock=clock)
+    assert a.try_acquire().allowed
+    assert b.try_acquire().remaining == 0
+    assert not a.try_acquire().allowed
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_limiter(request, tmp_path):
+    def make(burst, refill_seconds, clock):
+        if request.param == "memory":
+            return TokenBucketLimiter(burst, refill_seconds, clock=clock)
+        return SQLiteTokenBucketLimiter("ip", burst, refill_seconds, path=str(tmp_path / "usage.db"), clock=clock)
+    return make
+
+def test_token_bucket_bursts_then_refills(make_limiter):
+    now = [0.0]
+    limiter = make_limiter(2, 10, lambda: now[0])
+    assert limiter.take("1.2.3.4").allowed
+    assert limiter.take("1.2.3.4").allowed
+    refused = limiter.take("1.2.3.4")
+    assert not refused.allowed and refused.retry_after == pytest.approx(10)
+    assert limiter.take("5.6.7.8").allowed    # other clients are unaffected
+    now[0] = 10
+    assert limiter.take("1.2.3.4").allowed
+
+def test_token_bucket_forgets_least_recent_keys():
+    limiter = TokenBucketLimiter(burst=1, refill_seconds=60, max_keys=2, clock=lambda: 0.0)
+    for key in ("a", "b", "c"):
+        limiter.take(key)
+    assert len(limiter) == 2
+    assert limiter.take("a").allowed           # "a" was evicted, starts full again
+
+def test_token_bucket_refund(make_limiter):
+    limiter = make_limiter(1, 60, lambda: 0.0)
+    assert limiter.take("a").allowed
+    limiter.refund("a")
+    assert limiter.take("a").allowed
+    assert not limiter.take("a").allowed
+
+def test_sqlite_buckets_are_shared_between_workers(tmp_path):
+    path, clock = str(tmp_path / "usage.db"), lambda: 1_750_000_000.0
+    a = SQLiteTokenBucketLimiter("ip", 2, 60, path=path, clock=clock)
+    b = SQLiteTokenBucketLimiter("ip", 2, 60, path=path, clock=clock)
+    email = SQLiteTokenBucketLimiter("email", 2, 60, path=path, clock=clock)
+    assert a.take("1.2.3.4").allowed
+    assert b.take("1.2.3.4").remaining == 0
+    assert not a.take("1.2.3.4").allowed
+    assert email.take("1.2.3.4").allowed      # each limiter has its own buckets
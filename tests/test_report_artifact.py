@@ -0,0 +1,26 @@
+import gzip
+from backend.job_store import MemoryJobStore
+from backend.report_artifact import (store_report, negotiate_encoding, load_report_html,
+                                     load_report_markdown, HTML_BLOBS)
+
+def test_store_report_compresses_and_hashes():
+    store = MemoryJobStore()
+    store.create("job", {"status": "report_running"})
+    html = "<h1>Report</h1>" + "<p>Lots of repeated market data.</p>" * 200
+    meta = store_report(store, "job", html, "# Report\n")
+    assert meta["size"] == len(html.encode())
+    assert meta["encodings"]["gzip"] < meta["size"] / 5
+    assert meta["etag"] == f'"{meta["sha256"][:32]}"'
+    assert gzip.decompress(store.get_blob("job", HTML_BLOBS["gzip"])).decode() == html
+    assert load_report_html(store, "job") == html
+    assert load_report_markdown(store, "job") == "# Report\n"
+    # identical content → identical artifact, so the ETag is stable
+    assert store_report(store, "job", html, "# Report\n")["etag"] == meta["etag"]
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, deflate, br", ["zstd", "gzip"]) == "gzip"
+    assert negotiate_encoding("zstd, gzip", ["zstd", "gzip"]) == "zstd"
+    assert negotiate_encoding("zstd;q=0, gzip;q=0.5", ["zstd", "gzip"]) == "gzip"
+    assert negotiate_encoding("*", ["gzip"]) == "gzip"
+    assert negotiate_encoding("identity", ["gzip"]) is None
+    assert negotiate_encoding(None, ["gzip"]) is None
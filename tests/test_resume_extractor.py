@@ -0,0 +1,67 @@
+import io
+import pytest
+from docx import Document
+from backend.resume_extractor import extract_text, extract_text_from_file, read_upload, UploadTooLarge
+
+LINE = "Deployed SD-WAN across 12 branch offices and cut outage minutes by 40%."
+
+def _pdf_bytes(pages):
+    """Minimal multi-page PDF with one line of Helvetica text per page."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 10 Tf 40 700 Td ({text}) Tj ET"
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>")
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out, offsets = io.BytesIO(), []
+    out.write(b"%PDF-1.4\n")
+    for i, body in enumerate(objs, 1):
+        offsets.append(out.tell())
+        out.write(f"{i} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode())
+    for off in offsets:
+        out.write(f"{off:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+def _docx_bytes(paragraphs):
+    doc = Document()
+    for p in paragraphs:
+        doc.add_paragraph(p)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+def test_pdf_stops_at_char_budget():
+    data = _pdf_bytes([f"Page {i} {LINE}" for i in range(20)])
+    full = extract_text(data, ".pdf")
+    assert "Page 19" in full
+    short = extract_text(data, "pdf", max_chars=150)
+    assert len(short) == 150
+    assert "Page 0" in short and "Page 5" not in short
+
+def test_docx_from_file_like_object():
+    data = _docx_bytes([f"{i} {LINE}" for i in range(10)])
+    text = extract_text(io.BytesIO(data), ".docx", max_chars=100)
+    assert text.startswith("0 " + LINE[:20])
+    assert len(text) == 100
+
+def test_txt_too_short_and_unsupported():
+    assert extract_text(b"too short", ".txt") == ""
+    assert extract_text(LINE.encode(), ".rtf") == ""
+    assert extract_text(LINE.encode(), ".txt") == LINE
+
+def test_extract_text_from_file_still_works(tmp_path):
+    path = tmp_path / "cv.txt"
+    path.write_text(LINE, encoding="utf-8")
+    assert extract_text_from_file(path) == LINE
+
+def test_read_upload_enforces_limit_while_streaming():
+    assert read_upload(io.BytesIO(b"x" * 1000), 1000) == b"x" * 1000
+    with pytest.raises(UploadTooLarge):
+        read_upload(io.BytesIO(b"x" * 1001), 1000)
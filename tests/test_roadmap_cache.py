@@ -0,0 +1,28 @@
+import time
+from backend.roadmap_cache import normalize_text, roadmap_cache_key
+from backend.ttl_cache import TTLCache
+
+RESUME = "Network engineer with CCNA and five years of campus networking."
+
+def test_key_ignores_case_whitespace_and_trailing_punctuation():
+    a = roadmap_cache_key("Become a  Network Architect.", "Tucson, AZ", RESUME)
+    b = roadmap_cache_key("become a network architect", " tucson,  az ", RESUME)
+    assert a == b
+    assert normalize_text("  Lead   SOC team! ") == "lead soc team"
+
+def test_key_changes_with_resume_goal_or_location():
+    base = roadmap_cache_key("Become a network architect", "Tucson, AZ", RESUME)
+    assert base != roadmap_cache_key("Become a network architect", "Tucson, AZ", RESUME + " CCNP")
+    assert base != roadmap_cache_key("Become a security architect", "Tucson, AZ", RESUME)
+    assert base != roadmap_cache_key("Become a network architect", "Phoenix, AZ", RESUME)
+
+def test_ttl_cache_expiry_and_bound():
+    cache = TTLCache(max_entries=2, ttl=0.05)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.set("c", "3")
+    assert cache.get("a") is None
+    assert cache.get("c") == "3"
+    time.sleep(0.1)
+    assert cache.get("c") is None
+    assert cache.stats()["misses"] == 2
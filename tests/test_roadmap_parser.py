@@ -0,0 +1,70 @@
+import json
+import pytest
+from backend.roadmap_parser import parse_roadmap, RoadmapParseError, RoadmapPreview
+
+def _quarter(q):
+    return {"quarter": q, "goal": f"Building on your CCNA, {q}", "smart": {"S": "s", "M": "m", "A": "a", "R": "r", "T": "t"}}
+
+def _year(n):
+    year = {"year": n, "year_goal": f"Year {n} goal"}
+    if n == 1:
+        year["quarterly_smart_goals"] = [_quarter(q) for q in ("Q1", "Q2", "Q3", "Q4")]
+    return year
+
+def _roadmap(years=(5, 4, 3, 2, 1)):
+    return {"five_year_goal": "Network architect", "location": "Tucson, AZ", "yearly_goals": [_year(n) for n in years]}
+
+def _no_reask(prompt):
+    raise AssertionError("should not re-prompt")
+
+def test_valid_reply_parses_in_one_pass():
+    raw = "```json\n" + json.dumps(_roadmap(), indent=2) + "\n```"
+    roadmap = parse_roadmap(raw, "goal", "Tucson, AZ", reask=_no_reask)
+    assert [g.year for g in roadmap.yearly_goals] == [5, 4, 3, 2, 1]
+    assert len(roadmap.yearly_goals[-1].quarterly_smart_goals) == 4
+
+def test_malformed_json_is_repaired_locally():
+    raw = json.dumps(_roadmap())[:-1].replace('"year": 3', "'year': 3") + ",]"   # single quotes, trailing comma, no brace
+    roadmap = parse_roadmap(raw, "goal", "Tucson, AZ", reask=_no_reask)
+    assert sorted(g.year for g in roadmap.yearly_goals) == [1, 2, 3, 4, 5]
+
+def test_missing_fields_fall_back_to_user_input():
+    data = _roadmap()
+    del data["location"]
+    roadmap = parse_roadmap(json.dumps(data), "goal", "Tucson, AZ", reask=_no_reask)
+    assert roadmap.location == "Tucson, AZ"
+
+def test_reprompts_only_for_failing_years():
+    data = _roadmap()
+    data["yearly_goals"][-1]["quarterly_smart_goals"] = data["yearly_goals"][-1]["quarterly_smart_goals"][:2]
+    prompts = []
+    def reask(prompt):
+        prompts.append(prompt)
+        return json.dumps([_year(1)])
+    roadmap = parse_roadmap(json.dumps(data), "goal", "Tucson, AZ", reask=reask, resume_text="CCNA certified engineer")
+    assert len(prompts) == 1
+    assert "year(s) 1," in prompts[0] and "exactly four" in prompts[0]
+    assert '"year":5' in prompts[0]           # valid years are passed as context
+    assert len(roadmap.yearly_goals[-1].quarterly_smart_goals) == 4
+
+def test_gives_up_when_repair_does_not_help():
+    with pytest.raises(RoadmapParseError):
+        parse_roadmap(json.dumps(_roadmap(years=(5, 4))), "goal", "Tucson, AZ", reask=lambda p: "sorry")
+    with pytest.raises(RoadmapParseError):
+        parse_roadmap("", "goal", "Tucson, AZ", reask=_no_reask)
+
+def test_preview_shows_each_year_and_quarter_as_it_closes():
+    data = _roadmap()
+    data["yearly_goals"][1]["year"] = 9   # invalid on its own – skipped, not fatal
+    raw = "```json\n" + json.dumps(data, indent=2) + "\n```"
+    preview, shown = RoadmapPreview("goal", "Tucson, AZ"), []
+    for i in range(0, len(raw), 5):
+        if preview.feed(raw[i:i + 5]):
+            years = json.loads(preview.to_json())["yearly_goals"]
+            shown.append([(y["year"], len(y.get("quarterly_smart_goals") or [])) for y in years])
+    assert shown[0] == [(5, 0)]
+    assert [(5, 0), (3, 0), (2, 0), (1, 1)] in shown   # Q1 before Year 1 is complete
+    assert shown[-1] == [(5, 0), (3, 0), (2, 0), (1, 4)]
+    assert json.loads(preview.to_json())["yearly_goals"][-1]["year_goal"] == "Year 1 goal"
+    preview.reset()
+    assert preview.items == 0 and json.loads(preview.to_json())["yearly_goals"] == []
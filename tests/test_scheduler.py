@@ -0,0 +1,41 @@
+import threading
+import pytest
+from backend.scheduler import JobScheduler, QueueFullError
+
+def test_runs_jobs_and_reports_positions():
+    release = threading.Event()
+    done = []
+    sched = JobScheduler(workers=1, max_queue=2, max_in_flight=1)
+    sched.submit("a", lambda: (release.wait(5), done.append("a")))
+    # wait for the worker to pick up "a"
+    for _ in range(100):
+        if sched.position("a") == 0:
+            break
+        threading.Event().wait(0.01)
+    assert sched.position("a") == 0
+    assert sched.submit("b", done.append, "b") == 1
+    assert sched.submit("c", done.append, "c", priority=-1) == 1
+    assert sched.position("b") == 2
+    assert sched.estimated_start("b") > 0
+    release.set()
+    for _ in range(200):
+        if len(done) == 3:
+            break
+        threading.Event().wait(0.01)
+    assert done == ["a", "c", "b"]
+    assert sched.position("a") is None
+
+def test_rejects_when_full():
+    release = threading.Event()
+    sched = JobScheduler(workers=1, max_queue=1, max_in_flight=1)
+    sched.submit("a", release.wait, 5)
+    for _ in range(100):
+        if sched.position("a") == 0:
+            break
+        threading.Event().wait(0.01)
+    sched.submit("b", lambda: None)
+    assert not sched.has_capacity()
+    with pytest.raises(QueueFullError) as exc:
+        sched.submit("c", lambda: None)
+    assert exc.value.retry_after >= 1
+    release.set()